@@ -1,40 +1,103 @@
 # adsb_io.py
 from pathlib import Path
-import pandas as pd, json
-
-def _read_one(p: Path) -> pd.DataFrame:
-    if p.suffix.lower()==".csv": return pd.read_csv(p)
-    with p.open("r", encoding="utf-8") as f: return pd.DataFrame(json.load(f))
-
-def _normalize_time_num(df: pd.DataFrame, time_col="timestamp_utc"):
-    if time_col in df.columns:
-        df[time_col] = pd.to_datetime(df[time_col], errors="coerce", utc=True)
-    for c in ("lat","lon","alt_baro_ft","gs_mps","trk_deg","roc_mps","score"):
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
+from functools import partial
+import pandas as pd
+import metrics
+from feed_cache import load_files, CACHE_DIRNAME
+from feed_ingest import read_any, parse_files, SOURCE_SUFFIXES
+from feed_schema import normalizer, csv_dtypes, dedupe_sources, dedupe_records, concat_frames, memory_report
+from feed_stream import iter_files
+from feed_follow import FeedFollower
+from track_resample import resample_tracks
+
+# 列类型/主键见 feed_schema.SCHEMAS["adsb_info"] / ["adsb_pred"]
+_normalize_info = metrics.timed("adsb.normalize")(normalizer("adsb_info"))
+_normalize_pred = metrics.timed("adsb.normalize")(normalizer("adsb_pred"))
+
+@metrics.timed("adsb.read")
+def _read_one(p: Path, dtype=None) -> pd.DataFrame:
+    if metrics.enabled(): metrics.count("adsb.bytes_read", p.stat().st_size)
+    return read_any(p, dtype)  # pyarrow CSV / orjson
+
+def _load_dir(root: Path, files, tag: str, normalize, cache: bool, rebuild_cache: bool,
+              dedupe: bool = True, workers: int = 0) -> pd.DataFrame:
+    if not files: return pd.DataFrame()
+    # workers != 1：需要解析的文件交给 feed_ingest 进程池；workers=1 在本进程逐个解析（带 adsb.read 计时）
+    parse_many = None if workers == 1 else partial(parse_files, tag=tag, workers=workers)
+    with metrics.timer(f"{tag}.load_files"):
+        dfs = load_files(files, partial(_read_one, dtype=csv_dtypes(tag)), normalize, tag,
+                         root / CACHE_DIRNAME, cache=cache, rebuild=rebuild_cache, parse_many=parse_many)
+    with metrics.timer(f"{tag}.concat"):
+        df = concat_frames(dfs)
+        n_raw = len(df)
+        if dedupe: df = dedupe_records(df, tag)
+    metrics.count(f"{tag}.files", len(files)); metrics.count(f"{tag}.rows", len(df))
+    metrics.count(f"{tag}.dup_rows", n_raw - len(df))
+    if metrics.enabled(): metrics.count(f"{tag}.mem_bytes", memory_report(df)["total_mb"] * 2 ** 20)
+    metrics.mark(f"{tag}.loaded")
     return df
 
-def load_adsb_info(root: str | Path = "./adsb/info") -> pd.DataFrame:
+def _list(root: Path, prefix: str):
+    files = [p for p in root.glob(f"{prefix}_*.*") if p.suffix.lower() in SOURCE_SUFFIXES]
+    if not files:  # 也允许直接读任意文件名
+        files = [p for p in root.glob("*.*") if p.suffix.lower() in SOURCE_SUFFIXES]
+    return dedupe_sources(files)  # 同名 CSV/JSON/Parquet 副本只读一个
+
+@metrics.timed("adsb.glob")
+def _info_files(root: Path):
+    return _list(root, "adsb_info")
+
+@metrics.timed("adsb.glob")
+def _pred_files(root: Path):
+    return _list(root, "adsb_pred")
+
+def load_adsb_info(root: str | Path = "./adsb/info", cache: bool = True, rebuild_cache: bool = False,
+                   dedupe: bool = True, workers: int = 0) -> pd.DataFrame:
+    """
+    cache=False 绕过 ./adsb/info/.cache；rebuild_cache=True 全量重建缓存；dedupe 按 (icao24, 时间) 去重；
+    workers 为解析进程数（0=按 CPU 核数，1=不起进程池）
+    """
     root = Path(root)
-    files = sorted([*root.glob("adsb_info_*.*"), *root.glob("*.*")])
-    files = [p for p in files if p.suffix.lower() in (".csv",".json")]
-    if not files: return pd.DataFrame()
-    df = pd.concat([_read_one(p) for p in files], ignore_index=True)
-    return _normalize_time_num(df)
+    return _load_dir(root, _info_files(root), "adsb_info", _normalize_info, cache, rebuild_cache, dedupe, workers)
 
-def load_adsb_pred(root: str | Path = "./adsb/pred") -> pd.DataFrame:
+def load_adsb_pred(root: str | Path = "./adsb/pred", cache: bool = True, rebuild_cache: bool = False,
+                   dedupe: bool = True, workers: int = 0) -> pd.DataFrame:
     root = Path(root)
-    files = sorted([*root.glob("adsb_pred_*.*"), *root.glob("*.*")])
-    files = [p for p in files if p.suffix.lower() in (".csv",".json")]
-    if not files: return pd.DataFrame()
-    df = pd.concat([_read_one(p) for p in files], ignore_index=True)
-    return _normalize_time_num(df)
+    return _load_dir(root, _pred_files(root), "adsb_pred", _normalize_pred, cache, rebuild_cache, dedupe, workers)
+
+def iter_adsb_info(root: str | Path = "./adsb/info", chunksize: int = 100_000, time_range=None, columns=None):
+    """load_adsb_info 的流式版本：逐文件/逐块产出，time_range=(t0, t1)，columns 为需要的列"""
+    root = Path(root)
+    yield from iter_files(_info_files(root), _normalize_info, "adsb_info", root / CACHE_DIRNAME,
+                          chunksize=chunksize, time_range=time_range, columns=columns,
+                          csv_dtype=csv_dtypes("adsb_info"))
+
+def iter_adsb_pred(root: str | Path = "./adsb/pred", chunksize: int = 100_000, time_range=None, columns=None):
+    root = Path(root)
+    yield from iter_files(_pred_files(root), _normalize_pred, "adsb_pred", root / CACHE_DIRNAME,
+                          chunksize=chunksize, time_range=time_range, columns=columns,
+                          csv_dtype=csv_dtypes("adsb_pred"))
+
+def follow_adsb_info(root: str | Path = "./adsb/info", poll_s: float = 0.5, checkpoint=None,
+                     from_start: bool = True, stop=None):
+    """跟随模式：持续产出 ./adsb/info 中新追加的记录批次，检查点默认存于 .cache/follow_checkpoint.json"""
+    return FeedFollower(root, _info_files, _normalize_info, checkpoint, from_start,
+                        csv_dtype=csv_dtypes("adsb_info")).follow(poll_s, stop)
+
+def resample_adsb(df: pd.DataFrame | None = None, freq_s: float = 2.0, max_gap_s: float | None = 30.0,
+                  mask_gaps: bool = True, root: str | Path = "./adsb/info") -> pd.DataFrame:
+    """把每个 icao24 重采样到 freq_s 网格（trk_deg 按最短弧插值）；df 缺省时读 root"""
+    if df is None: df = load_adsb_info(root)
+    if not len(df): return pd.DataFrame()
+    return resample_tracks(df, ["icao24"], ["lat","lon","alt_baro_ft","gs_mps","roc_mps"],
+                           circular_cols=["trk_deg"], carry_cols=["callsign","squawk","src"],
+                           freq_s=freq_s, max_gap_s=max_gap_s, mask_gaps=mask_gaps)
 
 if __name__ == "__main__":
     info = load_adsb_info()
-    print(f"Loaded ADS-B info: {len(info)} records")
+    print(f"Loaded ADS-B info: {len(info)} records, {memory_report(info)['total_mb']} MB")
     print(info.head())
 
     # pred = load_adsb_pred()
     # print(f"Loaded ADS-B pred: {len(pred)} records")
-    # print(pred.head())
\ No newline at end of file
+    # print(pred.head())
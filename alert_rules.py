@@ -0,0 +1,96 @@
+# alert_rules.py
+# 规则表驱动的告警引擎：对 load_adsb_info / load_radar_info 返回的 DataFrame 做整列运算，
+# 输出与 create_*_data.py 相同的 pred 结构（原字段 + alert + score）。
+# 规则按表中顺序即优先级：命中多个规则时取靠前的一条；都不命中给 default。
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+EMERGENCY_SQUAWKS = ("7500", "7600", "7700")
+
+# 每条规则：name/alert/score + 条件列表（所有条件同时满足才命中）
+#   ("col", "<", v) / ("col", ">", v) / ("col", "<=", v) / ("col", ">=", v) / ("col", "in", (...))
+ADSB_RULES = [
+    {"name": "emergency_squawk", "alert": "emergency", "score": 0.95,
+     "when": [("squawk", "in", EMERGENCY_SQUAWKS)]},
+    {"name": "low_alt_low_speed", "alert": "watch", "score": 0.75,
+     "when": [("alt_baro_ft", "<", 3000), ("gs_mps", "<", 120)]},
+]
+ADSB_DEFAULT = {"alert": "normal", "score": 0.35}
+ADSB_PRED_COLS = ["timestamp_utc", "icao24", "callsign", "lat", "lon",
+                  "alt_baro_ft", "gs_mps", "trk_deg"]
+
+RADAR_RULES = [
+    {"name": "fast_strong_echo", "alert": "watch", "score": 0.85,
+     "when": [("vel_mps", ">", 200), ("snr_db", ">", 15)]},
+]
+RADAR_DEFAULT = {"alert": "normal", "score": 0.35}
+RADAR_PRED_COLS = ["timestamp_utc", "radar_id", "track_id", "lat", "lon",
+                   "az_deg", "vel_mps", "snr_db"]
+
+def _pred(x: pd.Series, op: str, val) -> np.ndarray:
+    if op == "in":
+        ref = pd.to_numeric(pd.Series(list(val), dtype=object), errors="coerce")
+        if ref.notna().all():
+            # 应答码等数值型集合按数值比较：CSV 读入的 7500.0 与 JSON 的 "7500" 等价
+            v = pd.to_numeric(x, errors="coerce").to_numpy(dtype="float64")
+            return np.isin(v, ref.to_numpy(dtype="float64"))
+        return np.isin(x.astype(str).to_numpy(), np.asarray([str(v) for v in val]))
+    v = pd.to_numeric(x, errors="coerce").to_numpy(dtype="float64")
+    with np.errstate(invalid="ignore"):
+        if op == "<":  return v < val
+        if op == "<=": return v <= val
+        if op == ">":  return v > val
+        if op == ">=": return v >= val
+    raise ValueError(f"Unsupported op: {op}")
+
+def _cond_mask(df: pd.DataFrame, col: str, op: str, val) -> np.ndarray:
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    s = df[col]
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # 分类列（squawk 等）只在类别上求一次，再按 codes 映射回行；缺失值（code -1）不命中
+        hit = np.append(_pred(pd.Series(s.cat.categories), op, val), False)
+        return hit[s.cat.codes.to_numpy()]
+    return _pred(s, op, val)
+
+def evaluate(df: pd.DataFrame, rules: list[dict], default: dict) -> tuple[np.ndarray, np.ndarray]:
+    """返回 (alert, score) 两列；规则越靠前优先级越高"""
+    n = len(df)
+    alert = np.full(n, default["alert"], dtype=object)
+    score = np.full(n, float(default["score"]), dtype="float64")
+    done = np.zeros(n, dtype=bool)
+    for rule in rules:
+        m = np.ones(n, dtype=bool)
+        for col, op, val in rule["when"]:
+            m &= _cond_mask(df, col, op, val)
+        m &= ~done
+        alert[m] = rule["alert"]
+        score[m] = rule["score"]
+        done |= m
+    return alert, score
+
+def apply_rules(df: pd.DataFrame, rules: list[dict], default: dict, pred_cols: list[str],
+                every: int = 1) -> pd.DataFrame:
+    """按规则表生成 pred 表；every=5 时与示例脚本一样每 5 行抽一条"""
+    if every > 1:
+        df = df.iloc[::every]
+    out = df[[c for c in pred_cols if c in df.columns]].reset_index(drop=True)
+    alert, score = evaluate(df, rules, default)
+    out["alert"] = alert
+    out["score"] = score
+    return out
+
+def adsb_alerts(df: pd.DataFrame, rules: list[dict] | None = None, every: int = 1) -> pd.DataFrame:
+    return apply_rules(df, rules or ADSB_RULES, ADSB_DEFAULT, ADSB_PRED_COLS, every)
+
+def radar_alerts(df: pd.DataFrame, rules: list[dict] | None = None, every: int = 1) -> pd.DataFrame:
+    return apply_rules(df, rules or RADAR_RULES, RADAR_DEFAULT, RADAR_PRED_COLS, every)
+
+if __name__ == "__main__":
+    from adsb_io import load_adsb_info
+    from radar_io import load_radar_info
+    a = adsb_alerts(load_adsb_info())
+    r = radar_alerts(load_radar_info())
+    print(a["alert"].value_counts())
+    print(r["alert"].value_counts())
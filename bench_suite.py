@@ -0,0 +1,276 @@
+# bench_suite.py
+# 离线、仅 CPU 的性能基准：
+#   - 按规模（xs/s/m/l，数千到数千万行）用 create_load_data 确定性生成 ADS-B / 雷达数据（seed 固定，已存在则复用）
+#   - 每个阶段在独立子进程中运行：先 setup 与一次预热（不计时），再计时 repeat 次取最优/中位数，
+#     最后单独跑一次 tracemalloc 统计 Python/numpy 分配峰值，并记录子进程 ru_maxrss
+#   - 结果写 bench/results/bench_<时间>.json（含环境信息）；与 --baseline 比较，超过阈值的标记为回归
+#   阶段：载入（无缓存/有缓存）、流式读取、告警规则、TrackStore 建索引与查询、重采样、雷达/ADS-B 关联、
+#        旋转框 IoU / NMS；给出 --weights 时加测单图推理与大图切片推理
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse, datetime as dt, json, multiprocessing as mp, os, platform, resource, statistics, subprocess, time
+import numpy as np
+
+# 规模：目标数 × 时长 / 步长 ≈ 行数；obb 为框数；scene 为切片推理的大图边长
+SCALES = {
+    "xs": {"targets": 50, "duration_s": 300, "step_s": 2.0, "obb": 1_000, "scene": 2048},      # ~7.5 千行
+    "s": {"targets": 500, "duration_s": 1800, "step_s": 2.0, "obb": 10_000, "scene": 4096},    # ~45 万行
+    "m": {"targets": 2000, "duration_s": 3600, "step_s": 2.0, "obb": 50_000, "scene": 8192},   # ~360 万行
+    "l": {"targets": 5000, "duration_s": 7200, "step_s": 1.0, "obb": 200_000, "scene": 16384}, # ~3600 万行
+}
+DATA_ROOT = Path("loadtest/bench")
+RESULT_DIR = Path("bench/results")
+SEED = 2025
+
+def ensure_data(scale: str, root: Path = DATA_ROOT) -> Path:
+    """生成（或复用）该规模的 adsb/radar info 数据，返回数据根目录"""
+    from create_load_data import generate
+    cfg, out = SCALES[scale], root / scale
+    for kind in ("adsb", "radar"):
+        if not any((out / kind / "info").glob(f"{kind}_info_load_*")):
+            generate(kind, cfg["targets"], cfg["duration_s"], cfg["step_s"], shards=8, fmt="csv", out=out, seed=SEED)
+    return out
+
+# -------------------- 阶段定义：setup(ctx) -> state；run(state) -> 处理行数 --------------------
+def _adsb_df(ctx):
+    from adsb_io import load_adsb_info
+    return load_adsb_info(ctx["data"] / "adsb" / "info", cache=False)
+
+def _radar_df(ctx):
+    from radar_io import load_radar_info
+    return load_radar_info(ctx["data"] / "radar" / "info", cache=False)
+
+def _load(kind: str, cached: bool):
+    def setup(ctx):
+        root = ctx["data"] / kind / "info"
+        if cached:                                       # 预先建好缓存，计时只看命中路径
+            _loader(kind)(root, rebuild_cache=True)
+        return root
+    def run(root):
+        return len(_loader(kind)(root, cache=cached))
+    return setup, run
+
+def _loader(kind: str):
+    if kind == "adsb":
+        from adsb_io import load_adsb_info
+        return load_adsb_info
+    from radar_io import load_radar_info
+    return load_radar_info
+
+def _iter_setup(ctx):
+    return ctx["data"] / "adsb" / "info"
+
+def _iter_run(root):
+    from adsb_io import iter_adsb_info
+    return sum(len(c) for c in iter_adsb_info(root, columns=["icao24", "lat", "lon", "alt_baro_ft"]))
+
+def _alerts_run(kind: str):
+    def run(df):
+        from alert_rules import adsb_alerts, radar_alerts
+        (adsb_alerts if kind == "adsb" else radar_alerts)(df, every=5)
+        return len(df)
+    return run
+
+def _store_run(df):
+    from track_store import TrackStore
+    st = TrackStore(df, id_col="icao24")
+    t = df["timestamp_utc"]
+    t0, t1 = t.min(), t.min() + (t.max() - t.min()) / 10
+    st.window(t0, t1)
+    st.bbox(df["lat"].quantile(0.4), df["lat"].quantile(0.6), df["lon"].quantile(0.4), df["lon"].quantile(0.6), t0, t1)
+    st.nearest(float(df["lat"].median()), float(df["lon"].median()), t0, k=5)
+    return len(df)
+
+def _resample_run(df):
+    from adsb_io import resample_adsb
+    return len(resample_adsb(df))
+
+def _fusion_setup(ctx):
+    return _radar_df(ctx), _adsb_df(ctx)
+
+def _fusion_run(state):
+    from track_fusion import associate
+    radar, adsb = state
+    associate(radar, adsb)
+    return len(radar) + len(adsb)
+
+def _obb_setup(ctx):
+    rng = np.random.default_rng(SEED)
+    n = SCALES[ctx["scale"]]["obb"]
+    side = 1024 * max(1.0, (n / 1000) ** 0.5)                   # 框密度固定，模拟切片拼回后的整景
+    b = np.column_stack([rng.uniform(0, side, n), rng.uniform(0, side, n), rng.uniform(10, 60, n),
+                         rng.uniform(5, 30, n), rng.uniform(0, np.pi, n)])
+    dup = b[rng.choice(n, n // 5)] + rng.normal(0, [1, 1, 1, 1, 0.02], (n // 5, 5))   # 接缝重复框
+    b = np.concatenate([b, dup])
+    return b, rng.random(len(b)), rng.integers(0, 15, len(b))
+
+def _nms_run(state):
+    from obb_ops import rotated_nms
+    b, s, c = state
+    rotated_nms(b, s, c, iou_thr=0.3)
+    return len(b)
+
+def _iou_run(state):
+    from obb_ops import poly_iou_pairs, xywhr_to_poly
+    b = state[0]
+    p = xywhr_to_poly(b)
+    poly_iou_pairs(p, np.roll(p, 1, axis=0))
+    return len(b)
+
+def _detect_single_setup(ctx):
+    from onnx_backend import load_model
+    model = load_model(ctx["weights"])
+    im = (np.random.default_rng(SEED).random((1024, 1024, 3)) * 255).astype(np.uint8)
+    return model, im
+
+def _detect_single_run(state):
+    model, im = state
+    model.predict(source=[im], imgsz=1024, device="cpu", verbose=False)
+    return 1
+
+def _detect_tiles_setup(ctx):
+    from PIL import Image
+    from onnx_backend import load_model
+    side = SCALES[ctx["scale"]]["scene"]
+    path = ctx["data"] / f"scene_{side}.png"
+    if not path.exists():
+        rng = np.random.default_rng(SEED)
+        Image.fromarray((rng.random((side, side, 3)) * 255).astype(np.uint8)).save(path, compress_level=1)
+    return load_model(ctx["weights"]), path
+
+def _detect_tiles_run(state):
+    from sliced_detect import sliced_predict
+    model, path = state
+    return sliced_predict(model, path, batch=8, device="cpu")[1]["tiles"]
+
+STAGES = {
+    "adsb_load_nocache": _load("adsb", False),
+    "adsb_load_cached": _load("adsb", True),
+    "radar_load_nocache": _load("radar", False),
+    "radar_load_cached": _load("radar", True),
+    "adsb_iter": (_iter_setup, _iter_run),
+    "adsb_alerts": (_adsb_df, _alerts_run("adsb")),
+    "radar_alerts": (_radar_df, _alerts_run("radar")),
+    "track_store": (_adsb_df, _store_run),
+    "adsb_resample": (_adsb_df, _resample_run),
+    "fusion_associate": (_fusion_setup, _fusion_run),
+    "obb_iou": (_obb_setup, _iou_run),
+    "obb_nms": (_obb_setup, _nms_run),
+    "detect_single": (_detect_single_setup, _detect_single_run),
+    "detect_tiles": (_detect_tiles_setup, _detect_tiles_run),
+}
+NEEDS_WEIGHTS = {"detect_single", "detect_tiles"}
+
+def _run_stage(stage: str, ctx: dict, repeat: int) -> dict:
+    """子进程内执行；返回计时 / 内存结果"""
+    import tracemalloc
+    setup, run = STAGES[stage]
+    state = setup(ctx)
+    run(state)                                          # 预热：惰性导入、首次分配不计入
+    times, rows = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = run(state)
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(times)
+    return {"stage": stage, "scale": ctx["scale"], "rows": int(rows), "repeat": repeat,
+            "best_s": round(best, 4), "median_s": round(statistics.median(times), 4),
+            "rows_per_s": round(rows / best, 1) if best > 0 else None,
+            "peak_mb": round(peak / 2 ** 20, 1),
+            "maxrss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+def _env() -> dict:
+    import pandas as pd
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    return {"time_utc": dt.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"), "git": rev,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+def compare(results: list[dict], baseline: list[dict], threshold: float = 0.2,
+            min_abs_s: float = 0.05, min_abs_mb: float = 16.0) -> list[dict]:
+    """与基线逐 (stage, scale) 比较；耗时或内存超出基线 threshold 比例（且超过绝对噪声下限）即为回归"""
+    base = {(r["stage"], r["scale"]): r for r in baseline}
+    out = []
+    for r in results:
+        b = base.get((r["stage"], r["scale"]))
+        if b is None:
+            continue
+        d_t = r["best_s"] / b["best_s"] - 1 if b["best_s"] else 0.0
+        d_m = r["peak_mb"] / b["peak_mb"] - 1 if b["peak_mb"] else 0.0
+        slow = d_t > threshold and r["best_s"] - b["best_s"] > min_abs_s
+        fat = d_m > threshold and r["peak_mb"] - b["peak_mb"] > min_abs_mb
+        out.append({"stage": r["stage"], "scale": r["scale"], "time_change": round(d_t, 3),
+                    "mem_change": round(d_m, 3), "regression": bool(slow or fat)})
+    return out
+
+def run_suite(scales: list[str], stages: list[str], repeat: int = 3, weights: str | None = None) -> list[dict]:
+    results = []
+    ctx_mp = mp.get_context("spawn")
+    for scale in scales:
+        data = ensure_data(scale)
+        ctx = {"scale": scale, "data": data, "weights": weights}
+        for stage in stages:
+            if stage in NEEDS_WEIGHTS and not weights:
+                continue
+            # 每个阶段一个全新子进程：内存峰值、导入缓存互不影响
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx_mp) as ex:
+                r = ex.submit(_run_stage, stage, ctx, repeat).result()
+            print(f"[BENCH] {scale:>2} {stage:<20} best {r['best_s']:>9.4f}s  median {r['median_s']:>9.4f}s  "
+                  f"{r['rows']:>10} rows  peak {r['peak_mb']:>8.1f}MB  rss {r['maxrss_mb']:>8.1f}MB")
+            results.append(r)
+    return results
+
+def main():
+    ap = argparse.ArgumentParser("Offline CPU benchmark suite")
+    ap.add_argument("--scales", default="xs,s", help=f"逗号分隔，可选 {','.join(SCALES)}")
+    ap.add_argument("--stages", default="all", help=f"逗号分隔或 all，可选 {','.join(STAGES)}")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--weights", default=None, help="给出 .pt/.onnx 时加测 detect_single / detect_tiles")
+    ap.add_argument("--baseline", default="bench/baseline.json")
+    ap.add_argument("--threshold", type=float, default=0.2, help="回归阈值（相对基线的比例）")
+    ap.add_argument("--update-baseline", dest="update_baseline", action="store_true", help="把本次结果写为基线")
+    ap.add_argument("--fail", action="store_true", help="有回归时以退出码 2 结束（CI 用）")
+    args = ap.parse_args()
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    stages = list(STAGES) if args.stages == "all" else [s.strip() for s in args.stages.split(",") if s.strip()]
+    bad = [s for s in scales if s not in SCALES] + [s for s in stages if s not in STAGES]
+    if bad:
+        raise SystemExit(f"Unknown scale/stage: {bad}")
+
+    results = run_suite(scales, stages, args.repeat, args.weights)
+    doc = {"env": _env(), "results": results}
+    base_path = Path(args.baseline)
+    if base_path.exists():
+        cmp = compare(results, json.loads(base_path.read_text(encoding="utf-8"))["results"], args.threshold)
+        doc["comparison"] = {"baseline": str(base_path), "threshold": args.threshold, "stages": cmp}
+        for c in cmp:
+            flag = "REGRESSION" if c["regression"] else "ok"
+            print(f"[CMP] {c['scale']:>2} {c['stage']:<20} time {c['time_change']:+.1%}  mem {c['mem_change']:+.1%}  {flag}")
+    RESULT_DIR.mkdir(parents=True, exist_ok=True)
+    out = RESULT_DIR / f"bench_{dt.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
+    out.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+    print("[OK] results:", out)
+    if args.update_baseline:
+        base_path.parent.mkdir(parents=True, exist_ok=True)
+        base_path.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+        print("[OK] baseline:", base_path)
+    if args.fail and any(c["regression"] for c in doc.get("comparison", {}).get("stages", [])):
+        raise SystemExit(2)
+
+if __name__ == "__main__":
+    main()
+
+'''
+python bench_suite.py --scales xs,s --update-baseline          # 建立基线
+python bench_suite.py --scales xs,s --fail                     # 之后每次改动对比基线，回归时退出码 2
+python bench_suite.py --scales s --stages detect_single,detect_tiles --weights ./yolo11n-obb.onnx
+'''
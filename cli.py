@@ -0,0 +1,140 @@
+# cli.py
+# 统一入口：python cli.py <子命令> [参数...]
+#   模块级只导入标准库；子命令用到的脚本（及其 pandas / torch / ultralytics / requests 依赖）在分派时才 import，
+#   轻量命令（inspect / alerts / gen-data）不加载 torch / ultralytics。
+#   转发型子命令把其余参数原样交给对应脚本的 main()（-h 看该脚本自己的帮助）；inspect / alerts 在本文件实现。
+#   每次分派在 stderr 报告子命令模块的导入耗时与已加载的重型库（-q 关闭）
+from __future__ import annotations
+import argparse, importlib, sys, time
+
+_T0 = time.perf_counter()
+HEAVY_MODULES = ("torch", "ultralytics", "cv2", "onnxruntime", "pandas", "numpy", "pyarrow", "scipy", "requests")
+
+# 子命令 -> (模块, 说明)；模块需提供读取 sys.argv 的 main()
+FORWARD = {
+    "gen-data": ("create_load_data", "合成 ADS-B / 雷达压测数据（--sample 改为生成 ./adsb ./radar 小样例）"),
+    "ground-extract": ("create_ground_from_gpt", "图片 -> GPT -> 地面信息 JSON（单图 / 批量）"),
+    "detect": ("eval_detect", "OBB 推理（单图演示 / 批量写检测表）"),
+    "detect-sliced": ("sliced_detect", "超大 GeoTIFF 切片推理"),
+    "serve": ("detect_server", "常驻模型检测服务"),
+    "train": ("train_detect", "YOLO11-OBB 训练"),
+    "eval": ("eval_obb", "检测表旋转框 mAP 评测"),
+    "onnx": ("onnx_backend", "ONNX 导出 / ONNX Runtime 推理"),
+    "fuse": ("track_fusion", "雷达 <-> ADS-B 航迹关联融合"),
+    "anomaly": ("kinematic_anomaly", "运动学一致性异常检测（流式）"),
+    "geo-join": ("geo_join", "检测框 -> 经纬度，并与航迹 / 地面 area 空间关联"),
+    "bench": ("bench_suite", "离线 CPU 基准测试"),
+}
+NATIVE = {
+    "inspect": "加载 ADS-B / 雷达 / 地面信息并打印行数、时间范围、内存与样例",
+    "alerts": "按 alert_rules 规则表对 info 生成 pred（告警）表",
+}
+
+def _import(name: str, quiet: bool):
+    t0, fresh = time.perf_counter(), name not in sys.modules
+    mod = importlib.import_module(name)
+    if fresh and not quiet:
+        heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+        print(f"[cli] import {name}: {(time.perf_counter() - t0) * 1000:.0f} ms "
+              f"(startup {(time.perf_counter() - _T0) * 1000:.0f} ms; loaded: {', '.join(heavy) or 'stdlib only'})",
+              file=sys.stderr)
+    return mod
+
+def _forward(cmd: str, argv: list[str], quiet: bool):
+    name = FORWARD[cmd][0]
+    if cmd == "gen-data" and "--sample" in argv:
+        for m in ("create_adsb_data", "create_radar_data"):
+            _import(m, quiet).main()
+        return
+    mod = _import(name, quiet)
+    sys.argv = [f"cli.py {cmd}", *argv]
+    mod.main()
+
+def _inspect(argv: list[str], quiet: bool):
+    ap = argparse.ArgumentParser("cli.py inspect", description=NATIVE["inspect"])
+    ap.add_argument("kind", choices=["adsb", "radar", "ground"])
+    ap.add_argument("--root", default="", help="默认 ./adsb/info、./radar/info（--pred 时为 */pred）、ground/store")
+    ap.add_argument("--pred", action="store_true", help="读 pred 表而不是 info")
+    ap.add_argument("--head", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=0, help="解析进程数（0=按 CPU 核数，1=不起进程池）")
+    ap.add_argument("--no_cache", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.kind == "ground":
+        gio = _import("ground_io", quiet)
+        df = gio.load_ground_info(args.root or gio.DEFAULT_STORE)
+        print(f"[OK] ground: {len(df)} records")
+        if len(df):
+            print(df.head(args.head).to_string())
+        return
+    tag = f"{args.kind}_{'pred' if args.pred else 'info'}"
+    io = _import(f"{args.kind}_io", quiet)
+    schema = _import("feed_schema", quiet)
+    root = args.root or f"./{args.kind}/{'pred' if args.pred else 'info'}"
+    t0 = time.perf_counter()
+    df = getattr(io, f"load_{tag}")(root, cache=not args.no_cache, workers=args.workers)
+    dt = time.perf_counter() - t0
+    rep = schema.memory_report(df)
+    print(f"[OK] {tag}: {len(df)} rows, {rep['total_mb']} MB, loaded in {dt:.2f}s from {root}")
+    if len(df) and schema.TIME_COL in df.columns:
+        print(f"     time {df[schema.TIME_COL].min()} .. {df[schema.TIME_COL].max()}")
+    if len(df):
+        print(df.head(args.head).to_string())
+
+def _alerts(argv: list[str], quiet: bool):
+    ap = argparse.ArgumentParser("cli.py alerts", description=NATIVE["alerts"])
+    ap.add_argument("kind", choices=["adsb", "radar"])
+    ap.add_argument("--root", default="", help="默认 ./adsb/info 或 ./radar/info")
+    ap.add_argument("--every", type=int, default=1, help="每 N 行取一条（与样例脚本的 every=5 一致时传 5）")
+    ap.add_argument("--out", default="", help="写出 pred 表（.csv / .json / .parquet）；缺省只打印统计")
+    args = ap.parse_args(argv)
+
+    io = _import(f"{args.kind}_io", quiet)
+    rules = _import("alert_rules", quiet)
+    df = getattr(io, f"load_{args.kind}_info")(args.root or f"./{args.kind}/info")
+    pred = getattr(rules, f"{args.kind}_alerts")(df, every=args.every)
+    print(f"[OK] {args.kind}: {len(df)} rows -> {len(pred)} pred rows")
+    print(pred["alert"].value_counts().to_string())
+    if args.out:
+        from pathlib import Path
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        if out.suffix.lower() == ".parquet":
+            pred.to_parquet(out, index=False)
+        elif out.suffix.lower() == ".json":
+            pred.to_json(out, orient="records", date_format="iso", force_ascii=False)
+        else:
+            pred.to_csv(out, index=False)
+        print("[OK] pred ->", out)
+
+def main(argv: list[str] | None = None):
+    width = max(map(len, [*FORWARD, *NATIVE]))
+    table = "\n".join([f"  {k:<{width}}  {v}" for k, v in NATIVE.items()] +
+                      [f"  {k:<{width}}  {v[1]}  [{v[0]}.py]" for k, v in FORWARD.items()])
+    ap = argparse.ArgumentParser("cli.py", formatter_class=argparse.RawDescriptionHelpFormatter,
+                                 description="统一入口；子命令的参数见 python cli.py <子命令> -h",
+                                 epilog="子命令：\n" + table)
+    ap.add_argument("-q", "--quiet", action="store_true", help="不报告导入耗时")
+    ap.add_argument("cmd", choices=[*NATIVE, *FORWARD], metavar="command", help="见下方子命令表")
+    ap.add_argument("args", nargs=argparse.REMAINDER, help="子命令参数")
+    args = ap.parse_args(argv)
+    if args.cmd == "inspect":
+        _inspect(args.args, args.quiet)
+    elif args.cmd == "alerts":
+        _alerts(args.args, args.quiet)
+    else:
+        _forward(args.cmd, args.args, args.quiet)
+
+if __name__ == "__main__":
+    main()
+
+'''
+python cli.py inspect adsb --root ./loadtest/bench/xs/adsb/info --head 3
+python cli.py alerts radar --out ./radar/pred/radar_pred_rules.csv
+python cli.py gen-data --kind both --targets 200 --duration 600 --out ./loadtest/small
+python cli.py gen-data --sample
+python cli.py detect --weights ./yolo11n-obb.pt --source ./image/origin --out ./image/pred_batch/detections.parquet
+python cli.py train --data_root ./data --data dota8.yaml --epochs 50
+python cli.py eval --labels ./data/datasets/dota8/labels/val --det ./image/pred_batch/detections.parquet
+python cli.py -q geo-join --det ./image/pred_sliced/detections.parquet --ground ground/store
+'''
@@ -41,28 +41,87 @@ def gen_adsb_msgs(n=150, seed=2025):
             })
     return rows
 
+ID_BLOCK = 256   # 随机数按 ID_BLOCK 个目标编号一块取种子：同一 seed 下每个目标的数据与分片/进程数无关
+
+def id_blocks(id_offset: int, n: int):
+    """[id_offset, id_offset+n) 按 ID_BLOCK 对齐切块，产出 (块号, 块内起点, 块内终点)"""
+    end, b = id_offset + n, id_offset // ID_BLOCK
+    while b * ID_BLOCK < end:
+        yield b, max(id_offset - b * ID_BLOCK, 0), min(end - b * ID_BLOCK, ID_BLOCK)
+        b += 1
+
+def gen_adsb_frame(n_aircraft=1000, duration_s=3600, step_s=2.0, start_time=None, seed=2025,
+                   id_offset=0, emergency_p=1e-4, center=(31.20, 121.40), spread_deg=1.5):
+    """
+    向量化生成 ADS-B 报文（压测用）：n_aircraft 架飞机 × duration_s/step_s 帧，返回 DataFrame。
+    航迹按速度/航向积分，航向带缓慢转弯、高度按爬升率积分；
+    随机数按目标编号块（ID_BLOCK）取种子 [seed, 块号]，同一 seed 下每个目标的结果与 id_offset 切分方式无关。
+    """
+    import numpy as np, pandas as pd
+    n, T = int(n_aircraft), max(1, int(duration_s // step_s))
+    B = ID_BLOCK
+    parts = []
+    for blk, lo, hi in id_blocks(id_offset, n):
+        rng = np.random.default_rng([seed, blk])
+        d = {
+            "lat0": center[0] + rng.uniform(-spread_deg, spread_deg, B),
+            "lon0": center[1] + rng.uniform(-spread_deg, spread_deg, B),
+            "gs": rng.uniform(110, 230, B)[:, None] + rng.normal(0, 2.0, (B, T)),
+            "turn": rng.normal(0, 0.15, B)[:, None],                    # deg/step
+            "trk0": rng.uniform(0, 360, B)[:, None], "trk_noise": rng.normal(0, 0.2, (B, T)),
+            "roc": rng.normal(0, 2.0, (B, T)),
+            "alt0": rng.uniform(2000, 12000, B)[:, None],
+            "emerg": rng.random((B, T)) < emergency_p,
+            "squawk": rng.choice(np.array(["7500", "7600", "7700"]), (B, T)),
+            "nacp": rng.integers(7, 11, (B, T), dtype="int8"),
+            "nic": rng.integers(6, 9, (B, T), dtype="int8"),
+        }
+        parts.append({k: v[lo:hi] for k, v in d.items()})
+    r = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+    base_t = pd.Timestamp(start_time if start_time is not None else datetime.utcnow().replace(microsecond=0))
+    base_t = base_t.tz_localize("UTC") if base_t.tzinfo is None else base_t.tz_convert("UTC")
+    ids = np.arange(id_offset, id_offset + n)
+    icao24 = np.char.mod("%06x", (0x780000 + ids) % 0xFFFFFF)
+    prefixes = np.array(["MU", "CA", "CZ", "HU", "FM", "CCA", "CSN", "CES"])
+    callsign = np.char.add(prefixes[ids % len(prefixes)], np.char.mod("%04d", ids % 10000))
+
+    gs = r["gs"]
+    trk = (r["trk0"] + r["turn"] * np.arange(T) + r["trk_noise"]) % 360
+    roc = r["roc"]
+    alt = r["alt0"] * 3.28084 + np.cumsum(roc * step_s * 3.28084, axis=1)
+    dist_m = gs * step_s
+    rad = np.radians(trk)
+    dlat = dist_m * np.cos(rad) / 111_195.0
+    lat = r["lat0"][:, None] + np.cumsum(dlat, axis=1) - dlat[:, :1]
+    dlon = dist_m * np.sin(rad) / (111_195.0 * np.cos(np.radians(lat)))
+    lon = r["lon0"][:, None] + np.cumsum(dlon, axis=1) - dlon[:, :1]
+
+    squawk = np.where(r["emerg"], r["squawk"], "")
+    t = base_t + pd.to_timedelta(np.arange(T) * step_s, unit="s")
+    return pd.DataFrame({
+        "timestamp_utc": np.tile(t.to_numpy(), n),
+        "icao24": np.repeat(icao24, T),
+        "callsign": np.repeat(callsign, T),
+        "lat": lat.ravel().round(6),
+        "lon": lon.ravel().round(6),
+        "alt_baro_ft": alt.ravel().round(1),
+        "gs_mps": gs.ravel().round(2),
+        "trk_deg": trk.ravel().round(2),
+        "roc_mps": roc.ravel().round(2),
+        "squawk": squawk.ravel(),
+        "nacp": r["nacp"].ravel(),
+        "nic": r["nic"].ravel(),
+        "src": "adsb",
+    })
+
 def simple_alerts(rows):
-    """构造一个非常轻量的告警示例：低高度+低速 或 紧急应答码"""
-    preds = []
-    for r in rows[::5]:
-        low_alt = r["alt_baro_ft"] < 3000  # 仅示例
-        low_spd = r["gs_mps"] < 120
-        emer    = r["squawk"] in {"7500","7600","7700"}
-        alert   = "emergency" if emer else ("watch" if (low_alt and low_spd) else "normal")
-        score   = 0.95 if emer else (0.75 if (low_alt and low_spd) else 0.35)
-        preds.append({
-            "timestamp_utc": r["timestamp_utc"],
-            "icao24": r["icao24"],
-            "callsign": r["callsign"],
-            "lat": r["lat"],
-            "lon": r["lon"],
-            "alt_baro_ft": r["alt_baro_ft"],
-            "gs_mps": r["gs_mps"],
-            "trk_deg": r["trk_deg"],
-            "alert": alert,
-            "score": score
-        })
-    return preds
+    """构造一个非常轻量的告警示例：低高度+低速 或 紧急应答码（规则见 alert_rules.ADSB_RULES）"""
+    import pandas as pd
+    from alert_rules import adsb_alerts
+    if not rows:
+        return []
+    return adsb_alerts(pd.DataFrame(rows), every=5).to_dict("records")
 
 def write_csv(path, rows):
     with path.open("w", newline="", encoding="utf-8") as f:
@@ -73,7 +132,7 @@ def write_json(path, rows):
     with path.open("w", encoding="utf-8") as f:
         json.dump(rows, f, ensure_ascii=False, indent=2)
 
-if __name__ == "__main__":
+def main():
     ensure_dirs()
     msgs = gen_adsb_msgs()
     preds = simple_alerts(msgs)
@@ -83,3 +142,6 @@ if __name__ == "__main__":
     p3 = DIR_PRED / "adsb_pred_sample.csv";   write_csv(p3, preds)
     p4 = DIR_PRED / "adsb_pred_sample.json";  write_json(p4, preds)
     print("[OK] ADS-B 数据已生成：", p1, p2, p3, p4, sep="\n- ")
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 from __future__ import annotations
 from pathlib import Path
 import argparse, os, json, base64, csv, datetime as dt
+import glob, random, threading, time, uuid
+import metrics
 
 # --------- Service Config (可用环境变量覆盖) ----------
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.chatanywhere.tech/v1")
@@ -72,39 +74,105 @@ def _load_api_key() -> str:
         raise SystemExit("API key not found. Set OPENAI_API_KEY or create secrets/.openai_api_key")
     return key
 
-def _img_to_data_uri(path: Path) -> str:
+def _img_to_data_uri(path: Path, data: bytes | None = None) -> str:
     mime = "image/jpeg" if path.suffix.lower() in {".jpg", ".jpeg"} else "image/png"
-    b64 = base64.b64encode(path.read_bytes()).decode("utf-8")
+    b64 = base64.b64encode(path.read_bytes() if data is None else data).decode("utf-8")
     return f"data:{mime};base64,{b64}"
 
-def _client(api_key: str):
+def _client(api_key: str, base_url: str | None = None, pool_size: int = 10):
     import requests
+    from requests.adapters import HTTPAdapter
     s = requests.Session()
     s.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
-    s.base_url = OPENAI_BASE_URL.rstrip("/")
+    # 连接池大小与并发数一致，批量模式下所有线程复用同一批 keep-alive 连接
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("http://", adapter); s.mount("https://", adapter)
+    s.base_url = (base_url or OPENAI_BASE_URL).rstrip("/")
     return s
 
-def _chat_vision(s, model: str, data_uri: str, user_prompt: str) -> dict:
+_IMG_PLACEHOLDER = "__IMAGE_DATA_URI__"
+
+def _chat_vision(s, model: str, data_uri, user_prompt: str) -> dict:
+    """data_uri 可以是 data:... 字符串，也可以是 image_prep.PreparedImage（此时 base64 流式写入请求体）"""
     import json as pyjson
+    from image_prep import PreparedImage, StreamingBody
+    streamed = isinstance(data_uri, PreparedImage)
     payload = {
         "model": model,
         "messages": [
             {"role": "system", "content": "You are a precise data extractor that returns ONLY valid JSON."},
             {"role": "user", "content": [
                 {"type": "text", "text": (user_prompt.strip() or DEFAULT_PROMPT)},
-                {"type": "image_url", "image_url": {"url": data_uri}}
+                {"type": "image_url", "image_url": {"url": _IMG_PLACEHOLDER if streamed else data_uri}}
             ]}
         ],
         "temperature": 0.0,
         "response_format": {"type": "json_object"}
     }
     url = s.base_url + "/chat/completions"
-    r = s.post(url, data=pyjson.dumps(payload), timeout=120)
-    r.raise_for_status()
-    out = r.json()
+    with metrics.timer("gpt.encode"):
+        if streamed:
+            head, tail = pyjson.dumps(payload).split(_IMG_PLACEHOLDER, 1)
+            body = StreamingBody(head, data_uri, tail)
+        else:
+            body = pyjson.dumps(payload)
+    metrics.count("gpt.requests")
+    metrics.count("gpt.bytes_sent", len(body))
+    with metrics.timer("gpt.request"):
+        r = s.post(url, data=body, timeout=120)
+        r.raise_for_status()
+        out = r.json()
     txt = out["choices"][0]["message"]["content"]
     return json.loads(txt)
 
+class TokenBucket:
+    """令牌桶限速：rate 个请求/秒，允许 burst 个突发；线程安全"""
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate, self.cap = float(rate), max(1, int(burst))
+        self.tokens, self.t = float(self.cap), time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.cap, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def _chat_vision_retry(s, model: str, data_uri: str, user_prompt: str,
+                       bucket: TokenBucket | None = None, max_retries: int = 5, backoff: float = 1.0) -> dict:
+    """_chat_vision + 限速 + 对 429/5xx/连接错误做指数退避重试（优先遵守 Retry-After）"""
+    import requests
+    for attempt in range(max_retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return _chat_vision(s, model, data_uri, user_prompt)
+        except requests.HTTPError as e:
+            code = e.response.status_code if e.response is not None else None
+            metrics.count(f"gpt.http_{code}")
+            if code not in RETRY_STATUS or attempt == max_retries:
+                raise
+            ra = e.response.headers.get("Retry-After") if e.response is not None else None
+            delay = float(ra) if ra and ra.replace(".", "", 1).isdigit() else backoff * 2 ** attempt
+        except (requests.ConnectionError, requests.Timeout):
+            metrics.count("gpt.conn_errors")
+            if attempt == max_retries:
+                raise
+            delay = backoff * 2 ** attempt
+        metrics.count("gpt.retries")
+        time.sleep(delay * (0.5 + random.random() / 2))
+    raise RuntimeError("unreachable")
+
 def _validate_and_fix(d: dict) -> dict:
     # 保证核心字段存在；对扩展字段不做强制，但尽量保留原样
     req = ["object_type","area","time_utc","credibility","evidence","notes","provider","schema_version"]
@@ -132,50 +200,222 @@ def _validate_and_fix(d: dict) -> dict:
     d["schema_version"] = "1.0"
     return d
 
+def _cached_record_id(key: str, i: int) -> str:
+    return uuid.uuid5(uuid.NAMESPACE_OID, f"{key}/{i}").hex
+
+def _extract_records(s, model: str, img: Path, prompt: str, prep=None, bucket: TokenBucket | None = None,
+                     max_retries: int = 0, cache=None, refresh: bool = False) -> tuple[list[dict], bool]:
+    """
+    图片 -> 校验后的记录列表（切块时每块一条，带 tile 字段）；cache 命中时不解码图片也不发请求。
+    启用 cache 时 record_id 由缓存键 + 块序号确定（随记录写入缓存）：命中后再次 store.append 只会在加载时按 record_id 去重，
+    不会出现同一提取结果的多条记录。返回 (records, 是否命中缓存)
+    """
+    from image_prep import PrepOptions, prepare_image, fmt_saving
+    prep = prep or PrepOptions()
+    key = None
+    if cache is not None:
+        from gpt_cache import cache_key, file_sha256
+        with metrics.timer("gpt.cache_lookup"):
+            key = cache_key(file_sha256(img), prompt.strip() or DEFAULT_PROMPT, model, s.base_url, prep.tag())
+            recs = None if refresh else cache.get(key)
+        if recs is not None:
+            metrics.count("gpt.cache_hits")
+            for i, rec in enumerate(recs):                 # 旧缓存条目没有 record_id
+                rec.setdefault("record_id", _cached_record_id(key, i))
+            return recs, True
+    with metrics.timer("gpt.prep"):
+        parts = prepare_image(img, prep)
+    if metrics.enabled():
+        metrics.count("gpt.image_bytes_in", img.stat().st_size)
+        metrics.count("gpt.image_bytes_out", sum(len(p.data) for p in parts))
+    print(fmt_saving(img.name, img.stat().st_size, parts))
+    recs = []
+    for part in parts:
+        rec = _validate_and_fix(_chat_vision_retry(s, model, part, prompt, bucket, max_retries))
+        if part.tile is not None:
+            x, y, w, h = part.tile
+            rec["tile"] = {"x": x, "y": y, "w": w, "h": h}
+        recs.append(rec)
+    if cache is not None:
+        for i, rec in enumerate(recs):
+            rec["record_id"] = _cached_record_id(key, i)
+        cache.put(key, recs, {"image": str(img), "model": model})
+    return recs, False
+
 def _flatten_for_csv(rec: dict) -> dict:
     # 将嵌套字段转为字符串，便于 CSV 预览与后续 json.loads
     f = rec.copy()
     for k in ("area","evidence","environment","location_estimate","entities",
               "orderliness","activities","security_presence",
-              "notable_observations","risk_indicators","uncertainties"):
+              "notable_observations","risk_indicators","uncertainties","tile"):
         if k in f:
             f[k] = json.dumps(f[k], ensure_ascii=False)
     return f
 
+# -------------------- Batch --------------------
+IMAGE_EXTS = {".jpg", ".jpeg", ".png"}
+
+def _iter_images(spec: str) -> list[Path]:
+    """目录 / glob 通配 / 清单文件（.txt 每行一个路径，.jsonl 或 .csv 取 image 字段）"""
+    p = Path(spec).expanduser()
+    if p.is_dir():
+        return sorted(q.resolve() for q in p.rglob("*") if q.suffix.lower() in IMAGE_EXTS)
+    if p.is_file() and p.suffix.lower() in {".txt", ".lst"}:
+        lines = [l.strip() for l in p.read_text(encoding="utf-8").splitlines()]
+        return [Path(l).expanduser().resolve() for l in lines if l and not l.startswith("#")]
+    if p.is_file() and p.suffix.lower() == ".jsonl":
+        rows = [json.loads(l) for l in p.read_text(encoding="utf-8").splitlines() if l.strip()]
+        return [Path(r["image"]).expanduser().resolve() for r in rows]
+    if p.is_file() and p.suffix.lower() == ".csv":
+        with p.open(newline="", encoding="utf-8") as f:
+            return [Path(r["image"]).expanduser().resolve() for r in csv.DictReader(f)]
+    return sorted(Path(q).resolve() for q in glob.glob(spec, recursive=True) if Path(q).suffix.lower() in IMAGE_EXTS)
+
+def _done_images(out: Path) -> set[str]:
+    # 断点续跑：输出文件中已有 source_image 的图片直接跳过
+    done = set()
+    if out.exists():
+        for line in out.read_text(encoding="utf-8").splitlines():
+            try:
+                done.add(json.loads(line)["source_image"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+def run_batch(images: list[Path], out: Path, s, model: str, prompt: str, provider: str,
+              concurrency: int = 8, rps: float = 0.0, burst: int = 1, max_retries: int = 5,
+              cache=None, refresh: bool = False, prep=None, store=None) -> dict:
+    """并发处理图片，按完成顺序逐行写入 out（JSONL，同时追加到 store）；失败写入 <out>.errors.jsonl；返回统计"""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    done = _done_images(out)
+    todo = [p for p in images if str(p) not in done]
+    bucket = TokenBucket(rps, burst) if rps > 0 else None
+    err_path = out.with_name(out.name + ".errors.jsonl")
+    stats = {"total": len(images), "skipped": len(images) - len(todo), "ok": 0, "failed": 0}
+    t0 = time.perf_counter()
+
+    def work(img: Path) -> list[dict]:
+        recs, _ = _extract_records(s, model, img, prompt, prep, bucket, max_retries, cache, refresh)
+        for rec in recs:
+            if provider:
+                rec["provider"] = provider
+            rec["source_image"] = str(img)
+        return recs
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("a", encoding="utf-8") as fo, ThreadPoolExecutor(max_workers=concurrency) as ex:
+        futs = {ex.submit(work, p): p for p in todo}
+        for fut in as_completed(futs):
+            img = futs[fut]
+            try:
+                recs = fut.result()
+            except Exception as e:
+                stats["failed"] += 1
+                with err_path.open("a", encoding="utf-8") as fe:
+                    fe.write(json.dumps({"source_image": str(img), "error": repr(e)}, ensure_ascii=False) + "\n")
+                print(f"[ERR] {img}: {e}")
+                continue
+            if store is not None:
+                store.append(recs)
+            fo.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recs)); fo.flush()
+            stats["ok"] += 1
+            print(f"[OK] ({stats['ok'] + stats['failed']}/{len(todo)}) {img.name}")
+    dt_s = time.perf_counter() - t0
+    stats["seconds"] = round(dt_s, 3)
+    stats["images_per_s"] = round(stats["ok"] / dt_s, 3) if dt_s > 0 else 0.0
+    if cache is not None:
+        stats["cache"] = cache.summary()
+    return stats
+
 # -------------------- CLI --------------------
 def main():
     ap = argparse.ArgumentParser("Universal Ground Info: image + prompt -> GPT -> JSON/CSV")
-    ap.add_argument("--image", required=True, help="本地图片路径（jpg/png）")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--image", help="本地图片路径（jpg/png）")
+    src.add_argument("--batch", help="批量模式：图片目录 / glob 通配 / 清单文件（.txt/.jsonl/.csv）")
     ap.add_argument("--prompt", default="", help="覆盖默认侦查员提示词（可选）")
     ap.add_argument("--provider", default="ops_team", help="写入 provider 字段")
     ap.add_argument("--base_url", default=OPENAI_BASE_URL, help="OpenAI 兼容服务地址")
     ap.add_argument("--model", default=OPENAI_MODEL, help="模型名")
+    ap.add_argument("--out", default="", help="批量模式输出 JSONL（同一路径再次运行即断点续跑）")
+    ap.add_argument("--concurrency", type=int, default=8, help="批量模式并发请求数")
+    ap.add_argument("--rps", type=float, default=0.0, help="批量模式限速（请求/秒，0 为不限）")
+    ap.add_argument("--burst", type=int, default=1, help="限速令牌桶容量")
+    ap.add_argument("--retries", type=int, default=5, help="429/5xx 最大重试次数")
+    ap.add_argument("--no-cache", dest="no_cache", action="store_true", help="不读写本地响应缓存")
+    ap.add_argument("--refresh", action="store_true", help="忽略已有缓存，重新请求并覆盖")
+    ap.add_argument("--cache_dir", default="ground/.cache/vision", help="响应缓存目录")
+    ap.add_argument("--cache_max_mb", type=float, default=256, help="缓存总大小上限（MB），超出按 LRU 淘汰")
+    ap.add_argument("--cache_max_age_days", type=float, default=30, help="缓存有效期（天）")
+    ap.add_argument("--max_side", type=int, default=2048, help="上传前缩放到的最长边（0 不缩放）")
+    ap.add_argument("--img_format", choices=["jpeg", "webp", "keep"], default="jpeg", help="重新编码格式；keep 原样上传")
+    ap.add_argument("--quality", type=int, default=85, help="JPEG/WebP 质量")
+    ap.add_argument("--max_kb", type=int, default=0, help="单张上传大小上限（KB），超出则逐步降质量")
+    ap.add_argument("--tile_over", type=int, default=0, help="原图最长边超过该值时切块分别请求（0 不切）")
+    ap.add_argument("--tile_size", type=int, default=2048, help="切块边长（原图像素）")
+    ap.add_argument("--store", default="ground/store", help="地面信息追加存储目录（ground_io）")
+    ap.add_argument("--legacy_files", action="store_true", help="单图模式额外写 ground_info_gpt_<ts>.json/.csv")
+    metrics.add_arguments(ap)
     args = ap.parse_args()
+    metrics.setup_from_args(args, "create_ground_from_gpt")
+
+    from image_prep import PrepOptions
+    prep = PrepOptions(max_side=args.max_side, fmt=args.img_format, quality=args.quality,
+                       max_kb=args.max_kb, tile_over=args.tile_over, tile_size=args.tile_size)
+
+    cache = None
+    if not args.no_cache:
+        from gpt_cache import ResponseCache
+        cache = ResponseCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024),
+                              args.cache_max_age_days * 86400)
+
+    from ground_io import GroundStore
+    store = GroundStore(args.store)
+    GROUND_DIR.mkdir(parents=True, exist_ok=True)
+    os.environ["OPENAI_BASE_URL"] = args.base_url
+
+    if args.batch:
+        images = _iter_images(args.batch)
+        if not images:
+            raise SystemExit(f"No images matched: {args.batch}")
+        out = Path(args.out) if args.out else \
+            GROUND_DIR / f"ground_info_gpt_batch_{dt.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        s = _client(_load_api_key(), args.base_url, pool_size=args.concurrency)
+        stats = run_batch(images, out, s, args.model, args.prompt, args.provider,
+                          args.concurrency, args.rps, args.burst, args.retries, cache, args.refresh, prep, store)
+        print("[OK] JSONL:", out)
+        print("[STAT]", json.dumps(stats, ensure_ascii=False))
+        return
 
     img = Path(args.image).expanduser().resolve()
     if not img.exists():
         raise SystemExit(f"Image not found: {img}")
 
-    GROUND_DIR.mkdir(parents=True, exist_ok=True)
-
-    os.environ["OPENAI_BASE_URL"] = args.base_url
     api_key = _load_api_key()
-    s = _client(api_key)
+    s = _client(api_key, args.base_url)
 
-    data_uri = _img_to_data_uri(img)
-    rec = _chat_vision(s, args.model, data_uri, args.prompt)
-    rec = _validate_and_fix(rec)
+    t0 = time.perf_counter()
+    recs, hit = _extract_records(s, args.model, img, args.prompt, prep, cache=cache, refresh=args.refresh)
+    print(f"[INFO] {'cache hit' if hit else 'remote call'} in {time.perf_counter() - t0:.3f}s")
+    if cache is not None:
+        print("[STAT] cache:", json.dumps(cache.summary(), ensure_ascii=False))
     if args.provider:
-        rec["provider"] = args.provider
+        for rec in recs:
+            rec["provider"] = args.provider
+    rec_ids = store.append(recs)
+    print(f"[OK] store: {args.store} (+{len(rec_ids)} record(s))")
+    if not args.legacy_files:
+        return
 
     ts = dt.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     json_path = GROUND_DIR / f"ground_info_gpt_{ts}.json"
     csv_path  = GROUND_DIR / f"ground_info_gpt_{ts}.csv"
 
-    json_path.write_text(json.dumps([rec], ensure_ascii=False, indent=2), encoding="utf-8")
+    json_path.write_text(json.dumps(recs, ensure_ascii=False, indent=2), encoding="utf-8")
+    rows = [_flatten_for_csv(r) for r in recs]
     with csv_path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=list(_flatten_for_csv(rec).keys()))
-        w.writeheader(); w.writerow(_flatten_for_csv(rec))
+        w = csv.DictWriter(f, fieldnames=list(dict.fromkeys(k for r in rows for k in r)))
+        w.writeheader(); w.writerows(rows)
 
     print("[OK] JSON:", json_path)
     print("[OK] CSV :", csv_path)
@@ -195,6 +435,24 @@ python create_ground_from_gpt.py \
   --base_url https://api.chatanywhere.tech/v1 \
   --model gpt-4o-mini
 
+# 3) 批量模式（目录/通配/清单），并发 8、限速 5 req/s；中断后用同一 --out 重跑即续跑
+python create_ground_from_gpt.py --batch ./image/origin --concurrency 8 --rps 5 \
+  --out ground/info/ground_info_gpt_batch.jsonl
+
+# 4) 离线压测：本地 OpenAI 兼容桩服务
+python gpt_stub_server.py --port 8000 --latency 0.5 --fail_rate 0.1 &
+OPENAI_API_KEY=dummy python create_ground_from_gpt.py --batch ./image/origin \
+  --base_url http://127.0.0.1:8000/v1 --concurrency 16
+
+# 5) 上传前预处理：最长边 1600、WebP、单张不超过 400KB；最长边超过 6000 的场景切 2048 块分别请求
+python create_ground_from_gpt.py --batch ./image/origin --max_side 1600 --img_format webp \
+  --max_kb 400 --tile_over 6000 --tile_size 2048
+
+# 6) 结果默认追加到 ground/store（按日分区 JSONL + 索引），按条件加载：
+python -c "from ground_io import load_ground_info; print(load_ground_info(risk_level='HIGH', object_type='ship'))"
+# 旧的 ground_info_gpt_*.json 可一次性导入；积累较多后合并为 Parquet
+python -c "from ground_io import import_legacy, compact; import_legacy(); compact()"
+
   project_root/
 ├─ ground/
 │  └─ info/                      # GPT 生成的地面信息会写在这里
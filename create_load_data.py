@@ -0,0 +1,86 @@
+# create_load_data.py
+# 压测数据生成：按 seed 确定性地生成大规模 ADS-B / 雷达数据，按目标分片，多进程并行写 CSV/JSON/Parquet
+# 目录结构与 ./adsb、./radar 相同（<out>/adsb/info、<out>/radar/info …），可直接喂给 adsb_io / radar_io
+from __future__ import annotations
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import argparse, os, time
+
+def _write(df, path: Path, fmt: str):
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "csv":
+        df.to_csv(tmp, index=False, date_format="%Y-%m-%dT%H:%M:%S.%fZ")   # 保留小数秒：step 可小于 1s
+    elif fmt == "json":
+        df.to_json(tmp, orient="records", date_format="iso", force_ascii=False)
+    elif fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    os.replace(tmp, path)   # 写完再改名，避免 follow 模式读到半个文件
+
+def _shard_job(kind: str, shard: int, n_targets: int, id_offset: int, duration_s: float, step_s: float,
+               start_time: str, seed: int, fmt: str, out: str, radar_ids: tuple, with_pred: bool) -> tuple[str, int]:
+    from alert_rules import adsb_alerts, radar_alerts
+    if kind == "adsb":
+        from create_adsb_data import gen_adsb_frame
+        df = gen_adsb_frame(n_targets, duration_s, step_s, start_time, seed=seed, id_offset=id_offset)
+        alerts = adsb_alerts
+    else:
+        from create_radar_data import gen_tracks_frame
+        df = gen_tracks_frame(n_targets, duration_s, step_s, start_time, radar_ids=radar_ids,
+                              seed=seed, id_offset=id_offset)
+        alerts = radar_alerts
+    info_dir, pred_dir = Path(out) / kind / "info", Path(out) / kind / "pred"
+    info_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{kind}_info_load_s{seed}_{shard:05d}.{fmt}"
+    _write(df, info_dir / name, fmt)
+    if with_pred:
+        pred_dir.mkdir(parents=True, exist_ok=True)
+        _write(alerts(df, every=5), pred_dir / name.replace("_info_", "_pred_"), fmt)
+    return name, len(df)
+
+def generate(kind: str = "adsb", n_targets: int = 1000, duration_s: float = 3600, step_s: float = 2.0,
+             shards: int = 8, workers: int | None = None, fmt: str = "csv", out: str | Path = "./loadtest",
+             seed: int = 2025, start_time: str = "2025-09-26T00:00:00Z",
+             radar_ids: tuple = ("RADAR-A", "RADAR-B", "RADAR-C"), with_pred: bool = False) -> int:
+    """生成并写出所有分片，返回总行数；目标按编号均匀切到 shards 个文件"""
+    shards = max(1, min(shards, n_targets))
+    per, rem = divmod(n_targets, shards)
+    jobs, off = [], 0
+    for k in range(shards):
+        n = per + (k < rem)
+        jobs.append((kind, k, n, off, duration_s, step_s, start_time, seed, fmt, str(out), tuple(radar_ids), with_pred))
+        off += n
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+        for name, rows in ex.map(_shard_job, *zip(*jobs)):
+            total += rows
+            print(f"[OK] {name}: {rows} rows")
+    return total
+
+def main():
+    ap = argparse.ArgumentParser("Synthetic ADS-B / radar load-test data")
+    ap.add_argument("--kind", choices=["adsb", "radar", "both"], default="both")
+    ap.add_argument("--targets", type=int, default=1000, help="飞机/航迹数量")
+    ap.add_argument("--duration", type=float, default=3600, help="时间跨度（秒）")
+    ap.add_argument("--step", type=float, default=2.0, help="采样间隔（秒）")
+    ap.add_argument("--shards", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--format", choices=["csv", "json", "parquet"], default="csv")
+    ap.add_argument("--out", default="./loadtest")
+    ap.add_argument("--seed", type=int, default=2025)
+    ap.add_argument("--start", default="2025-09-26T00:00:00Z")
+    ap.add_argument("--radar_ids", default="RADAR-A,RADAR-B,RADAR-C")
+    ap.add_argument("--with_pred", action="store_true", help="同时用 alert_rules 写 pred")
+    args = ap.parse_args()
+
+    kinds = ["adsb", "radar"] if args.kind == "both" else [args.kind]
+    for kind in kinds:
+        t0 = time.perf_counter()
+        n = generate(kind, args.targets, args.duration, args.step, args.shards, args.workers, args.format,
+                     args.out, args.seed, args.start, tuple(args.radar_ids.split(",")), args.with_pred)
+        dt = time.perf_counter() - t0
+        print(f"[OK] {kind}: {n} rows in {dt:.1f}s ({n / max(dt, 1e-9):,.0f} rows/s) -> {args.out}")
+
+if __name__ == "__main__":
+    main()
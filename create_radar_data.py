@@ -48,25 +48,76 @@ def gen_tracks(n=120, start_time=None, radar_id="RADAR-A", seed=2025):
             })
     return rows
 
+def gen_tracks_frame(n_tracks=1000, duration_s=3600, step_s=2.0, start_time=None,
+                     radar_ids=("RADAR-A",), seed=2025, id_offset=0,
+                     center=(31.20, 121.40), spread_deg=1.5):
+    """
+    向量化生成雷达航迹（压测用）：n_tracks 条航迹 × duration_s/step_s 帧，按 track 轮流分配给 radar_ids。
+    range_km/az_deg 相对各雷达站（围绕 center 布设）计算；
+    随机数按目标编号块取种子 [seed, 块号, 1]，同一 seed 下每条航迹的结果与 id_offset 切分方式无关。
+    """
+    import numpy as np, pandas as pd
+    from create_adsb_data import ID_BLOCK, id_blocks
+    n, T = int(n_tracks), max(1, int(duration_s // step_s))
+    B = ID_BLOCK
+    parts = []
+    for blk, lo, hi in id_blocks(id_offset, n):
+        rng = np.random.default_rng([seed, blk, 1])
+        d = {
+            "lat0": center[0] + rng.uniform(-spread_deg, spread_deg, B),
+            "lon0": center[1] + rng.uniform(-spread_deg, spread_deg, B),
+            "vel": rng.uniform(120, 230, B)[:, None] + rng.normal(0, 2.5, (B, T)),
+            "turn": rng.normal(0, 0.25, B)[:, None],
+            "hdg0": rng.uniform(0, 360, B)[:, None],
+            "snr": rng.uniform(8, 25, (B, T)),
+            "quality": rng.choice(np.array([0.7, 0.8, 0.9, 1.0]), (B, T)),
+        }
+        parts.append({k: v[lo:hi] for k, v in d.items()})
+    r = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    base_t = pd.Timestamp(start_time if start_time is not None else datetime.utcnow().replace(microsecond=0))
+    base_t = base_t.tz_localize("UTC") if base_t.tzinfo is None else base_t.tz_convert("UTC")
+    ids = np.arange(id_offset, id_offset + n)
+    radar_ids = np.asarray(radar_ids)
+    site_ang = np.radians(np.arange(len(radar_ids)) * 360.0 / len(radar_ids))
+    site_lat = center[0] + 0.5 * spread_deg * np.cos(site_ang) * (len(radar_ids) > 1)
+    site_lon = center[1] + 0.5 * spread_deg * np.sin(site_ang) * (len(radar_ids) > 1)
+    r_idx = ids % len(radar_ids)
+
+    lat0, lon0, vel = r["lat0"], r["lon0"], r["vel"]
+    hdg = (r["hdg0"] + r["turn"] * np.arange(T)) % 360
+    rad = np.radians(hdg)
+    dlat = vel * step_s * np.cos(rad) / 111_195.0
+    lat = lat0[:, None] + np.cumsum(dlat, axis=1) - dlat[:, :1]
+    dlon = vel * step_s * np.sin(rad) / (111_195.0 * np.cos(np.radians(lat)))
+    lon = lon0[:, None] + np.cumsum(dlon, axis=1) - dlon[:, :1]
+    # 相对雷达站的距离/方位
+    north_km = (lat - site_lat[r_idx][:, None]) * 111.195
+    east_km = (lon - site_lon[r_idx][:, None]) * 111.195 * np.cos(np.radians(lat))
+    rng_km = np.hypot(north_km, east_km)
+    az = np.degrees(np.arctan2(east_km, north_km)) % 360
+
+    t = base_t + pd.to_timedelta(np.arange(T) * step_s, unit="s")
+    return pd.DataFrame({
+        "timestamp_utc": np.tile(t.to_numpy(), n),
+        "radar_id": np.repeat(radar_ids[r_idx], T),
+        "track_id": np.repeat(np.char.mod("T%06d", ids), T),
+        "lat": lat.ravel().round(6),
+        "lon": lon.ravel().round(6),
+        "range_km": rng_km.ravel().round(3),
+        "az_deg": az.ravel().round(2),
+        "vel_mps": vel.ravel().round(2),
+        "snr_db": r["snr"].ravel().round(1),
+        "quality": r["quality"].ravel(),
+    })
+
 def gen_preds_from_tracks(tracks):
     """根据 info 生成一个简化的“预测/告警”列表（pred 用）"""
-    # 逻辑：速度>200 且 SNR>15 的航迹，给一个“关注”告警，演示字段
-    preds = []
-    for r in tracks[::5]:  # 每5帧抽一条
-        flag = (r["vel_mps"] > 200) and (r["snr_db"] > 15)
-        preds.append({
-            "timestamp_utc": r["timestamp_utc"],
-            "radar_id": r["radar_id"],
-            "track_id": r["track_id"],
-            "lat": r["lat"],
-            "lon": r["lon"],
-            "az_deg": r["az_deg"],
-            "vel_mps": r["vel_mps"],
-            "snr_db": r["snr_db"],
-            "alert": "watch" if flag else "normal",
-            "score": 0.85 if flag else 0.35
-        })
-    return preds
+    # 逻辑：速度>200 且 SNR>15 的航迹，给一个“关注”告警（规则见 alert_rules.RADAR_RULES），每5帧抽一条
+    import pandas as pd
+    from alert_rules import radar_alerts
+    if not tracks:
+        return []
+    return radar_alerts(pd.DataFrame(tracks), every=5).to_dict("records")
 
 def write_csv(path, rows, fieldnames):
     with path.open("w", newline="", encoding="utf-8") as f:
@@ -78,7 +129,7 @@ def write_json(path, rows):
     with path.open("w", encoding="utf-8") as f:
         json.dump(rows, f, ensure_ascii=False, indent=2)
 
-if __name__ == "__main__":
+def main():
     ensure_dirs()
     tracks = gen_tracks(n=120, radar_id="RADAR-A")
     preds = gen_preds_from_tracks(tracks)
@@ -102,3 +153,6 @@ if __name__ == "__main__":
     print(f"[OK] 写入：{json_info}")
     print(f"[OK] 写入：{csv_pred}")
     print(f"[OK] 写入：{json_pred}")
+
+if __name__ == "__main__":
+    main()
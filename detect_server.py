@@ -0,0 +1,293 @@
+# detect_server.py
+# 常驻检测服务：进程启动时加载一次模型（.pt -> ultralytics YOLO，.onnx -> onnx_backend.OrtObbModel）并预热，
+# HTTP 接收图片，后台线程把并发请求攒成微批（max_batch / max_wait_ms）一起 predict，返回 OBB 检测 JSON。
+#   POST /detect   请求体为图片字节（jpg/png…）；以 --allow_path_root DIR 启动时也接受 JSON {"path": "<DIR 下的路径>"}
+#   GET  /stats    队列深度、批次数、平均批大小、端到端/推理延迟分位数
+#   GET  /health
+# 同文件提供客户端 detect() 与压测子命令 load（并发 N 路，统计 p50/p99 与吞吐）
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import argparse, json, queue, threading, time
+import numpy as np
+
+MAX_BODY_BYTES = 64 * 2 ** 20                             # 单个请求体上限（图片字节）
+
+class MicroBatcher:
+    """单个推理线程：取到第一张图后最多再等 max_wait_ms，凑满 max_batch 立即送出"""
+
+    def __init__(self, model, max_batch: int = 8, max_wait_ms: float = 5.0, predict_kw: dict | None = None):
+        self.model = model
+        self.max_batch, self.max_wait = max(1, max_batch), max_wait_ms / 1000.0
+        self.predict_kw = predict_kw or {}
+        self.q: queue.Queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.lat_e2e: deque = deque(maxlen=10_000)
+        self.lat_infer: deque = deque(maxlen=10_000)
+        self.counts = {"requests": 0, "batches": 0, "images": 0, "errors": 0}
+        self._th = threading.Thread(target=self._loop, daemon=True)
+        self._th.start()
+
+    def submit(self, im: np.ndarray) -> Future:
+        fut = Future()
+        self.q.put((time.perf_counter(), im, fut))
+        return fut
+
+    def _gather(self) -> list:
+        items = [self.q.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < self.max_batch:
+            left = deadline - time.perf_counter()
+            if left <= 0:
+                break
+            try:
+                items.append(self.q.get(timeout=left))
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._gather()
+            t0 = time.perf_counter()
+            try:
+                results = self.model.predict(source=[im for _, im, _ in items], batch=len(items),
+                                             verbose=False, **self.predict_kw)
+            except Exception as e:
+                with self.lock:
+                    self.counts["errors"] += len(items)
+                for *_, fut in items:
+                    fut.set_exception(e)
+                continue
+            t1 = time.perf_counter()
+            with self.lock:
+                self.counts["batches"] += 1
+                self.counts["images"] += len(items)
+                self.lat_infer.append((t1 - t0) * 1000)
+                for t_in, _, _ in items:
+                    self.lat_e2e.append((t1 - t_in) * 1000)
+            for (_, _, fut), r in zip(items, results):
+                fut.set_result(r)                     # JSON 序列化留给各请求线程，推理线程立即取下一批
+
+    def stats(self) -> dict:
+        with self.lock:
+            e2e, inf = np.asarray(self.lat_e2e), np.asarray(self.lat_infer)
+            pct = lambda a, q: round(float(np.percentile(a, q)), 2) if len(a) else None
+            return {**self.counts, "queue_depth": self.q.qsize(),
+                    "mean_batch": round(self.counts["images"] / self.counts["batches"], 2) if self.counts["batches"] else 0.0,
+                    "e2e_ms": {"p50": pct(e2e, 50), "p90": pct(e2e, 90), "p99": pct(e2e, 99)},
+                    "batch_infer_ms": {"p50": pct(inf, 50), "p99": pct(inf, 99)}}
+
+def result_to_json(r) -> dict:
+    """单张图的 OBB 结果 -> 与 detections.DET_COLS 同名字段的 JSON（不含 image_id/frame）"""
+    from detections import _np
+    obb = r.obb
+    n = 0 if obb is None else len(obb)
+    xywhr = _np(obb.xywhr).reshape(n, 5).round(2).tolist() if n else []
+    poly = _np(obb.xyxyxyxy).reshape(n, 8).round(2).tolist() if n else []
+    cls = _np(obb.cls).astype(int).tolist() if n else []
+    conf = _np(obb.conf).round(4).tolist() if n else []
+    keys5, keys8 = ("cx", "cy", "w", "h", "angle"), ("x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4")
+    dets = [{"det": i, "cls": c, "class_name": r.names.get(c, str(c)) if isinstance(r.names, dict) else str(c),
+             "score": s, **dict(zip(keys5, b)), **dict(zip(keys8, p))}
+            for i, (c, s, b, p) in enumerate(zip(cls, conf, xywhr, poly))]
+    h, w = r.orig_img.shape[:2] if getattr(r, "orig_img", None) is not None else (None, None)
+    return {"width": w, "height": h, "detections": dets}
+
+def _resolve_path(obj, path_root: Path | None) -> Path:
+    """JSON 请求体里的 path -> path_root 下的绝对路径；未开启或越界时拒绝"""
+    if path_root is None:
+        raise PermissionError("path input disabled (start server with --allow_path_root)")
+    if not isinstance(obj, dict) or not isinstance(obj.get("path"), str):
+        raise ValueError('JSON body must be {"path": "<file>"}')
+    p = (path_root / obj["path"]).resolve()              # 相对路径按 path_root 解析；绝对路径与 .. 也须落在其下
+    if not p.is_relative_to(path_root):
+        raise PermissionError(f"path outside allowed root: {obj['path']}")
+    return p
+
+def _decode_image(body: bytes, content_type: str, path_root: Path | None = None) -> np.ndarray:
+    import cv2
+    if content_type.startswith("application/json"):
+        im = cv2.imread(str(_resolve_path(json.loads(body), path_root)))
+    elif not body:
+        raise ValueError("empty body")
+    else:
+        im = cv2.imdecode(np.frombuffer(body, np.uint8), cv2.IMREAD_COLOR)
+    if im is None:
+        raise ValueError("cannot decode image")
+    return im
+
+def make_handler(batcher: MicroBatcher, timeout_s: float = 60.0, path_root: str | Path | None = None,
+                 max_body: int = MAX_BODY_BYTES):
+    path_root = Path(path_root).expanduser().resolve() if path_root else None
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, code: int, body: dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            if path == "/stats":
+                return self._send(200, batcher.stats())
+            if path == "/health":
+                return self._send(200, {"ok": True})
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            try:
+                n = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                n = -1
+            if not 0 <= n <= max_body:
+                self.close_connection = True                # 未读走请求体，连接不能复用
+                if n > max_body:
+                    return self._send(413, {"error": f"body exceeds {max_body} bytes"})
+                return self._send(400, {"error": "invalid Content-Length"})
+            body = self.rfile.read(n)
+            if self.path.rstrip("/") != "/detect":
+                return self._send(404, {"error": "not found"})
+            with batcher.lock:
+                batcher.counts["requests"] += 1
+            t0 = time.perf_counter()
+            try:
+                im = _decode_image(body, self.headers.get("Content-Type", ""), path_root)   # 解码在各自请求线程里并行
+            except PermissionError as e:
+                return self._send(403, {"error": str(e)})
+            except (ValueError, KeyError, TypeError) as e:   # 含非 dict 的 JSON 请求体
+                return self._send(400, {"error": str(e)})
+            try:
+                res = result_to_json(batcher.submit(im).result(timeout=timeout_s))
+            except Exception as e:
+                return self._send(500, {"error": repr(e)})
+            res["latency_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            self._send(200, res)
+    return Handler
+
+def serve(model, host: str = "127.0.0.1", port: int = 8100, max_batch: int = 8, max_wait_ms: float = 5.0,
+          predict_kw: dict | None = None, path_root: str | Path | None = None) -> tuple[ThreadingHTTPServer, MicroBatcher]:
+    """path_root 为空时 /detect 只收图片字节；给定目录时另外接受该目录下的 {"path": ...}"""
+    batcher = MicroBatcher(model, max_batch, max_wait_ms, predict_kw)
+    srv = ThreadingHTTPServer((host, port), make_handler(batcher, path_root=path_root))
+    srv.daemon_threads = True
+    return srv, batcher
+
+# -------------------- Client / load generator --------------------
+def detect(url: str, image: str | Path, session=None) -> dict:
+    import requests
+    s = session or requests
+    r = s.post(url.rstrip("/") + "/detect", data=Path(image).read_bytes(),
+               headers={"Content-Type": "application/octet-stream"}, timeout=120)
+    r.raise_for_status()
+    return r.json()
+
+def load_test(url: str, images: list[Path], concurrency: int = 8, n: int = 200) -> dict:
+    """n 个请求由 concurrency 路并发客户端发出（每路一个 keep-alive 会话），返回客户端侧延迟分位数与吞吐"""
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+    bodies = [p.read_bytes() for p in images]
+    local = threading.local()
+    counter = iter(range(n))
+    lock = threading.Lock()
+    lat, errors = [], 0
+
+    def worker():
+        nonlocal errors
+        local.s = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                r = local.s.post(url.rstrip("/") + "/detect", data=bodies[i % len(bodies)],
+                                 headers={"Content-Type": "application/octet-stream"}, timeout=120)
+                ok = r.status_code == 200
+            except requests.RequestException:
+                ok = False
+            dt_ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                if ok:
+                    lat.append(dt_ms)
+                else:
+                    errors += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for _ in range(concurrency):
+            ex.submit(worker)
+    dt_s = time.perf_counter() - t0
+    a = np.asarray(lat)
+    pct = lambda q: round(float(np.percentile(a, q)), 2) if len(a) else None
+    return {"requests": n, "ok": len(lat), "errors": errors, "concurrency": concurrency,
+            "seconds": round(dt_s, 3), "req_per_s": round(len(lat) / dt_s, 2) if dt_s > 0 else 0.0,
+            "p50_ms": pct(50), "p90_ms": pct(90), "p99_ms": pct(99)}
+
+def main():
+    ap = argparse.ArgumentParser("Warm-model OBB detection server with micro-batching")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sv = sub.add_parser("serve")
+    sv.add_argument("--weights", default="./yolo11n-obb.pt", help=".pt（torch）或 .onnx（ONNX Runtime CPU）")
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=8100)
+    sv.add_argument("--max_batch", type=int, default=8)
+    sv.add_argument("--max_wait_ms", type=float, default=5.0, help="凑批最长等待（毫秒）")
+    sv.add_argument("--imgsz", type=int, default=1024)
+    sv.add_argument("--conf", type=float, default=0.25)
+    sv.add_argument("--device", default=None)
+    sv.add_argument("--half", action="store_true")
+    sv.add_argument("--threads", type=int, default=None, help=".onnx 时 ORT intra-op 线程数")
+    sv.add_argument("--allow_path_root", default="", help='允许 JSON {"path": ...} 读取的服务器目录（缺省关闭）')
+    ld = sub.add_parser("load", help="并发压测")
+    ld.add_argument("--url", default="http://127.0.0.1:8100")
+    ld.add_argument("--images", default="./image/origin", help="图片目录 / 清单 / glob")
+    ld.add_argument("--concurrency", type=int, default=8)
+    ld.add_argument("--n", type=int, default=200)
+    args = ap.parse_args()
+
+    if args.cmd == "load":
+        from detections import iter_sources, IMAGE_EXTS
+        import requests
+        images = [p for p in iter_sources(args.images) if p.suffix.lower() in IMAGE_EXTS]
+        if not images:
+            raise SystemExit(f"No images found: {args.images}")
+        print("[STAT] client:", json.dumps(load_test(args.url, images, args.concurrency, args.n)))
+        print("[STAT] server:", json.dumps(requests.get(args.url.rstrip("/") + "/stats", timeout=10).json()))
+        return
+
+    from onnx_backend import load_model
+    w = Path(args.weights).expanduser().resolve()
+    if not w.exists():
+        raise FileNotFoundError(f"找不到本地权重：{w}")
+    model = load_model(w, args.threads)
+    kw = {"task": "obb", "imgsz": args.imgsz, "conf": args.conf, "device": args.device, "half": args.half}
+    model.predict(source=[np.zeros((args.imgsz, args.imgsz, 3), np.uint8)], verbose=False, **kw)   # 预热
+    srv, _ = serve(model, args.host, args.port, args.max_batch, args.max_wait_ms, kw, args.allow_path_root or None)
+    print(f"[OK] detect server on http://{args.host}:{args.port}  (POST /detect, GET /stats)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
+
+'''
+python detect_server.py serve --weights ./data/runs/obb/train/weights/best.pt --max_batch 8 --max_wait_ms 5
+python detect_server.py load --url http://127.0.0.1:8100 --images ./image/origin --concurrency 16 --n 500
+curl --data-binary @image/origin/boats.jpg -H "Content-Type: image/jpeg" http://127.0.0.1:8100/detect
+python detect_server.py serve --weights ./yolo11n-obb.pt --allow_path_root ./image/origin
+curl -d '{"path": "boats.jpg"}' -H "Content-Type: application/json" http://127.0.0.1:8100/detect
+'''
@@ -0,0 +1,176 @@
+# detections.py
+# 批量检测的输入/输出：
+#   iter_sources   目录 / 清单 / glob / 视频 -> 文件列表
+#   iter_frames    后台线程池解码图片、独立线程顺序读视频帧，有界队列预取，与 model.predict 重叠
+#   detections_to_frame  Ultralytics Results(obb) -> 列式检测表（每个框一行）
+#   DetectionWriter      按批追加写出（Parquet，缺 pyarrow 时退化为 CSV）
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+import queue, threading
+import numpy as np
+import pandas as pd
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".m4v", ".ts"}
+DET_COLS = ["image_id", "frame", "det", "cls", "class_name", "score",
+            "cx", "cy", "w", "h", "angle", "x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4"]
+
+def iter_sources(spec: str) -> list[Path]:
+    """目录（递归）/ 单个图片或视频 / 清单文件（.txt 每行一个路径）/ glob 通配"""
+    import glob
+    p = Path(spec).expanduser()
+    media = IMAGE_EXTS | VIDEO_EXTS
+    if p.is_dir():
+        return sorted(q.resolve() for q in p.rglob("*") if q.suffix.lower() in media)
+    if p.is_file() and p.suffix.lower() in {".txt", ".lst"}:
+        lines = [l.strip() for l in p.read_text(encoding="utf-8").splitlines()]
+        return [Path(l).expanduser().resolve() for l in lines if l and not l.startswith("#")]
+    if p.is_file():
+        return [p.resolve()]
+    return sorted(Path(q).resolve() for q in glob.glob(spec, recursive=True) if Path(q).suffix.lower() in media)
+
+def _done(value) -> Future:
+    f = Future()
+    f.set_result(value)
+    return f
+
+def iter_frames(paths: list[Path], workers: int = 4, prefetch: int = 64, vid_stride: int = 1):
+    """
+    产出 (image_id, frame, BGR ndarray)；图片 frame=-1，视频为帧号（每 vid_stride 帧取一帧）。
+    读不出来的图片产出 None 图像，由调用方计数跳过
+    """
+    import cv2
+    q: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    END = object()
+
+    def produce(pool: ThreadPoolExecutor):
+        try:
+            for p in paths:
+                if stop.is_set():
+                    break
+                if p.suffix.lower() in VIDEO_EXTS:
+                    cap = cv2.VideoCapture(str(p))
+                    i = 0
+                    while not stop.is_set():
+                        ok = cap.grab()
+                        if not ok:
+                            break
+                        if i % vid_stride == 0:
+                            ok, im = cap.retrieve()
+                            q.put((str(p), i, _done(im if ok else None)))
+                        i += 1
+                    cap.release()
+                else:
+                    q.put((str(p), -1, pool.submit(cv2.imread, str(p), cv2.IMREAD_COLOR)))
+        finally:
+            q.put(END)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        th = threading.Thread(target=produce, args=(pool,), daemon=True)
+        th.start()
+        try:
+            while (item := q.get()) is not END:
+                image_id, frame, fut = item
+                yield image_id, frame, fut.result()
+        finally:
+            stop.set()
+            while th.is_alive():                       # 放掉阻塞在 put 上的生产者
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    th.join(0.05)
+
+def batched(it, n: int):
+    buf = []
+    for x in it:
+        buf.append(x)
+        if len(buf) >= n:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+def _np(t) -> np.ndarray:
+    return t.cpu().numpy() if hasattr(t, "cpu") else np.asarray(t)
+
+def detections_to_frame(results, image_ids: list[str], frames: list[int] | None = None) -> pd.DataFrame:
+    """
+    每个 OBB 框一行：image_id / frame / det 序号 / cls / class_name / score /
+    xywhr（cx, cy, w, h, angle 弧度）/ 四角点 x1..y4（原图像素）。整批张量一次性拼接，不逐框循环
+    """
+    frames = frames if frames is not None else [-1] * len(image_ids)
+    parts, names = [], {}
+    for r, iid, fr in zip(results, image_ids, frames):
+        obb = getattr(r, "obb", None)
+        n = 0 if obb is None else len(obb)
+        names = r.names or names
+        if not n:
+            continue
+        xywhr = _np(obb.xywhr).astype("float32", copy=False).reshape(n, 5)
+        poly = _np(obb.xyxyxyxy).astype("float32", copy=False).reshape(n, 8)
+        parts.append((iid, fr, n, _np(obb.cls).astype("int16"), _np(obb.conf).astype("float32"), xywhr, poly))
+    if not parts:
+        return pd.DataFrame({c: pd.Series(dtype="float32") for c in DET_COLS})
+    cls = np.concatenate([p[3] for p in parts])
+    xywhr = np.concatenate([p[5] for p in parts])
+    poly = np.concatenate([p[6] for p in parts])
+    cats = [names[k] for k in sorted(names)] if isinstance(names, dict) else list(names)
+    df = pd.DataFrame({
+        "image_id": pd.Categorical(np.repeat([p[0] for p in parts], [p[2] for p in parts])),
+        "frame": np.repeat(np.array([p[1] for p in parts], dtype="int32"), [p[2] for p in parts]),
+        "det": np.concatenate([np.arange(p[2], dtype="int32") for p in parts]),
+        "cls": cls,
+        "class_name": pd.Categorical.from_codes(cls, categories=cats) if cats and cls.max() < len(cats)
+        else pd.Categorical(cls.astype(str)),
+        "score": np.concatenate([p[4] for p in parts]),
+    })
+    for i, c in enumerate(["cx", "cy", "w", "h", "angle"]):
+        df[c] = xywhr[:, i]
+    for i, c in enumerate(["x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4"]):
+        df[c] = poly[:, i]
+    return df
+
+class DetectionWriter:
+    """按批追加写检测表；.parquet 用 ParquetWriter 分 row group 写，.csv 追加写"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.rows = 0
+        self._pq = None
+        self._schema = None
+        if self.path.suffix.lower() == ".parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                self.path = self.path.with_suffix(".csv")
+        if self.path.suffix.lower() == ".csv" and self.path.exists():
+            self.path.unlink()
+
+    def write(self, df: pd.DataFrame):
+        if not len(df):
+            return
+        if self.path.suffix.lower() == ".parquet":
+            import pyarrow as pa, pyarrow.parquet as pq
+            # 分类列跨批的类别集合不同，写盘时统一成字符串
+            t = pa.Table.from_pandas(df.astype({"image_id": str, "class_name": str}), preserve_index=False)
+            if self._pq is None:
+                self._schema = t.schema
+                self._pq = pq.ParquetWriter(self.path, self._schema)
+            self._pq.write_table(t.cast(self._schema))
+        else:
+            df.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._pq is not None:
+            self._pq.close()
+            self._pq = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,11 +1,13 @@
 from pathlib import Path
-import argparse
-from ultralytics import YOLO
-from ultralytics.utils import ASSETS
+import argparse, time
+import metrics
 
 '''
 python eval_detect.py --weights ./data/runs/obb/train/weights/best.pt --image image/origin/boats.jpg 
 python eval_detect.py --weights ./yolo11n-obb.pt  --image image/origin/boats.jpg 
+# 批量：目录 / 清单 / glob / 视频，结果写列式检测表（可选保存标注图）
+python eval_detect.py --weights ./yolo11n-obb.pt --source ./image/origin --batch 16 --workers 8 \
+  --out ./image/pred_batch/detections.parquet --save_vis
 '''
 def pick_image(user_img: str | None) -> Path:
     # 1) 用户指定
@@ -27,12 +29,80 @@ def pick_image(user_img: str | None) -> Path:
 
     # 3) Ultralytics 自带示例图
     # （包里一般有 bus.jpg / zidane.jpg / truck.jpg 等）
-    bus = ASSETS / "bus.jpg"
-    if bus.exists():
-        return bus
+    try:
+        from ultralytics.utils import ASSETS           # 延迟导入：只在前两步都找不到图时才加载 ultralytics
+        bus = ASSETS / "bus.jpg"
+        if bus.exists():
+            return bus
+    except ImportError:
+        pass
 
     raise FileNotFoundError("未找到可用的测试图片，请手动用 --image 指定一张本地图片。")
 
+def _record_speed(results):
+    # ultralytics Results.speed：每张图 preprocess / inference / postprocess 毫秒
+    if not metrics.enabled():
+        return
+    for r in results:
+        for k, v in (getattr(r, "speed", None) or {}).items():
+            if v is not None:
+                metrics.observe(f"yolo.{k}", v / 1000)
+
+def run_batch(model, sources: list[Path], out: Path, batch: int = 16, imgsz: int = 1024, workers: int = 4,
+              conf: float = 0.25, device=None, half: bool = False, vid_stride: int = 1,
+              vis_dir: Path | None = None) -> dict:
+    """
+    解码（后台线程池）与 model.predict 重叠，逐批把 obb 结果追加到 out 检测表；
+    vis_dir 非空时另起线程写标注图。返回吞吐统计
+    """
+    import cv2
+    from concurrent.futures import ThreadPoolExecutor
+    from detections import iter_frames, batched, detections_to_frame, DetectionWriter
+
+    stats = {"images": 0, "unreadable": 0, "detections": 0}
+    t_pred = t_wait = 0.0
+    t0 = time.perf_counter()
+    vis_pool = ThreadPoolExecutor(max_workers=2) if vis_dir is not None else None
+    if vis_dir is not None:
+        vis_dir.mkdir(parents=True, exist_ok=True)
+    with DetectionWriter(out) as w:
+        it = batched(iter_frames(sources, workers=workers, prefetch=batch * 4, vid_stride=vid_stride), batch)
+        while True:
+            tw = time.perf_counter()
+            items = next(it, None)
+            t_wait += time.perf_counter() - tw
+            metrics.observe("detect.decode_wait", time.perf_counter() - tw)
+            if items is None:
+                break
+            good = [x for x in items if x[2] is not None]
+            stats["unreadable"] += len(items) - len(good)
+            if not good:
+                continue
+            tp = time.perf_counter()
+            results = model.predict(source=[x[2] for x in good], task="obb", imgsz=imgsz, conf=conf,
+                                    device=device, half=half, batch=len(good), verbose=False)
+            t_pred += time.perf_counter() - tp
+            metrics.observe("detect.predict_batch", time.perf_counter() - tp)
+            _record_speed(results)
+            with metrics.timer("detect.table_write"):
+                df = detections_to_frame(results, [x[0] for x in good], [x[1] for x in good])
+                w.write(df)
+            metrics.count("detect.images", len(good))
+            metrics.count("detect.boxes", len(df))
+            stats["images"] += len(good)
+            stats["detections"] += len(df)
+            if vis_pool is not None:
+                for (iid, fr, _), r in zip(good, results):
+                    name = Path(iid).stem + (f"_{fr:06d}" if fr >= 0 else "") + ".jpg"
+                    vis_pool.submit(cv2.imwrite, str(vis_dir / name), r.plot())
+    if vis_pool is not None:
+        vis_pool.shutdown(wait=True)
+    dt_s = time.perf_counter() - t0
+    stats.update(out=str(w.path), seconds=round(dt_s, 3),
+                 images_per_s=round(stats["images"] / dt_s, 2) if dt_s > 0 else 0.0,
+                 predict_s=round(t_pred, 3), decode_wait_s=round(t_wait, 3))
+    return stats
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--weights", default="./yolo11n-obb.pt", help="本地权重路径（例如 best.pt 或 yolo11n-obb.pt）")
@@ -40,14 +110,45 @@ def main():
     ap.add_argument("--outdir", default="./image", help="输出根目录")
     ap.add_argument("--name", default="pred_demo", help="输出子目录名")
     ap.add_argument("--imgsz", type=int, default=1024)
+    ap.add_argument("--source", default="", help="批量模式：图片目录 / 清单(.txt) / glob / 视频文件")
+    ap.add_argument("--batch", type=int, default=16, help="批量模式每次 predict 的图片数")
+    ap.add_argument("--workers", type=int, default=4, help="后台解码线程数")
+    ap.add_argument("--vid_stride", type=int, default=1, help="视频每隔多少帧取一帧")
+    ap.add_argument("--conf", type=float, default=0.25)
+    ap.add_argument("--device", default=None, help="如 0 / cpu")
+    ap.add_argument("--half", action="store_true", help="FP16 推理（GPU）")
+    ap.add_argument("--out", default="", help="检测表输出（.parquet/.csv），默认 <outdir>/<name>/detections.parquet")
+    ap.add_argument("--save_vis", action="store_true", help="批量模式同时保存标注图")
+    ap.add_argument("--threads", type=int, default=None, help="ONNX 权重（.onnx）时 ORT intra-op 线程数")
+    metrics.add_arguments(ap)
     args = ap.parse_args()
+    metrics.setup_from_args(args, "eval_detect")
 
     # 模型（必须是本地文件，避免联网下载）
     w = Path(args.weights).expanduser().resolve()
     if not w.exists():
         raise FileNotFoundError(f"找不到本地权重：{w} ；请改成你的 best.pt 或把官方 yolo11n-obb.pt 放到当前目录。")
 
-    model = YOLO(str(w))
+    # .onnx 走 ONNX Runtime CPU 后端（onnx_backend.OrtObbModel），predict 用法与 YOLO 一致
+    from onnx_backend import load_model
+    with metrics.timer("detect.model_load"):
+        model = load_model(w, args.threads)
+    if w.suffix.lower() == ".onnx" and not args.source:
+        args.source, args.save_vis = str(pick_image(args.image)), True
+
+    if args.source:
+        from detections import iter_sources
+        sources = iter_sources(args.source)
+        if not sources:
+            raise SystemExit(f"No images/videos found: {args.source}")
+        run_dir = Path(args.outdir) / args.name
+        out = Path(args.out) if args.out else run_dir / "detections.parquet"
+        stats = run_batch(model, sources, out, args.batch, args.imgsz, args.workers, args.conf,
+                          args.device, args.half, args.vid_stride, run_dir if args.save_vis else None)
+        print(f"[OK] {stats['images']} 张图 / {stats['detections']} 个框 -> {stats['out']}")
+        print(f"[STAT] {stats['images_per_s']} img/s；predict {stats['predict_s']}s，"
+              f"等待解码 {stats['decode_wait_s']}s，无法读取 {stats['unreadable']}")
+        return
 
     # 选图（不走网络）
     img_path = pick_image(args.image)
@@ -65,6 +166,7 @@ def main():
         show=False
     )
 
+    _record_speed(results)
     r0 = results[0]
     print(f"[INFO] 检测到 {len(r0.obb)} 个框；输出目录：{r0.save_dir}")
     # 访问结果字段
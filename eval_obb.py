@@ -0,0 +1,285 @@
+# eval_obb.py
+# 旋转框检测精度评测：DOTA 标注（labels/<split>/*.txt） × 检测表（detections.DET_COLS 的 parquet/csv）
+#   标注两种格式自动识别：
+#     YOLO-OBB  "cls x1 y1 x2 y2 x3 y3 x4 y4"（归一化，按同名图片尺寸还原像素）
+#     DOTA 原始 "x1 y1 ... y4 class_name difficult"（像素；imagesource/gsd 头行跳过，difficult=1 不计 FN、匹配到的预测不计 FP）
+#   IoU 用 obb_ops.poly_iou_pairs 对每张图的同类候选对整批计算；IoU 阈值 0.50:0.05:0.95 一次匹配出 TP 矩阵
+#   按图片分块多进程并行，汇总后逐类算 COCO 101 点插值 AP，输出 mAP50 / mAP50-95、各类 P/R 与 PR 曲线
+# 检测表可来自 eval_detect.py --source（.pt 或 .onnx）、sliced_detect.py，或本脚本 --weights 现场推理
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse, json, os, time
+import numpy as np
+import pandas as pd
+import metrics
+from obb_ops import poly_iou_pairs
+
+IOU_THRS = np.linspace(0.5, 0.95, 10)
+REC_GRID = np.linspace(0.0, 1.0, 101)
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+def load_names(data: str | None) -> list[str]:
+    """数据集 yaml 的 names（dict 或 list）；未给出时返回空表"""
+    if not data:
+        return []
+    import yaml
+    names = yaml.safe_load(Path(data).read_text(encoding="utf-8")).get("names", [])
+    if isinstance(names, dict):
+        return [str(names[k]) for k in sorted(names)]
+    return [str(n) for n in names]
+
+def _image_size(label_path: Path, image_dir: Path | None) -> tuple[int, int] | None:
+    """(w, h)：labels/<split>/x.txt -> images/<split>/x.*，只读文件头"""
+    from PIL import Image
+    d = image_dir or Path(str(label_path.parent).replace(f"{os.sep}labels{os.sep}", f"{os.sep}images{os.sep}"))
+    for ext in IMAGE_EXTS:
+        p = d / (label_path.stem + ext)
+        if p.exists():
+            with Image.open(p) as im:
+                return im.size
+    return None
+
+def read_labels(path: Path, name_to_id: dict[str, int], image_dir: Path | None = None):
+    """-> (cls int64 (n,), poly float64 (n,4,2) 像素, difficult bool (n,))"""
+    cls, poly, diff = [], [], []
+    wh = None
+    for line in path.read_text(encoding="utf-8").splitlines():
+        t = line.split()
+        if len(t) < 9 or ":" in t[0]:
+            continue
+        if len(t) == 9 and t[0].isdigit():                      # YOLO-OBB 归一化
+            if wh is None:
+                wh = _image_size(path, image_dir)
+                if wh is None:
+                    raise FileNotFoundError(f"归一化标注找不到对应图片以还原尺寸：{path}")
+            xy = np.asarray(t[1:9], dtype="float64").reshape(4, 2) * wh
+            cls.append(int(t[0])); poly.append(xy); diff.append(False)
+        else:                                                   # DOTA 原始
+            c = name_to_id.get(t[8])
+            if c is None:
+                continue
+            cls.append(c); poly.append(np.asarray(t[:8], dtype="float64").reshape(4, 2))
+            diff.append(len(t) > 9 and t[9] == "1")
+    if not cls:
+        return np.zeros(0, "int64"), np.zeros((0, 4, 2)), np.zeros(0, bool)
+    return np.asarray(cls, "int64"), np.stack(poly), np.asarray(diff, bool)
+
+def match_image(p_poly, p_cls, p_conf, g_poly, g_cls, g_diff, iouv=IOU_THRS):
+    """
+    单张图的匹配：返回 tp, ignore 两个 (n_pred, T) 布尔矩阵。
+    每个阈值下按 IoU 降序贪心一对一（同 ultralytics match_predictions）；匹配到 difficult 标注的预测记为 ignore
+    """
+    n, T = len(p_cls), len(iouv)
+    tp = np.zeros((n, T), bool)
+    ign = np.zeros((n, T), bool)
+    if not n or not len(g_cls):
+        return tp, ign
+    i, j = np.nonzero(p_cls[:, None] == g_cls[None, :])
+    if len(i):
+        # 外接圆不相交的对直接跳过，只对剩下的算精确多边形 IoU
+        pc, gc = p_poly.mean(1), g_poly.mean(1)
+        pr = np.linalg.norm(p_poly - pc[:, None], axis=2).max(1)
+        gr = np.linalg.norm(g_poly - gc[:, None], axis=2).max(1)
+        near = np.linalg.norm(pc[i] - gc[j], axis=1) <= pr[i] + gr[j]
+        i, j = i[near], j[near]
+    if not len(i):
+        return tp, ign
+    iou = poly_iou_pairs(p_poly[i], g_poly[j])
+    order = np.lexsort((-p_conf[i], -iou))                      # IoU 降序，同 IoU 时高分优先
+    i, j, iou = i[order], j[order], iou[order]
+    for t, thr in enumerate(iouv):
+        m = iou >= thr
+        if not m.any():
+            break
+        ii, jj = i[m], j[m]
+        _, first = np.unique(ii, return_index=True)             # 每个预测取 IoU 最大的标注
+        first.sort()
+        ii, jj = ii[first], jj[first]
+        _, first = np.unique(jj, return_index=True)             # 每个标注只给一个预测
+        ii, jj = ii[first], jj[first]
+        d = g_diff[jj]
+        tp[ii[~d], t] = True
+        ign[ii[d], t] = True
+    return tp, ign
+
+def _eval_chunk(items: list, name_to_id: dict[str, int], image_dir: Path | None):
+    """items: [(label_path, poly (n,4,2), cls, conf)] -> 拼接后的 tp/ignore/conf/cls 与每类 GT 数"""
+    tps, igns, confs, clss, gts = [], [], [], [], []
+    for lp, p_poly, p_cls, p_conf in items:
+        g_cls, g_poly, g_diff = read_labels(lp, name_to_id, image_dir)
+        tp, ign = match_image(p_poly, p_cls, p_conf, g_poly, g_cls, g_diff)
+        tps.append(tp); igns.append(ign); confs.append(p_conf); clss.append(p_cls)
+        gts.append(g_cls[~g_diff])
+    return (np.concatenate(tps), np.concatenate(igns), np.concatenate(confs),
+            np.concatenate(clss), np.concatenate(gts))
+
+def _ap_101(rec: np.ndarray, prec: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """rec/prec (n, T) 按置信度降序累积；返回 AP (T,) 与 101 点插值精度 (101, T)"""
+    env = np.flip(np.maximum.accumulate(np.flip(prec, 0), axis=0), 0)   # 右侧最大值包络
+    T = rec.shape[1]
+    grid = np.zeros((len(REC_GRID), T))
+    for t in range(T):
+        k = np.searchsorted(rec[:, t], REC_GRID, side="left")
+        ok = k < len(rec)
+        grid[ok, t] = env[k[ok], t]
+    return grid.mean(0), grid
+
+def ap_per_class(tp, ign, conf, pred_cls, gt_cls, nc: int) -> dict:
+    """各类 AP (nc, T)、PR 曲线 (nc, 101) @0.5、以及 IoU 0.5 下最佳 F1 处的 P/R/conf"""
+    T = tp.shape[1]
+    ap = np.zeros((nc, T))
+    pr = np.zeros((nc, len(REC_GRID)))
+    p_best = np.zeros(nc); r_best = np.zeros(nc); c_best = np.zeros(nc)
+    n_gt = np.bincount(gt_cls, minlength=nc)[:nc]
+    n_pred = np.bincount(pred_cls, minlength=nc)[:nc] if len(pred_cls) else np.zeros(nc, "int64")
+    order = np.argsort(-conf, kind="stable")
+    tp, ign, conf, pred_cls = tp[order], ign[order], conf[order], pred_cls[order]
+    for c in range(nc):
+        m = pred_cls == c
+        if not m.any() or not n_gt[c]:
+            continue
+        tpc = np.cumsum(tp[m], 0)
+        fpc = np.cumsum(~tp[m] & ~ign[m], 0)
+        rec = tpc / n_gt[c]
+        prec = tpc / np.maximum(tpc + fpc, 1)
+        ap[c], grid = _ap_101(rec, prec)
+        pr[c] = grid[:, 0]
+        f1 = 2 * prec[:, 0] * rec[:, 0] / np.maximum(prec[:, 0] + rec[:, 0], 1e-16)
+        k = int(f1.argmax())
+        p_best[c], r_best[c], c_best[c] = prec[k, 0], rec[k, 0], conf[m][k]
+    return {"ap": ap, "pr": pr, "p": p_best, "r": r_best, "conf": c_best, "n_gt": n_gt, "n_pred": n_pred}
+
+def read_detections(path: str | Path) -> pd.DataFrame:
+    path = Path(path)
+    cols = ["image_id", "cls", "score", "x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4"]
+    df = pd.read_parquet(path, columns=cols) if path.suffix.lower() == ".parquet" else pd.read_csv(path, usecols=cols)
+    return df
+
+def evaluate(labels_dir: str | Path, det: pd.DataFrame, names: list[str] | None = None,
+             image_dir: str | Path | None = None, workers: int = 0, chunk: int = 64) -> dict:
+    """检测表 det（image_id 按文件名 stem 对齐标注）与 labels_dir 下全部标注评测，返回报告 dict"""
+    names = list(names or [])
+    name_to_id = {n: i for i, n in enumerate(names)}
+    label_files = sorted(Path(labels_dir).glob("*.txt"))
+    if not label_files:
+        raise FileNotFoundError(f"No label files in {labels_dir}")
+    image_dir = Path(image_dir) if image_dir else None
+
+    with metrics.timer("evalobb.group"):
+        stem = det["image_id"].astype(str).map(lambda s: Path(s).stem).to_numpy()
+        poly = det[["x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4"]].to_numpy("float64").reshape(-1, 4, 2)
+        cls = det["cls"].to_numpy("int64")
+        conf = det["score"].to_numpy("float64")
+        order = np.argsort(stem, kind="stable")
+        stem, poly, cls, conf = stem[order], poly[order], cls[order], conf[order]
+        uniq, start = np.unique(stem, return_index=True)
+        bounds = dict(zip(uniq, zip(start, np.append(start[1:], len(stem)))))
+        items = []
+        for lp in label_files:
+            a, b = bounds.pop(lp.stem, (0, 0))
+            items.append((lp, poly[a:b], cls[a:b], conf[a:b]))
+    unmatched_images = len(bounds)
+
+    chunks = [items[k:k + chunk] for k in range(0, len(items), chunk)]
+    workers = workers or min(len(chunks), os.cpu_count() or 1)
+    t0 = time.perf_counter()
+    with metrics.timer("evalobb.match"):
+        if workers <= 1 or len(chunks) <= 1:
+            parts = [_eval_chunk(c, name_to_id, image_dir) for c in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                parts = list(ex.map(_eval_chunk, chunks, [name_to_id] * len(chunks), [image_dir] * len(chunks)))
+    tp, ign, pconf, pcls, gcls = (np.concatenate(x) for x in zip(*parts))
+    t_match = time.perf_counter() - t0
+
+    nc = int(max(len(names), (pcls.max() + 1) if len(pcls) else 0, (gcls.max() + 1) if len(gcls) else 0))
+    names += [str(c) for c in range(len(names), nc)]
+    with metrics.timer("evalobb.ap"):
+        res = ap_per_class(tp, ign, pconf, pcls, gcls, nc)
+    present = res["n_gt"] > 0
+    ap = res["ap"]
+    per_class = [{"cls": c, "name": names[c], "n_gt": int(res["n_gt"][c]), "n_pred": int(res["n_pred"][c]),
+                  "precision": round(float(res["p"][c]), 4), "recall": round(float(res["r"][c]), 4),
+                  "best_f1_conf": round(float(res["conf"][c]), 4),
+                  "ap50": round(float(ap[c, 0]), 4), "ap50_95": round(float(ap[c].mean()), 4)}
+                 for c in range(nc) if present[c] or res["n_pred"][c]]
+    metrics.count("evalobb.images", len(label_files))
+    metrics.count("evalobb.predictions", len(pcls))
+    return {"images": len(label_files), "instances": int(len(gcls)), "predictions": int(len(pcls)),
+            "unmatched_images": unmatched_images,
+            "mAP50": round(float(ap[present, 0].mean()), 4) if present.any() else 0.0,
+            "mAP50_95": round(float(ap[present].mean()), 4) if present.any() else 0.0,
+            "match_s": round(t_match, 3), "workers": workers, "per_class": per_class,
+            "pr_curves": {names[c]: res["pr"][c].round(4).tolist() for c in range(nc) if present[c]}}
+
+def write_pr_csv(rep: dict, path: str | Path):
+    """PR 曲线（IoU 0.5，101 个召回点）长表：class, recall, precision"""
+    rows = [(n, r, p) for n, ps in rep["pr_curves"].items() for r, p in zip(REC_GRID.round(2), ps)]
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows, columns=["class", "recall", "precision"]).to_csv(path, index=False)
+
+def main():
+    ap = argparse.ArgumentParser("Rotated-box mAP evaluation of detection tables against DOTA labels")
+    ap.add_argument("--labels", default="./data/datasets/dota8/labels/val", help="标注目录（*.txt）")
+    ap.add_argument("--images", default="", help="图片目录（归一化标注还原尺寸 / --weights 推理用），默认 labels->images")
+    ap.add_argument("--det", default="", help="检测表 .parquet/.csv（detections.DET_COLS）")
+    ap.add_argument("--weights", default="", help="未给 --det 时用该权重（.pt/.onnx）对 --images 推理后再评测")
+    ap.add_argument("--data", default="", help="数据集 yaml（取 names；DOTA 原始标注按类名对齐）")
+    ap.add_argument("--imgsz", type=int, default=1024)
+    ap.add_argument("--conf", type=float, default=0.001, help="--weights 推理的置信度下限")
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--device", default=None)
+    ap.add_argument("--workers", type=int, default=0, help="评测进程数（0=按 CPU 核数）")
+    ap.add_argument("--out", default="", help="报告 JSON 路径")
+    ap.add_argument("--pr_csv", default="", help="PR 曲线 CSV 路径")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.setup_from_args(args, "eval_obb")
+
+    labels = Path(args.labels)
+    images = Path(args.images) if args.images else \
+        Path(str(labels.resolve()).replace(f"{os.sep}labels{os.sep}", f"{os.sep}images{os.sep}"))
+    names = load_names(args.data)
+    if args.det:
+        det_path = Path(args.det)
+    elif args.weights:
+        from detections import iter_sources
+        from eval_detect import run_batch
+        from onnx_backend import load_model
+        det_path = Path(args.out or "./image/eval_obb/report.json").with_name("detections.parquet")
+        model = load_model(Path(args.weights).expanduser().resolve(), args.threads)
+        if not names and isinstance(getattr(model, "names", None), dict):
+            names = [str(model.names[k]) for k in sorted(model.names)]
+        run_batch(model, iter_sources(str(images)), det_path, args.batch, args.imgsz, conf=args.conf,
+                  device=args.device)
+    else:
+        raise SystemExit("需要 --det 或 --weights")
+
+    t0 = time.perf_counter()
+    rep = evaluate(labels, read_detections(det_path), names, images, args.workers)
+    rep["det"], rep["labels"], rep["seconds"] = str(det_path), str(labels), round(time.perf_counter() - t0, 3)
+
+    print(f"{'class':>20} {'gt':>7} {'pred':>7} {'P':>7} {'R':>7} {'AP50':>7} {'AP50-95':>8}")
+    for c in rep["per_class"]:
+        print(f"{c['name']:>20} {c['n_gt']:>7} {c['n_pred']:>7} {c['precision']:>7.3f} {c['recall']:>7.3f} "
+              f"{c['ap50']:>7.3f} {c['ap50_95']:>8.3f}")
+    print(f"{'all':>20} {rep['instances']:>7} {rep['predictions']:>7} {'':>7} {'':>7} "
+          f"{rep['mAP50']:>7.3f} {rep['mAP50_95']:>8.3f}")
+    print(f"[STAT] {rep['images']} 张图，匹配 {rep['match_s']}s（{rep['workers']} 进程），总计 {rep['seconds']}s；"
+          f"检测表中无标注的图 {rep['unmatched_images']}")
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.pr_csv:
+        write_pr_csv(rep, args.pr_csv)
+
+if __name__ == "__main__":
+    main()
+
+'''
+python eval_obb.py --labels ./data/datasets/dota8/labels/val --det ./image/pred_batch/detections.parquet --data dota8.yaml
+python eval_obb.py --labels ./data/datasets/dota8/labels/val --weights ./model.onnx --out ./image/eval_obb/report.json \
+  --pr_csv ./image/eval_obb/pr.csv
+'''
@@ -0,0 +1,133 @@
+# feed_cache.py
+# adsb_io / radar_io 的按源文件列式缓存：
+#   <数据目录>/.cache/manifest.json  记录 源路径 -> (size, mtime_ns, 版本, 缓存文件)
+#   <数据目录>/.cache/<hash>.parquet 保存已规整（feed_schema.apply_schema 之后，category/float32）的列
+# 只有新增或变化（大小/mtime 不同）的文件才会重新解析；缺少 pyarrow 时退化为 pickle。
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Iterable
+import hashlib, json, os
+import pandas as pd
+
+CACHE_DIRNAME = ".cache"
+MANIFEST_NAME = "manifest.json"
+# 规整规则变化时递增，旧缓存自动失效
+CACHE_VERSION = "2"
+
+def _cache_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "pkl"
+
+def _stat_key(p: Path) -> dict:
+    st = p.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _load_manifest(cache_dir: Path) -> dict:
+    p = cache_dir / MANIFEST_NAME
+    if not p.exists():
+        return {}
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(cache_dir: Path, man: dict):
+    tmp = cache_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(man, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, cache_dir / MANIFEST_NAME)
+
+def _write_frame(df: pd.DataFrame, path: Path, fmt: str):
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+
+def _read_frame(path: Path, fmt: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if fmt == "parquet" else pd.read_pickle(path)
+
+def _entry_fresh(ent: dict | None, st: dict, tag: str, fmt: str, cpath: Path) -> bool:
+    return bool(ent and ent.get("size") == st["size"] and ent.get("mtime_ns") == st["mtime_ns"]
+                and ent.get("version") == CACHE_VERSION and ent.get("tag") == tag
+                and ent.get("format") == fmt and cpath.exists())
+
+def _cache_path(cache_dir: Path, key: str, fmt: str) -> Path:
+    return cache_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.{fmt}"
+
+def fresh_cache_paths(files: Iterable[Path], tag: str, cache_dir: Path) -> dict[Path, Path]:
+    """返回 源文件 -> 仍然有效的 Parquet 缓存路径（只读，不触发解析），供流式读取下推列/行组"""
+    if _cache_format() != "parquet":
+        return {}
+    man = _load_manifest(cache_dir)
+    out = {}
+    for p in files:
+        key = str(p.resolve())
+        cpath = _cache_path(cache_dir, key, "parquet")
+        if _entry_fresh(man.get(key), _stat_key(p), tag, "parquet", cpath):
+            out[p] = cpath
+    return out
+
+def load_files(files: Iterable[Path], read_one: Callable[[Path], pd.DataFrame],
+               normalize: Callable[[pd.DataFrame], pd.DataFrame], tag: str,
+               cache_dir: Path, cache: bool = True, rebuild: bool = False,
+               parse_many: Callable[[list[Path]], list[pd.DataFrame]] | None = None) -> list[pd.DataFrame]:
+    """
+    逐文件读取并规整；cache=False 完全绕过缓存，rebuild=True 忽略已有缓存并重写。
+    parse_many 给定时，所有需要解析的文件一次性交给它（如 feed_ingest.parse_files 的进程池），
+    返回值须已规整、与输入同序
+    """
+    files = list(files)
+    parse = parse_many or (lambda ps: [normalize(read_one(p)) for p in ps])
+    if not cache:
+        return parse(files)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        # 只读目录等情况：直接解析，不缓存
+        return parse(files)
+
+    fmt = _cache_format()
+    man = {} if rebuild else _load_manifest(cache_dir)
+    dirty = rebuild
+    out: list[pd.DataFrame | None] = []
+    stale: list[tuple[int, Path, str, dict, Path]] = []
+    for p in files:
+        key = str(p.resolve())
+        st = _stat_key(p)
+        ent = man.get(key)
+        cpath = _cache_path(cache_dir, key, fmt)
+        if _entry_fresh(ent, st, tag, fmt, cpath):
+            try:
+                out.append(_read_frame(cpath, fmt))
+                continue
+            except Exception:
+                pass  # 缓存损坏：回落到重新解析
+        stale.append((len(out), p, key, st, cpath))
+        out.append(None)
+
+    for (i, _, key, st, cpath), df in zip(stale, parse([s[1] for s in stale]) if stale else []):
+        try:
+            _write_frame(df, cpath, fmt)
+            man[key] = {**st, "version": CACHE_VERSION, "tag": tag, "format": fmt, "cache": cpath.name}
+        except Exception:
+            # 无法列式存储（如混合类型的 object 列）：本次不缓存该文件
+            man.pop(key, None)
+        dirty = True
+        out[i] = df
+
+    # 清理已不存在的源文件对应的缓存
+    for key in [k for k in man if not Path(k).exists()]:
+        name = man.pop(key).get("cache")
+        if name:
+            (cache_dir / name).unlink(missing_ok=True)
+        dirty = True
+    if dirty:
+        try:
+            _save_manifest(cache_dir, man)
+        except OSError:
+            pass
+    return out
@@ -0,0 +1,134 @@
+# feed_follow.py
+# adsb_io / radar_io 的跟随（tail -f）模式：轮询数据目录，只产出新追加的记录。
+#   - CSV 按字节偏移续读，只消费到最后一个完整换行，避免读到写了一半的行
+#   - JSON（整体数组）无法续读，文件变化时重新解析并跳过已产出的行数
+#   - 通过 inode 识别轮转：同名文件 inode 变化或变短则从头读；改名后的旧文件沿用原偏移
+#   - 检查点（每个文件的 inode/偏移/行数）落盘为 JSON，重启后从断点继续（至少一次语义）
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Iterator
+import io, json, os, time
+import pandas as pd
+from feed_schema import concat_frames
+
+class FeedFollower:
+    def __init__(self, root: str | Path, list_files: Callable[[Path], list[Path]],
+                 normalize: Callable[[pd.DataFrame], pd.DataFrame],
+                 checkpoint: str | Path | None = None, from_start: bool = True, csv_dtype: dict | None = None):
+        self.root = Path(root)
+        self.csv_dtype = csv_dtype
+        self.list_files = list_files
+        self.normalize = normalize
+        self.checkpoint = Path(checkpoint) if checkpoint else self.root / ".cache" / "follow_checkpoint.json"
+        self.from_start = from_start
+        self.state: dict[str, dict] = self._load_checkpoint()
+        self._pending: dict[str, dict] | None = None
+        # from_start=False 且无检查点：首次 poll 时记下已存在的 (路径, inode)，只有这些文件跳到末尾
+        self._preexisting: set[tuple[str, int]] | None = None if not from_start and not self.state else set()
+
+    # ---------- 检查点 ----------
+    def _load_checkpoint(self) -> dict:
+        if self.checkpoint.exists():
+            try:
+                return json.loads(self.checkpoint.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def commit(self):
+        """确认上一批已被消费：更新内存状态并原子写入检查点"""
+        if self._pending is None:
+            return
+        self.state = self._pending
+        self._pending = None
+        self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint.with_name(self.checkpoint.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.checkpoint)
+
+    # ---------- 读取增量 ----------
+    def _read_csv_tail(self, p: Path, st: dict) -> tuple[pd.DataFrame | None, dict]:
+        with p.open("rb") as f:
+            if st["offset"] == 0:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    return None, st                          # 表头还没写完
+                st = {**st, "header": header.decode("utf-8"), "offset": f.tell()}
+            f.seek(st["offset"])
+            data = f.read()
+        end = data.rfind(b"\n")
+        if end < 0:
+            return None, st
+        data = data[:end + 1]
+        st = {**st, "offset": st["offset"] + len(data)}
+        df = pd.read_csv(io.BytesIO(st["header"].encode("utf-8") + data), dtype=self.csv_dtype)
+        return (df if len(df) else None), st
+
+    @staticmethod
+    def _read_json_tail(p: Path, st: dict) -> tuple[pd.DataFrame | None, dict]:
+        try:
+            with p.open("r", encoding="utf-8") as f:
+                recs = json.load(f)
+        except ValueError:
+            return None, st                                  # 写入中途，下次再试
+        new = recs[st["rows"]:]
+        st = {**st, "rows": len(recs)}
+        return (pd.DataFrame(new) if new else None), st
+
+    def poll(self) -> pd.DataFrame:
+        """扫描一次目录，返回自上次 commit 以来新追加的记录（可能为空表）"""
+        by_inode = {v["inode"]: v for v in self.state.values()}
+        state, parts = {}, []
+        files = [p for p in self.list_files(self.root) if p.suffix.lower() in (".csv", ".json")]
+        if self._preexisting is None:
+            self._preexisting = set()
+            for p in files:
+                try:
+                    self._preexisting.add((str(p.resolve()), p.stat().st_ino))
+                except FileNotFoundError:
+                    pass
+        for p in files:
+            key = str(p.resolve())
+            if key in state:
+                continue
+            try:
+                s = p.stat()
+            except FileNotFoundError:
+                continue
+            st = self.state.get(key)
+            if st is None or st["inode"] != s.st_ino:
+                st = by_inode.get(s.st_ino)                  # 改名轮转：沿用旧偏移
+            if st is None or s.st_size < st["size"]:
+                st = {"inode": s.st_ino, "offset": 0, "rows": 0, "size": 0, "mtime_ns": 0}
+                if (key, s.st_ino) in self._preexisting:
+                    # 启动时已存在的文件：跳到当前末尾，只看之后追加的数据；启动后新出现的文件从头读
+                    if p.suffix.lower() == ".csv":
+                        _, st = self._read_csv_tail(p, st)
+                    else:
+                        _, st = self._read_json_tail(p, st)
+                    st["size"], st["mtime_ns"] = s.st_size, s.st_mtime_ns
+            st = dict(st)
+            if s.st_size != st["size"] or s.st_mtime_ns != st["mtime_ns"]:
+                if p.suffix.lower() == ".csv":
+                    df, st = self._read_csv_tail(p, st)
+                else:
+                    df, st = self._read_json_tail(p, st)
+                st["size"], st["mtime_ns"] = s.st_size, s.st_mtime_ns
+                if df is not None:
+                    parts.append(self.normalize(df))
+            state[key] = st
+        # 已消失的文件不再跟踪
+        self._pending = state
+        if not parts:
+            return pd.DataFrame()
+        return concat_frames(parts)
+
+    def follow(self, poll_s: float = 0.5, stop: Callable[[], bool] | None = None) -> Iterator[pd.DataFrame]:
+        """持续产出新记录批次；消费方取下一批时上一批才写入检查点"""
+        while not (stop and stop()):
+            batch = self.poll()
+            if len(batch):
+                yield batch
+            self.commit()
+            if not len(batch):
+                time.sleep(poll_s)
@@ -0,0 +1,141 @@
+# feed_ingest.py
+# adsb_io / radar_io 的快速解析与多进程并行读入：
+#   read_csv_fast   pyarrow.csv（C++ 多线程解析，ID 列按 string 读、空串即缺失，时间戳直接解析为 UTC）
+#   read_json_fast  紧凑记录数组改写成 NDJSON 交给 pyarrow.json 按块解析成列；其它 JSON 用 orjson
+#                   （缺 orjson 时退化为标准库 json）解析后按列构造 DataFrame
+#   read_parquet_fast  pyarrow.parquet 整文件读（create_load_data --format parquet 的分片），ID 列转 category
+#   parse_files     按文件分发到进程池：每个进程单线程解析 + feed_schema.apply_schema，结果按原顺序返回
+# 缺 pyarrow 时回落到 pd.read_csv；文件数少于 MIN_PARALLEL_FILES 时不起进程池（启动开销大于收益）
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import json, os
+import pandas as pd
+from feed_schema import TIME_COL, apply_schema, csv_dtypes
+
+MIN_PARALLEL_FILES = 4
+SOURCE_SUFFIXES = (".csv", ".json", ".parquet")       # adsb_io / radar_io / feed_stream 认作源文件的后缀
+
+def _arrow_to_pandas(t, dtype: dict | None):
+    import pyarrow as pa
+    for c in dtype or {}:
+        i = t.schema.get_field_index(c)
+        if i >= 0 and pa.types.is_string(t.schema.field(i).type):
+            t = t.set_column(i, c, t.column(i).dictionary_encode())     # to_pandas 直接得到 category
+    return t.to_pandas(split_blocks=True, self_destruct=True)
+
+def read_csv_fast(path: str | Path, dtype: dict | None = None, use_threads: bool = True) -> pd.DataFrame:
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pacsv
+    except ImportError:
+        return pd.read_csv(path, dtype=dtype)
+    types = {c: pa.string() for c in (dtype or {})}
+    ro = pacsv.ReadOptions(use_threads=use_threads, block_size=1 << 24)
+    try:
+        co = pacsv.ConvertOptions(column_types={**types, TIME_COL: pa.timestamp("us", tz="UTC")},
+                                  strings_can_be_null=True)
+        t = pacsv.read_csv(path, read_options=ro, convert_options=co)
+    except pa.ArrowInvalid:
+        # 时间戳格式不规整：按字符串读，交给 apply_schema 的 to_datetime(errors="coerce")
+        co = pacsv.ConvertOptions(column_types={**types, TIME_COL: pa.string()}, strings_can_be_null=True)
+        t = pacsv.read_csv(path, read_options=ro, convert_options=co)
+    return _arrow_to_pandas(t, dtype)
+
+def _loads():
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        return json.loads
+
+def _read_json_arrow(data: bytes, dtype: dict | None, use_threads: bool) -> pd.DataFrame | None:
+    """
+    紧凑单行的记录数组（pandas to_json / create_load_data 的输出）按 "},{" 切成 NDJSON，
+    交给 pyarrow.json 分块并行解析成列；字符串里恰好含 "},{" 时切出的行不是合法 JSON 会解析失败，
+    行数对不上也视为失败，返回 None 由调用方走 orjson
+    """
+    try:
+        import pyarrow as pa
+        from pyarrow import json as pajson
+    except ImportError:
+        return None
+    body = data.strip()
+    if not (body.startswith(b"[{") and body.endswith(b"}]")) or b"\n" in body:
+        return None
+    n = body.count(b"},{") + 1
+    ro = pajson.ReadOptions(use_threads=use_threads, block_size=1 << 24)
+    try:
+        t = pajson.read_json(pa.BufferReader(body[1:-1].replace(b"},{", b"}\n{")), read_options=ro)
+    except pa.ArrowInvalid:
+        return None
+    if t.num_rows != n:
+        return None
+    i = t.schema.get_field_index(TIME_COL)
+    if i >= 0 and pa.types.is_string(t.schema.field(i).type):
+        try:
+            t = t.set_column(i, TIME_COL, t.column(i).cast(pa.timestamp("us", tz="UTC")))
+        except pa.ArrowInvalid:
+            pass                                        # 交给 apply_schema 的 to_datetime(errors="coerce")
+    for c in dtype or {}:                               # JSON 里写成数字的 ID 列按字符串处理
+        j = t.schema.get_field_index(c)
+        if j >= 0 and not pa.types.is_string(t.schema.field(j).type) and not pa.types.is_null(t.schema.field(j).type):
+            t = t.set_column(j, c, t.column(j).cast(pa.string()))
+    df = _arrow_to_pandas(t, dtype)
+    return df
+
+def read_json_fast(path: str | Path, dtype: dict | None = None, use_threads: bool = True) -> pd.DataFrame:
+    """JSON 数组（记录列表）-> DataFrame：优先 pyarrow.json，其次 orjson 解析后按键收集成列再构造"""
+    data = Path(path).read_bytes()
+    df = _read_json_arrow(data, dtype, use_threads)
+    if df is not None:
+        return df
+    recs = _loads()(data)
+    if not recs:
+        return pd.DataFrame()
+    keys = list(dict.fromkeys(k for r in recs[:1000] for k in r))
+    if any(len(r) != len(keys) for r in recs):
+        return pd.DataFrame.from_records(recs)          # 字段不齐：交给 pandas 对齐
+    return pd.DataFrame({k: [r.get(k) for r in recs] for k in keys})
+
+def read_parquet_fast(path: str | Path, dtype: dict | None = None, use_threads: bool = True) -> pd.DataFrame:
+    try:
+        import pyarrow as pa, pyarrow.parquet as pq
+    except ImportError:
+        return pd.read_parquet(path)
+    t = pq.read_table(path, use_threads=use_threads)
+    for c in dtype or {}:                               # 数值写出的 ID 列同样按字符串处理
+        j = t.schema.get_field_index(c)
+        if j >= 0 and not pa.types.is_string(t.schema.field(j).type) and not pa.types.is_dictionary(t.schema.field(j).type):
+            t = t.set_column(j, c, t.column(j).cast(pa.string()))
+    return _arrow_to_pandas(t, dtype)
+
+def read_any(path: str | Path, dtype: dict | None = None, use_threads: bool = True) -> pd.DataFrame:
+    path = Path(path)
+    if path.suffix.lower() == ".parquet":
+        return read_parquet_fast(path, dtype, use_threads)
+    if path.suffix.lower() == ".csv":
+        return read_csv_fast(path, dtype, use_threads)
+    if path.suffix.lower() == ".json":
+        return read_json_fast(path, dtype, use_threads)
+    raise ValueError(f"Unsupported file: {path}")
+
+def parse_file(path: str | Path, tag: str, use_threads: bool = False) -> pd.DataFrame:
+    """单个源文件：快速解析 + 按 SCHEMAS[tag] 规整（进程池任务，模块级函数可 pickle）"""
+    return apply_schema(read_any(path, csv_dtypes(tag), use_threads), tag)
+
+def default_workers(n_files: int) -> int:
+    return max(1, min(n_files, os.cpu_count() or 1))
+
+def parse_files(paths: list[Path], tag: str, workers: int = 0) -> list[pd.DataFrame]:
+    """
+    并行解析多个文件，返回与 paths 同序的 DataFrame 列表；
+    workers=0 按 CPU 核数，=1 或文件很少时在本进程顺序解析（此时让 pyarrow 用多线程）
+    """
+    paths = list(paths)
+    workers = workers or default_workers(len(paths))
+    if workers <= 1 or len(paths) < MIN_PARALLEL_FILES:
+        return [parse_file(p, tag, use_threads=True) for p in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as ex:
+        return list(ex.map(parse_file, paths, [tag] * len(paths),
+                           chunksize=max(1, len(paths) // (workers * 4))))
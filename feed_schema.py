@@ -0,0 +1,129 @@
+# feed_schema.py
+# adsb_io / radar_io 共用的列类型登记表与去重：
+#   SCHEMAS[tag] = 每列目标类型 + 记录主键（目标 ID + 时间戳）
+#     字符串 ID/枚举列 -> category（CSV 读入时先按 str 读，避免 icao24 "123456" / 应答码 "0400" 被推断成数字）
+#     连续量 -> float32，小整数（nacp/nic）-> 可空 Int8，时间 -> datetime64[ns, UTC]
+#   dedupe_sources  同一 stem 的 CSV/JSON 副本只取一个（默认 CSV）
+#   dedupe_records  按主键去重（后读到的为准）
+#   concat_frames   合并各文件时先统一 category 取值集合，避免 concat 退化为 object
+#   memory_report   各列内存占用
+from __future__ import annotations
+from functools import partial
+from pathlib import Path
+from typing import Iterable
+import pandas as pd
+
+TIME_COL = "timestamp_utc"
+CAT, F32, I8 = "category", "float32", "Int8"
+
+_ADSB_COMMON = {"icao24": CAT, "callsign": CAT, "lat": F32, "lon": F32,
+                "alt_baro_ft": F32, "gs_mps": F32, "trk_deg": F32}
+_RADAR_COMMON = {"radar_id": CAT, "track_id": CAT, "lat": F32, "lon": F32,
+                 "az_deg": F32, "vel_mps": F32, "snr_db": F32}
+
+SCHEMAS: dict[str, dict] = {
+    "adsb_info": {"key": ["icao24", TIME_COL],
+                  "dtypes": {**_ADSB_COMMON, "roc_mps": F32, "squawk": CAT, "nacp": I8, "nic": I8, "src": CAT}},
+    "adsb_pred": {"key": ["icao24", TIME_COL],
+                  "dtypes": {**_ADSB_COMMON, "alert": CAT, "score": F32}},
+    "radar_info": {"key": ["radar_id", "track_id", TIME_COL],
+                   "dtypes": {**_RADAR_COMMON, "range_km": F32, "quality": F32}},
+    "radar_pred": {"key": ["radar_id", "track_id", TIME_COL],
+                   "dtypes": {**_RADAR_COMMON, "alert": CAT, "score": F32}},
+}
+
+def csv_dtypes(tag: str) -> dict[str, str]:
+    """pd.read_csv 的 dtype 参数：category 列一律先按字符串读"""
+    return {c: "str" for c, t in SCHEMAS[tag]["dtypes"].items() if t == CAT}
+
+def _to_category(s: pd.Series) -> pd.Series:
+    """JSON 里的数字 ID（如 7500）与 CSV 的 "7500" 统一为字符串 category，空串视为缺失"""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all():
+            s = s.astype("Int64").astype(object)        # 含缺失的整数列被读成 float：7500.0 -> "7500"
+        if not pd.api.types.is_string_dtype(s):
+            s = s.where(s.isna(), s.astype(str))
+        s = s.astype(CAT)
+    if "" in s.cat.categories:
+        s = s.cat.remove_categories([""])
+    return _str_categories(s)
+
+def _str_categories(s: pd.Series) -> pd.Series:
+    """取值集合统一为 str 类型（全空列的空集合默认是 object，会导致 union_categoricals 报错）"""
+    cats = s.cat.categories
+    if cats.dtype != pd.Index([], dtype="str").dtype:
+        s = s.cat.set_categories(cats.astype(str)) if len(cats) else s.cat.set_categories(pd.Index([], dtype="str"))
+    return s
+
+def apply_schema(df: pd.DataFrame, tag: str) -> pd.DataFrame:
+    """按 SCHEMAS[tag] 规整类型；登记表之外的列保持原样"""
+    if TIME_COL in df.columns and not isinstance(df[TIME_COL].dtype, pd.DatetimeTZDtype):
+        df[TIME_COL] = pd.to_datetime(df[TIME_COL], errors="coerce", utc=True, format="ISO8601")
+    for col, t in SCHEMAS[tag]["dtypes"].items():
+        if col not in df.columns:
+            continue
+        if t == CAT:
+            df[col] = _to_category(df[col])
+        elif t == I8:
+            df[col] = pd.to_numeric(df[col], errors="coerce").round().astype(I8)
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(t)
+    return df
+
+def normalizer(tag: str):
+    """给 feed_cache / feed_stream / FeedFollower 的 normalize 回调"""
+    return partial(apply_schema, tag=tag)
+
+def dedupe_sources(files: Iterable[Path], prefer: tuple[str, ...] = (".csv", ".json")) -> list[Path]:
+    """同目录同 stem 的多种格式副本只保留一个（prefer 靠前者优先）"""
+    best: dict[tuple[Path, str], Path] = {}
+    rank = {s: i for i, s in enumerate(prefer)}
+    for p in files:
+        k = (p.parent, p.stem)
+        cur = best.get(k)
+        if cur is None or rank.get(p.suffix.lower(), len(rank)) < rank.get(cur.suffix.lower(), len(rank)):
+            best[k] = p
+    return sorted(best.values())
+
+def concat_frames(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    pd.concat，但各文件取值集合不同的 category 列先对齐到并集（只重编码 codes，不经过 object），
+    结果仍是 category
+    """
+    dfs = [d for d in dfs if len(d.columns)]
+    if len(dfs) <= 1:
+        return dfs[0].reset_index(drop=True) if dfs else pd.DataFrame()
+    cat_cols = {c for d in dfs for c in d.columns if isinstance(d[c].dtype, pd.CategoricalDtype)}
+    if cat_cols:
+        dfs = [d.copy(deep=False) for d in dfs]
+    for c in cat_cols:
+        if not all(c in d.columns and isinstance(d[c].dtype, pd.CategoricalDtype) for d in dfs):
+            for d in dfs:
+                if c in d.columns:
+                    d[c] = d[c].astype(object)
+            continue
+        cols = [_str_categories(d[c]) for d in dfs]
+        cats = cols[0].cat.categories
+        for s in cols[1:]:
+            if not s.cat.categories.equals(cats):
+                cats = cats.append(s.cat.categories.difference(cats, sort=False))
+        for d, s in zip(dfs, cols):
+            d[c] = s if s.cat.categories.equals(cats) else s.cat.set_categories(cats)
+    out = pd.concat(dfs, ignore_index=True)
+    for c in cat_cols:
+        if not isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = _to_category(out[c])
+    return out
+
+def dedupe_records(df: pd.DataFrame, tag: str) -> pd.DataFrame:
+    """按 SCHEMAS[tag]["key"] 去重，保留最后一条（后读到的文件覆盖先读到的）"""
+    key = [c for c in SCHEMAS[tag]["key"] if c in df.columns]
+    if not len(df) or len(key) < 2:
+        return df
+    return df.drop_duplicates(subset=key, keep="last").reset_index(drop=True)
+
+def memory_report(df: pd.DataFrame) -> dict:
+    """{"total_mb": .., "columns": {列: (dtype, MB)}}，object 列按实际字符串计（deep）"""
+    mem = df.memory_usage(deep=True, index=True)
+    return {"rows": len(df), "total_mb": round(float(mem.sum()) / 2 ** 20, 3),
+            "columns": {c: (str(df[c].dtype), round(float(mem[c]) / 2 ** 20, 3)) for c in df.columns}}
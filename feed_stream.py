@@ -0,0 +1,87 @@
+# feed_stream.py
+# adsb_io / radar_io 的流式读取：逐文件、逐行块产出已规整的 DataFrame，内存占用只与 chunksize 有关
+#   - 列投影下推：CSV 用 usecols，Parquet（源分片与缓存）只读所需列
+#   - 时间过滤下推：每个块规整后立即按 time_range 过滤，不在内存里累积
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+import json
+import pandas as pd
+
+from feed_cache import fresh_cache_paths
+from feed_ingest import SOURCE_SUFFIXES
+
+TIME_COL = "timestamp_utc"
+
+def _to_utc(t) -> pd.Timestamp | None:
+    if t is None:
+        return None
+    ts = pd.Timestamp(t)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def _needed_cols(columns, time_range) -> set[str] | None:
+    if columns is None:
+        return None
+    need = set(columns)
+    if time_range is not None:
+        need.add(TIME_COL)
+    return need
+
+def _iter_csv(p: Path, chunksize: int, need: set[str] | None, dtype: dict | None = None) -> Iterator[pd.DataFrame]:
+    usecols = (lambda c: c in need) if need is not None else None
+    with pd.read_csv(p, chunksize=chunksize, usecols=usecols, dtype=dtype) as reader:
+        yield from reader
+
+def _iter_json(p: Path, chunksize: int, need: set[str] | None) -> Iterator[pd.DataFrame]:
+    # JSON 数组无法按行增量解析：整文件读入记录列表，再按块构造 DataFrame（峰值 ~ 单文件大小）
+    with p.open("r", encoding="utf-8") as f:
+        recs = json.load(f)
+    for i in range(0, len(recs), chunksize):
+        part = recs[i:i + chunksize]
+        if need is not None:
+            part = [{k: v for k, v in r.items() if k in need} for r in part]
+        yield pd.DataFrame(part)
+    del recs
+
+def _iter_parquet(p: Path, chunksize: int, need: set[str] | None) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(p)
+    cols = None if need is None else [c for c in pf.schema_arrow.names if c in need]
+    for batch in pf.iter_batches(batch_size=chunksize, columns=cols):
+        yield batch.to_pandas()
+
+def iter_files(files: Iterable[Path], normalize: Callable[[pd.DataFrame], pd.DataFrame], tag: str,
+               cache_dir: Path | None = None, chunksize: int = 100_000,
+               time_range: tuple | None = None, columns: Iterable[str] | None = None,
+               csv_dtype: dict | None = None) -> Iterator[pd.DataFrame]:
+    """
+    逐文件、逐块产出规整后的 DataFrame；time_range=(t0, t1) 为闭区间，任一端可为 None；
+    csv_dtype 传给 read_csv（feed_schema.csv_dtypes，ID 列按字符串读）
+    """
+    files = [p for p in files if p.suffix.lower() in SOURCE_SUFFIXES]
+    columns = list(columns) if columns is not None else None
+    need = _needed_cols(columns, time_range)
+    t0, t1 = (None, None) if time_range is None else (_to_utc(time_range[0]), _to_utc(time_range[1]))
+    cached = fresh_cache_paths(files, tag, cache_dir) if cache_dir is not None else {}
+    for p in files:
+        if p in cached:
+            raw, pre_normalized = _iter_parquet(cached[p], chunksize, need), True
+        elif p.suffix.lower() == ".csv":
+            raw, pre_normalized = _iter_csv(p, chunksize, need, csv_dtype), False
+        elif p.suffix.lower() == ".parquet":
+            raw, pre_normalized = _iter_parquet(p, chunksize, need), False
+        else:
+            raw, pre_normalized = _iter_json(p, chunksize, need), False
+        for chunk in raw:
+            if not pre_normalized:
+                chunk = normalize(chunk)
+            if (t0 is not None or t1 is not None) and TIME_COL in chunk.columns:
+                ts = chunk[TIME_COL]
+                m = pd.Series(True, index=chunk.index)
+                if t0 is not None: m &= ts >= t0
+                if t1 is not None: m &= ts <= t1
+                chunk = chunk[m]
+            if columns is not None:
+                chunk = chunk[[c for c in columns if c in chunk.columns]]
+            if len(chunk):
+                yield chunk.reset_index(drop=True)
@@ -0,0 +1,456 @@
+# geo_join.py
+# OBB 检测（像素 x1..y4）-> 经纬度，并与同时刻的雷达 / ADS-B 航迹、地面信息 area 做空间关联：
+#   1) read_georef    影像仿射变换 + CRS + 成像时间：rasterio > GeoTIFF 标签（PIL 读 33550/33922/34264/34735）> 世界文件(.tfw/.wld)
+#   2) project_detections  每景所有角点与中心点一次性仿射变换（非经纬度 CRS 再整批 rasterio.warp / pyproj 转 EPSG:4326）
+#   3) snapshot_tracks     每个目标取成像时刻前后 window_s 内最近的两次观测线性插值（只有一侧时取最近一次）
+#   4) join_tracks / join_areas  地心直角坐标 cKDTree 互查候选对（sparse_distance_matrix，整批、不逐框循环），
+#      再在局部平面（米）上精确判定：航迹点在框内 / 距框边 ≤ gate_m；area 多边形与框相交（边相交或顶点互含）
+#   输出 <out>/det_geo.parquet、det_tracks.parquet、det_areas.parquet（缺 pyarrow 时写 CSV）
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+import argparse, json
+import numpy as np
+import pandas as pd
+import metrics
+
+TIME_COL = "timestamp_utc"
+EARTH_R_M = 6371008.8
+POLY_COLS = ["x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4"]
+LON_COLS, LAT_COLS = ["lon1", "lon2", "lon3", "lon4"], ["lat1", "lat2", "lat3", "lat4"]
+LONLAT_CRS = {"EPSG:4326", "OGC:CRS84", "CRS:84", "WGS84"}
+WORLD_EXTS = (".tfw", ".tifw", ".wld", ".jgw", ".pgw")
+
+@dataclass
+class GeoRef:
+    """x = a*col + b*row + c，y = d*col + e*row + f（GDAL/rasterio 仿射顺序，像素角点约定）"""
+    transform: tuple[float, float, float, float, float, float]
+    crs: str | None = None                              # None 视为经纬度
+    time_utc: pd.Timestamp | None = None                # 成像时间（TIFFTAG_DATETIME），未知为 None
+    source: str = ""
+
+    @property
+    def lonlat(self) -> bool:
+        return self.crs is None or self.crs.upper() in LONLAT_CRS
+
+def _tiff_time(s) -> pd.Timestamp | None:
+    """TIFF DateTime "YYYY:MM:DD HH:MM:SS"（按 UTC）或 ISO 字符串"""
+    if not s:
+        return None
+    s = str(s).strip()
+    if len(s) >= 10 and s[4] == ":" and s[7] == ":":
+        s = s[:4] + "-" + s[5:7] + "-" + s[8:]
+    t = pd.to_datetime(s, errors="coerce", utc=True)
+    return None if pd.isna(t) else t
+
+def _georef_rasterio(path: Path) -> GeoRef | None:
+    try:
+        import rasterio
+    except ImportError:
+        return None
+    with rasterio.open(path) as ds:
+        if ds.transform.is_identity and ds.crs is None:
+            return None
+        t = ds.transform
+        crs = None
+        if ds.crs is not None:
+            epsg = ds.crs.to_epsg()
+            crs = f"EPSG:{epsg}" if epsg else ds.crs.to_wkt()
+        return GeoRef((t.a, t.b, t.c, t.d, t.e, t.f), crs, _tiff_time(ds.tags().get("TIFFTAG_DATETIME")), "rasterio")
+
+def _georef_tiff_tags(path: Path) -> GeoRef | None:
+    """GeoTIFF 标签：ModelTransformation(34264) 或 ModelPixelScale(33550)+ModelTiepoint(33922)，EPSG 取自 GeoKeyDirectory(34735)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(path) as im:
+            tags = dict(getattr(im, "tag_v2", {}) or {})
+    except (OSError, ValueError):
+        return None
+    if 34264 in tags:
+        m = [float(v) for v in tags[34264]]
+        tr = (m[0], m[1], m[3], m[4], m[5], m[7])
+    elif 33550 in tags and 33922 in tags:
+        sx, sy = float(tags[33550][0]), float(tags[33550][1])
+        i, j, _, x, y, _ = (float(v) for v in tags[33922][:6])
+        tr = (sx, 0.0, x - i * sx, 0.0, -sy, y + j * sy)
+    else:
+        return None
+    keys = [int(v) for v in tags.get(34735, ())]
+    geokeys = {keys[k]: keys[k + 3] for k in range(4, len(keys) - 3, 4) if keys[k + 1] == 0}
+    if geokeys.get(1025) == 2:                          # RasterPixelIsPoint：锚点是像素中心，换成角点
+        a, b, c, d, e, f = tr
+        tr = (a, b, c - 0.5 * (a + b), d, e, f - 0.5 * (d + e))
+    epsg = geokeys.get(3072) or geokeys.get(2048)       # ProjectedCSTypeGeoKey / GeographicTypeGeoKey
+    crs = f"EPSG:{epsg}" if epsg and epsg != 32767 else None
+    return GeoRef(tr, crs, _tiff_time(tags.get(306)), "geotiff_tags")
+
+def _georef_world_file(path: Path, crs: str | None) -> GeoRef | None:
+    """世界文件六行 A D B E C F，C/F 为左上像素中心；同名 .prj 不解析，CRS 由参数给出（默认经纬度）"""
+    for ext in WORLD_EXTS:
+        w = path.with_suffix(ext)
+        if w.exists():
+            A, D, B, E, C, F = (float(v) for v in w.read_text().split()[:6])
+            return GeoRef((A, B, C - 0.5 * (A + B), D, E, F - 0.5 * (D + E)), crs, None, w.name)
+    return None
+
+def read_georef(path: str | Path, crs: str | None = None) -> GeoRef:
+    """crs 只在世界文件（本身不带 CRS）时使用；都读不到时报 ValueError"""
+    path = Path(path)
+    g = None
+    if path.exists() and path.suffix.lower() in {".tif", ".tiff"}:
+        g = _georef_rasterio(path) or _georef_tiff_tags(path)
+    g = g or _georef_world_file(path, crs)
+    if g is None:
+        raise ValueError(f"No georeference (GeoTIFF tags / world file) for {path}")
+    return g
+
+def _to_lonlat(g: GeoRef, px: np.ndarray, py: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    a, b, c, d, e, f = g.transform
+    x, y = a * px + b * py + c, d * px + e * py + f
+    if g.lonlat:
+        return x, y
+    shape = x.shape
+    try:
+        from rasterio.warp import transform as warp
+        lon, lat = warp(g.crs, "EPSG:4326", x.ravel(), y.ravel())
+    except ImportError:
+        try:
+            from pyproj import Transformer
+        except ImportError:
+            raise RuntimeError(f"{g.crs} -> EPSG:4326 needs rasterio or pyproj") from None
+        lon, lat = Transformer.from_crs(g.crs, "EPSG:4326", always_xy=True).transform(x.ravel(), y.ravel())
+    return np.asarray(lon, "float64").reshape(shape), np.asarray(lat, "float64").reshape(shape)
+
+def _local_m(lon, lat, lon0, lat0):
+    """以 (lon0, lat0) 为原点的等距圆柱局部平面（米），检测框尺度（≤ 几 km）下误差可忽略"""
+    k = np.pi / 180.0 * EARTH_R_M
+    return (lon - lon0) * k * np.cos(np.radians(lat0)), (lat - lat0) * k
+
+def _ecef_m(lon, lat) -> np.ndarray:
+    la, lo = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)]) * EARTH_R_M
+
+def project_detections(det: pd.DataFrame, georefs: dict[str, GeoRef]) -> pd.DataFrame:
+    """
+    georefs 以 image_id 为键；返回 det + lon1..lon4 / lat1..lat4、中心 lon/lat、外接半径 radius_m、scene_time。
+    没有地理参考的景整行丢弃（计数 geojoin.unreferenced）
+    """
+    ids = det["image_id"].astype(str).to_numpy()
+    parts = []
+    for iid in pd.unique(ids):
+        g = georefs.get(iid)
+        rows = np.flatnonzero(ids == iid)
+        if g is None:
+            metrics.count("geojoin.unreferenced", len(rows))
+            continue
+        sub = det.iloc[rows]
+        poly = sub[POLY_COLS].to_numpy("float64").reshape(-1, 4, 2)
+        px = np.concatenate([poly[:, :, 0], poly[:, :, 0].mean(1, keepdims=True)], axis=1)   # 4 角 + 中心
+        py = np.concatenate([poly[:, :, 1], poly[:, :, 1].mean(1, keepdims=True)], axis=1)
+        lon, lat = _to_lonlat(g, px, py)
+        out = sub.copy()
+        out[LON_COLS] = lon[:, :4]
+        out[LAT_COLS] = lat[:, :4]
+        out["lon"], out["lat"] = lon[:, 4], lat[:, 4]
+        ex, ny = _local_m(lon[:, :4], lat[:, :4], lon[:, 4:], lat[:, 4:])
+        out["radius_m"] = np.hypot(ex, ny).max(axis=1).astype("float32")
+        out["scene_time"] = g.time_utc if g.time_utc is not None else pd.NaT
+        parts.append(out)
+    if not parts:
+        return det.iloc[:0].assign(**{c: pd.Series(dtype="float64") for c in [*LON_COLS, *LAT_COLS, "lon", "lat"]},
+                                   radius_m=pd.Series(dtype="float32"),
+                                   scene_time=pd.Series(dtype="datetime64[us, UTC]"))
+    out = pd.concat(parts, ignore_index=True)
+    out["scene_time"] = pd.to_datetime(out["scene_time"], utc=True)
+    return out
+
+def snapshot_tracks(tracks: pd.DataFrame, id_cols: list[str], t, window_s: float = 30.0) -> pd.DataFrame:
+    """
+    每个目标在 t 时刻的位置：[t-window_s, t+window_s] 内 t 前最后一次与 t 后第一次观测按时间线性插值，
+    只有一侧时取该次观测；dt_s 为所用观测与 t 的最大间隔
+    """
+    cols = [*id_cols, TIME_COL, "lat", "lon"]
+    if not len(tracks):
+        return pd.DataFrame(columns=[*cols, "dt_s"])
+    t = pd.Timestamp(t)
+    t = t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+    dt = (tracks[TIME_COL] - t).dt.total_seconds()
+    sub = tracks.loc[(dt.abs() <= window_s) & tracks["lat"].notna() & tracks["lon"].notna(), cols]
+    sub = sub.assign(_dt=dt[sub.index]).sort_values("_dt", kind="stable")
+    before = sub[sub["_dt"] <= 0].drop_duplicates(subset=id_cols, keep="last")
+    after = sub[sub["_dt"] > 0].drop_duplicates(subset=id_cols, keep="first")
+    m = before.merge(after, on=id_cols, how="outer", suffixes=("", "_a"))
+    lat0, lon0, dt0 = (m[c].to_numpy("float64") for c in ("lat", "lon", "_dt"))
+    lat1, lon1, dt1 = (m[c].to_numpy("float64") for c in ("lat_a", "lon_a", "_dt_a"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        w = np.where(np.isfinite(dt0) & np.isfinite(dt1), -dt0 / (dt1 - dt0), np.where(np.isfinite(dt0), 0.0, 1.0))
+    m["lat"] = np.where(w == 0, lat0, np.where(w == 1, lat1, lat0 + w * (lat1 - lat0)))
+    m["lon"] = np.where(w == 0, lon0, np.where(w == 1, lon1, lon0 + w * (lon1 - lon0)))
+    m["dt_s"] = np.fmax(np.abs(dt0), np.abs(dt1)).astype("float32")
+    m[TIME_COL] = t
+    return m[[*cols, "dt_s"]].reset_index(drop=True)
+
+def _pairs(a_xyz: np.ndarray, b_xyz: np.ndarray, max_m: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """两组地心坐标中弦长 ≤ max_m 的全部 (i, j, 距离)"""
+    from scipy.spatial import cKDTree
+    if not len(a_xyz) or not len(b_xyz):
+        e = np.empty(0, "int64")
+        return e, e, np.empty(0)
+    sp = cKDTree(a_xyz).sparse_distance_matrix(cKDTree(b_xyz), max_m, output_type="ndarray")
+    return sp["i"].astype("int64"), sp["j"].astype("int64"), sp["v"]
+
+def _seg_dist(px, py, ax, ay, bx, by):
+    vx, vy = bx - ax, by - ay
+    with np.errstate(invalid="ignore", divide="ignore"):
+        u = np.clip(((px - ax) * vx + (py - ay) * vy) / (vx * vx + vy * vy), 0.0, 1.0)
+    u = np.nan_to_num(u)
+    return np.hypot(px - (ax + u * vx), py - (ay + u * vy))
+
+def _in_rings(px, py, rx, ry) -> np.ndarray:
+    """射线法：点 (P, K) 是否在环 (P, L)（闭合，NaN 填充）内，返回 (P, K)"""
+    ax, ay, bx, by = rx[:, None, :-1], ry[:, None, :-1], rx[:, None, 1:], ry[:, None, 1:]
+    x, y = px[:, :, None], py[:, :, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cross = ((ay > y) != (by > y)) & (x < ax + (y - ay) * (bx - ax) / (by - ay))
+    return (np.count_nonzero(cross, axis=2) % 2) == 1
+
+def _det_local(det: pd.DataFrame, di: np.ndarray, lon, lat):
+    """候选对 (di, 点) 在各自检测框中心的局部平面：返回框角点 (P,5) 闭合环与点坐标"""
+    lon0, lat0 = det["lon"].to_numpy("float64")[di], det["lat"].to_numpy("float64")[di]
+    clon = det[LON_COLS].to_numpy("float64")[di]
+    clat = det[LAT_COLS].to_numpy("float64")[di]
+    cx, cy = _local_m(clon, clat, lon0[:, None], lat0[:, None])
+    cx, cy = np.concatenate([cx, cx[:, :1]], 1), np.concatenate([cy, cy[:, :1]], 1)
+    px, py = _local_m(lon, lat, lon0[:, None] if np.ndim(lon) == 2 else lon0,
+                      lat0[:, None] if np.ndim(lat) == 2 else lat0)
+    return cx, cy, px, py
+
+def join_tracks(det: pd.DataFrame, snap: pd.DataFrame, gate_m: float = 200.0) -> pd.DataFrame:
+    """
+    检测框（project_detections 输出）× 航迹快照：点在框内（inside）或到框边距离 ≤ gate_m 的全部配对，
+    dist_m 为点到框的距离（框内为 0）
+    """
+    cols = ["_di", "_tj", "dist_m", "inside"]
+    if not len(det) or not len(snap):
+        return pd.DataFrame(columns=cols)
+    r = det["radius_m"].to_numpy("float64")
+    di, tj, chord = _pairs(_ecef_m(det["lon"].to_numpy("float64"), det["lat"].to_numpy("float64")),
+                           _ecef_m(snap["lon"].to_numpy("float64"), snap["lat"].to_numpy("float64")),
+                           float(r.max()) + gate_m)
+    keep = chord <= r[di] + gate_m
+    di, tj = di[keep], tj[keep]
+    cx, cy, px, py = _det_local(det, di, snap["lon"].to_numpy("float64")[tj], snap["lat"].to_numpy("float64")[tj])
+    inside = _in_rings(px[:, None], py[:, None], cx, cy)[:, 0]
+    edge = np.min(_seg_dist(px[:, None], py[:, None], cx[:, :-1], cy[:, :-1], cx[:, 1:], cy[:, 1:]), axis=1)
+    dist = np.where(inside, 0.0, edge)
+    keep = dist <= gate_m
+    return pd.DataFrame({"_di": di[keep], "_tj": tj[keep], "dist_m": dist[keep].astype("float32"),
+                         "inside": inside[keep]})
+
+def _parse_area(area) -> np.ndarray | None:
+    """ground area -> (L, 2) 经纬度闭合环；点为 (1, 2)；多环只取第一个（外环）；coords 可为 "polygon:[...]" 字符串"""
+    if not isinstance(area, dict):
+        return None
+    c = area.get("coords")
+    if isinstance(c, str):
+        try:
+            c = json.loads(c.split(":", 1)[1] if ":" in c.split("[", 1)[0] else c)
+        except (ValueError, IndexError):
+            return None
+    while isinstance(c, list) and c and isinstance(c[0], list) and c[0] and isinstance(c[0][0], list):
+        c = c[0]
+    try:
+        a = np.asarray(c, "float64")
+    except (TypeError, ValueError):
+        return None
+    if a.ndim == 1 and a.size >= 2:
+        return a[None, :2]
+    if a.ndim != 2 or a.shape[1] < 2 or not len(a):
+        return None
+    a = a[:, :2]
+    return a if len(a) < 3 or np.array_equal(a[0], a[-1]) else np.vstack([a, a[:1]])
+
+def area_table(ground: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    """地面记录 -> (每个可解析 area 一行：record_id/object_type/risk_level/area_type/lon/lat/radius_m，NaN 填充的环 (K, L, 2))"""
+    rings = [_parse_area(a) for a in ground.get("area", pd.Series(index=ground.index, dtype=object))]
+    ok = [i for i, r in enumerate(rings) if r is not None]
+    rings = [rings[i] for i in ok]
+    g = ground.iloc[ok].reset_index(drop=True)
+    out = pd.DataFrame({
+        "record_id": g.get("record_id"), "object_type": g.get("object_type"),
+        "risk_level": [r.get("level") if isinstance(r, dict) else None
+                       for r in g.get("risk_indicators", pd.Series([None] * len(g)))],
+        "area_type": ["point" if len(r) == 1 else "polygon" for r in rings],
+    })
+    L = max((len(r) for r in rings), default=1)
+    pad = np.full((len(rings), L, 2), np.nan)
+    for k, r in enumerate(rings):
+        pad[k, :len(r)] = r
+    out["lon"] = np.nanmean(pad[:, :, 0], axis=1) if len(rings) else np.empty(0)
+    out["lat"] = np.nanmean(pad[:, :, 1], axis=1) if len(rings) else np.empty(0)
+    ex, ny = _local_m(pad[:, :, 0], pad[:, :, 1], out["lon"].to_numpy()[:, None], out["lat"].to_numpy()[:, None])
+    out["radius_m"] = np.nan_to_num(np.nanmax(np.hypot(ex, ny), axis=1)) if len(rings) else np.empty(0)
+    return out, pad
+
+def _seg_cross(ax, ay, bx, by, cx, cy, dx, dy):
+    """线段 AB 与 CD 是否相交（含端点接触），各参数可广播"""
+    def orient(px, py, qx, qy, rx, ry):
+        return np.sign((qx - px) * (ry - py) - (qy - py) * (rx - px))
+    with np.errstate(invalid="ignore"):
+        o1, o2 = orient(ax, ay, bx, by, cx, cy), orient(ax, ay, bx, by, dx, dy)
+        o3, o4 = orient(cx, cy, dx, dy, ax, ay), orient(cx, cy, dx, dy, bx, by)
+    return (o1 * o2 <= 0) & (o3 * o4 <= 0) & np.isfinite(o1 * o2 * o3 * o4)
+
+def join_areas(det: pd.DataFrame, areas: pd.DataFrame, rings: np.ndarray, gate_m: float = 0.0,
+               chunk_elems: int = 1 << 22) -> pd.DataFrame:
+    """
+    检测框 × 地面 area：外接圆候选（cKDTree）后精确判定多边形相交——
+    框角点在 area 内、area 顶点在框内、或任意两边相交；point 类 area 在框内或距框 ≤ gate_m
+    """
+    cols = ["_di", "_aj"]
+    if not len(det) or not len(areas):
+        return pd.DataFrame(columns=cols)
+    r_d, r_a = det["radius_m"].to_numpy("float64"), areas["radius_m"].to_numpy("float64")
+    di, aj, chord = _pairs(_ecef_m(det["lon"].to_numpy("float64"), det["lat"].to_numpy("float64")),
+                           _ecef_m(areas["lon"].to_numpy("float64"), areas["lat"].to_numpy("float64")),
+                           float(r_d.max() + r_a.max()) + gate_m)
+    keep = chord <= r_d[di] + r_a[aj] + gate_m
+    di, aj = di[keep], aj[keep]
+    L = rings.shape[1]
+    hit = np.zeros(len(di), bool)
+    step = max(1, chunk_elems // (4 * L))               # 每块 (P, 4, L) 个边对
+    for s in range(0, len(di), step):
+        d, a = di[s:s + step], aj[s:s + step]
+        cx, cy, ax, ay = _det_local(det, d, rings[a, :, 0], rings[a, :, 1])
+        h = _in_rings(ax, ay, cx, cy).any(axis=1)                           # area 顶点在框内
+        h |= _in_rings(cx[:, :4], cy[:, :4], ax, ay).any(axis=1)            # 框角点在 area 内
+        h |= _seg_cross(cx[:, :-1, None], cy[:, :-1, None], cx[:, 1:, None], cy[:, 1:, None],
+                        ax[:, None, :-1], ay[:, None, :-1], ax[:, None, 1:], ay[:, None, 1:]).any(axis=(1, 2))
+        if gate_m > 0:                                                      # 点 area 按距离门限
+            pt = np.isfinite(ax[:, 0]) & ~np.isfinite(ax[:, 1]) if L > 1 else np.ones(len(d), bool)
+            edge = np.min(_seg_dist(ax[:, :1], ay[:, :1], cx[:, :-1], cy[:, :-1], cx[:, 1:], cy[:, 1:]), axis=1)
+            h |= pt & (edge <= gate_m)
+        hit[s:s + step] = h
+    return pd.DataFrame({"_di": di[hit], "_aj": aj[hit]})
+
+def _read_det(path: str | Path) -> pd.DataFrame:
+    path = Path(path)
+    return pd.read_parquet(path) if path.suffix.lower() == ".parquet" else pd.read_csv(path)
+
+def _write(df: pd.DataFrame, path: Path) -> Path:
+    try:
+        import pyarrow  # noqa: F401
+        df.to_parquet(path, index=False)
+        return path
+    except ImportError:
+        df.to_csv(path.with_suffix(".csv"), index=False)
+        return path.with_suffix(".csv")
+
+def geo_join(det: pd.DataFrame, georefs: dict[str, GeoRef], adsb: pd.DataFrame | None = None,
+             radar: pd.DataFrame | None = None, ground: pd.DataFrame | None = None,
+             window_s: float = 30.0, gate_m: float = 200.0, area_gate_m: float = 0.0) -> dict[str, pd.DataFrame]:
+    """
+    返回 {"det_geo", "det_tracks", "det_areas"}；航迹按每景 scene_time 取快照（无成像时间的景不做航迹关联），
+    地面 area 不区分时间（调用方可先用 ground_io.load_ground_info 的 time_range/bbox 过滤）
+    """
+    with metrics.timer("geojoin.project"):
+        geo = project_detections(det, georefs)
+    metrics.count("geojoin.detections", len(geo))
+    key = geo[["image_id", "det"]].astype({"image_id": str}).reset_index(drop=True) if "det" in geo.columns \
+        else pd.DataFrame({"image_id": geo["image_id"].astype(str), "det": np.arange(len(geo))})
+
+    trk_parts = []
+    with metrics.timer("geojoin.tracks"):
+        for t, idx in geo.groupby("scene_time", sort=True).indices.items():
+            sub = geo.iloc[idx].reset_index(drop=True)
+            for source, df, id_cols in (("adsb", adsb, ["icao24"]), ("radar", radar, ["radar_id", "track_id"])):
+                if df is None or not len(df):
+                    continue
+                snap = snapshot_tracks(df, id_cols, t, window_s)
+                j = join_tracks(sub, snap, gate_m)
+                if not len(j):
+                    continue
+                s = snap.iloc[j["_tj"].to_numpy()].reset_index(drop=True)
+                target = s[id_cols[0]].astype(str)
+                for c in id_cols[1:]:
+                    target = target + "/" + s[c].astype(str)
+                trk_parts.append(pd.concat([
+                    key.iloc[idx[j["_di"].to_numpy()]].reset_index(drop=True),
+                    pd.DataFrame({"source": source, "target": target, "track_time": s[TIME_COL],
+                                  "track_lat": s["lat"].astype("float64"), "track_lon": s["lon"].astype("float64"),
+                                  "dt_s": s["dt_s"], "dist_m": j["dist_m"].to_numpy(),
+                                  "inside": j["inside"].to_numpy()})], axis=1))
+    det_tracks = pd.concat(trk_parts, ignore_index=True) if trk_parts else pd.DataFrame(
+        columns=["image_id", "det", "source", "target", "track_time", "track_lat", "track_lon", "dt_s",
+                 "dist_m", "inside"])
+
+    with metrics.timer("geojoin.areas"):
+        if ground is not None and len(ground):
+            areas, rings = area_table(ground)
+            j = join_areas(geo, areas, rings, area_gate_m)
+            det_areas = pd.concat([key.iloc[j["_di"].to_numpy()].reset_index(drop=True),
+                                   areas.iloc[j["_aj"].to_numpy()][["record_id", "object_type", "risk_level",
+                                                                    "area_type"]].reset_index(drop=True)], axis=1)
+        else:
+            det_areas = pd.DataFrame(columns=["image_id", "det", "record_id", "object_type", "risk_level",
+                                              "area_type"])
+    metrics.count("geojoin.track_pairs", len(det_tracks))
+    metrics.count("geojoin.area_pairs", len(det_areas))
+    return {"det_geo": geo, "det_tracks": det_tracks, "det_areas": det_areas}
+
+def main():
+    ap = argparse.ArgumentParser("Project OBB detections to lon/lat and join with tracks / ground areas")
+    ap.add_argument("--det", required=True, help="detections.parquet / .csv（detections.DET_COLS）")
+    ap.add_argument("--scene", default="", help="所有检测共用的影像（默认按 image_id 路径逐景读取地理参考）")
+    ap.add_argument("--crs", default=None, help="世界文件的 CRS（默认经纬度）")
+    ap.add_argument("--time", default="", help="成像时间（UTC），覆盖 TIFF 标签中的时间")
+    ap.add_argument("--adsb", default="./adsb/info", help="空字符串表示不关联 ADS-B")
+    ap.add_argument("--radar", default="./radar/info", help="空字符串表示不关联雷达")
+    ap.add_argument("--ground", default="", help="ground_io 存储目录，如 ground/store")
+    ap.add_argument("--window_s", type=float, default=30.0, help="航迹与成像时间的最大间隔（秒）")
+    ap.add_argument("--gate_m", type=float, default=200.0, help="航迹点到检测框的距离门限（米）")
+    ap.add_argument("--area_gate_m", type=float, default=0.0, help="point 类 area 到检测框的距离门限（米）")
+    ap.add_argument("--out", default="./image/geo_join")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.setup_from_args(args, "geo_join")
+
+    det = _read_det(args.det)
+    t_scene = pd.to_datetime(args.time, utc=True) if args.time else None
+    georefs = {}
+    for iid in pd.unique(det["image_id"].astype(str)):
+        try:
+            georefs[iid] = read_georef(args.scene or iid, args.crs)
+        except ValueError as e:
+            print("[WARN]", e)
+            continue
+        if t_scene is not None:
+            georefs[iid].time_utc = t_scene
+    adsb = radar = ground = None
+    if args.adsb:
+        from adsb_io import load_adsb_info
+        adsb = load_adsb_info(args.adsb)
+    if args.radar:
+        from radar_io import load_radar_info
+        radar = load_radar_info(args.radar)
+    if args.ground:
+        from ground_io import load_ground_info
+        ground = load_ground_info(args.ground)
+
+    res = geo_join(det, georefs, adsb, radar, ground, args.window_s, args.gate_m, args.area_gate_m)
+    out = Path(args.out); out.mkdir(parents=True, exist_ok=True)
+    for name, df in res.items():
+        p = _write(df, out / f"{name}.parquet")
+        print(f"[OK] {name}: {len(df)} rows -> {p}")
+
+if __name__ == "__main__":
+    main()
+
+'''
+python geo_join.py --det ./image/pred_sliced/detections.parquet --ground ground/store --window_s 30 --gate_m 200
+python geo_join.py --det ./image/pred/detections.csv --scene ./data/scenes/big.tif --time 2025-09-26T00:05:00Z \
+  --radar "" --out ./image/geo_join
+'''
@@ -0,0 +1,97 @@
+# gpt_cache.py
+# _chat_vision 的内容寻址响应缓存：
+#   key = sha256(图片文件 sha256 + prompt + model + base_url + 预处理参数)
+#   每张图一个 JSON 文件（<root>/<key[:2]>/<key>.json），保存 _validate_and_fix 之后的记录列表（切块时多条）
+#   命中时刷新 mtime 作为 LRU 时钟；超过 max_age 视为过期；总大小超过 max_bytes 时按 mtime 淘汰最旧的
+from __future__ import annotations
+from pathlib import Path
+import hashlib, json, os, threading, time
+
+DEFAULT_CACHE_DIR = Path("ground/.cache/vision")
+
+def file_sha256(path: Path, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        while chunk := f.read(bufsize):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cache_key(image_sha256: str, prompt: str, model: str, base_url: str, extra: str = "") -> str:
+    h = hashlib.sha256()
+    for part in (image_sha256, prompt, model, base_url.rstrip("/"), extra):
+        h.update(part.encode("utf-8")); h.update(b"\0")
+    return h.hexdigest()
+
+class ResponseCache:
+    def __init__(self, root: str | Path = DEFAULT_CACHE_DIR, max_bytes: int = 256 * 1024 * 1024,
+                 max_age_s: float = 30 * 86400):
+        self.root = Path(root)
+        self.max_bytes, self.max_age_s = int(max_bytes), float(max_age_s)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._size = sum(p.stat().st_size for p in self.root.rglob("*.json"))
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str):
+        p = self._path(key)
+        try:
+            st = p.stat()
+            obj = json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            with self.lock:
+                self.stats["misses"] += 1
+            return None
+        if time.time() - obj.get("created", 0) > self.max_age_s:
+            with self.lock:
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                self._size -= st.st_size
+            p.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(p)                               # LRU：命中即刷新访问时间（尽力而为，并发淘汰时文件可能已删）
+        except OSError:
+            pass
+        with self.lock:
+            self.stats["hits"] += 1
+        return obj["record"]
+
+    def put(self, key: str, record, meta: dict | None = None):
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"created": time.time(), "meta": meta or {}, "record": record},
+                          ensure_ascii=False).encode("utf-8")
+        tmp = p.with_name(f"{p.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        old = p.stat().st_size if p.exists() else 0
+        os.replace(tmp, p)
+        with self.lock:
+            self.stats["writes"] += 1
+            self._size += len(data) - old
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self, target_ratio: float = 0.9):
+        """按 mtime 从旧到新删除，直到总大小降到 max_bytes * target_ratio 以下"""
+        with self.lock:
+            files = sorted(((p.stat().st_mtime, p.stat().st_size, p) for p in self.root.rglob("*.json")),
+                           key=lambda x: x[0])
+            size = sum(s for _, s, _ in files)
+            limit = self.max_bytes * target_ratio
+            for _, s, p in files:
+                if size <= limit:
+                    break
+                p.unlink(missing_ok=True)
+                size -= s
+                self.stats["evictions"] += 1
+            self._size = size
+
+    def summary(self) -> dict:
+        with self.lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "hit_rate": round(self.stats["hits"] / total, 3) if total else 0.0,
+                    "bytes": self._size}
@@ -0,0 +1,95 @@
+# gpt_stub_server.py
+# 本地 OpenAI 兼容桩服务（仅 POST /v1/chat/completions），用于离线测试 create_ground_from_gpt 的批量吞吐/重试
+#   --latency    每个请求的固定延迟（秒），模拟远端推理耗时
+#   --fail_rate  按概率返回 429 或 503，用于验证退避重试
+from __future__ import annotations
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse, json, random, threading, time
+
+STUB_RECORD = {
+    "object_type": "ship",
+    "area": {"type": "point", "coords": [0, 0]},
+    "time_utc": "unknown",
+    "credibility": 0.5,
+    "evidence": [{"type": "photo", "uri": "unknown"}],
+    "notes": "stub response",
+    "provider": "stub",
+    "schema_version": "1.0",
+    "risk_indicators": {"level": "LOW", "reasons": []},
+}
+
+class _Stats:
+    lock = threading.Lock()
+    requests = 0
+    failures = 0
+    bytes_in = 0
+
+def make_handler(latency: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"           # keep-alive，便于验证连接池复用
+
+        def log_message(self, fmt, *args):      # 静默访问日志
+            pass
+
+        def _send(self, code: int, body: dict, headers: dict | None = None):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                with _Stats.lock:
+                    self._send(200, {"requests": _Stats.requests, "failures": _Stats.failures,
+                                     "bytes_in": _Stats.bytes_in})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(n) or b"{}")
+            with _Stats.lock:
+                _Stats.requests += 1
+                _Stats.bytes_in += n
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._send(404, {"error": "not found"})
+            time.sleep(latency)
+            if random.random() < fail_rate:
+                with _Stats.lock:
+                    _Stats.failures += 1
+                if random.random() < 0.5:
+                    return self._send(429, {"error": "rate limited"}, {"Retry-After": "0.2"})
+                return self._send(503, {"error": "unavailable"})
+            rec = dict(STUB_RECORD, notes=f"stub response for model {payload.get('model', '')}")
+            self._send(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "model": payload.get("model", ""),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": json.dumps(rec, ensure_ascii=False)}}],
+            })
+    return Handler
+
+def serve(host: str = "127.0.0.1", port: int = 8000, latency: float = 0.5, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer((host, port), make_handler(latency, fail_rate))
+    srv.daemon_threads = True
+    return srv
+
+def main():
+    ap = argparse.ArgumentParser("OpenAI-compatible stub server for offline throughput tests")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--fail_rate", type=float, default=0.0)
+    args = ap.parse_args()
+    srv = serve(args.host, args.port, args.latency, args.fail_rate)
+    print(f"[OK] stub listening on http://{args.host}:{args.port}/v1  (GET /stats for counters)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+# ground_io.py
+# 地面信息（create_ground_from_gpt 输出）的追加式存储与按条件加载：
+#   <root>/dt=YYYY-MM-DD/part-<时间>-<pid>-<uuid>.jsonl   每个写入器一个分片，只追加，嵌套字段原样保存
+#   <root>/dt=YYYY-MM-DD/part-*-c.parquet                  compact() 合并后的分片，嵌套字段为原生 struct/list 列
+#   每个分片旁有：
+#     .sum   分片摘要（JSON：行数、time_utc 与 area 包围盒的 min/max、object_type / risk_level 取值集合），
+#            查询先按摘要整片跳过，不命中的分片连索引都不读
+#     .idx   行索引：JSONL 分片为逐行追加的 JSONL（字节偏移），Parquet 分片为列式 .idx.parquet（行号）
+#   命中的行：JSONL 按字节偏移 seek，Parquet 只读包含命中行的 row group
+#   写入与合并通过分片文件上的 flock 交接：compact 先把旧分片改名再加锁读取，写入器加锁后发现文件已被改名则换新分片
+from __future__ import annotations
+from pathlib import Path
+import datetime as dt, fcntl, json, os, threading, uuid
+import pandas as pd
+
+DEFAULT_STORE = Path("ground/store")
+INDEX_SUFFIX = ".idx"
+SUMMARY_SUFFIX = ".sum"
+COMPACTING_TAG = ".compacting"                        # compact 改名后的 JSONL 分片：part-...<COMPACTING_TAG>.jsonl
+SHAPE_COL = "_ground_shape"                            # Parquet 分片中每行原始键结构（JSON），读回时只保留原有的键
+INDEX_COLS = ["record_id", "row", "off", "len", "object_type", "risk_level", "t_ns",
+              "x_min", "y_min", "x_max", "y_max"]
+
+def _coords(obj):
+    # area.coords 可能是点 / 环 / 多环，递归取出所有 (x, y)
+    if isinstance(obj, (list, tuple)):
+        if len(obj) >= 2 and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in obj[:2]):
+            yield float(obj[0]), float(obj[1])
+        else:
+            for o in obj:
+                yield from _coords(o)
+
+def _index_row(rec: dict) -> dict:
+    """索引字段；area 包围盒按 GeoJSON 约定 x=lon、y=lat，没有坐标时为空"""
+    pts = list(_coords((rec.get("area") or {}).get("coords"))) if isinstance(rec.get("area"), dict) else []
+    xs, ys = [p[0] for p in pts], [p[1] for p in pts]
+    t = pd.to_datetime(rec.get("time_utc"), errors="coerce", utc=True)
+    risk = rec.get("risk_indicators") if isinstance(rec.get("risk_indicators"), dict) else {}
+    return {
+        "record_id": rec.get("record_id"),
+        "object_type": rec.get("object_type"),
+        "risk_level": risk.get("level"),
+        "t_ns": None if pd.isna(t) else int(t.value),
+        "x_min": min(xs) if xs else None, "y_min": min(ys) if ys else None,
+        "x_max": max(xs) if xs else None, "y_max": max(ys) if ys else None,
+    }
+
+# ---------- 分片摘要 ----------
+def _new_summary() -> dict:
+    return {"n": 0, "t_min": None, "t_max": None, "x_min": None, "y_min": None, "x_max": None, "y_max": None,
+            "object_types": [], "risk_levels": []}
+
+def _merge_summary(s: dict, idx_rows: list[dict]) -> dict:
+    def lo(a, b): return b if a is None else a if b is None else min(a, b)
+    def hi(a, b): return b if a is None else a if b is None else max(a, b)
+    types, risks = set(s["object_types"]), set(s["risk_levels"])
+    for r in idx_rows:
+        s["t_min"], s["t_max"] = lo(s["t_min"], r["t_ns"]), hi(s["t_max"], r["t_ns"])
+        for k, f in (("x_min", lo), ("y_min", lo), ("x_max", hi), ("y_max", hi)):
+            s[k] = f(s[k], r[k])
+        types.add(r["object_type"] if isinstance(r["object_type"], str) else None)
+        risks.add(r["risk_level"].upper() if isinstance(r["risk_level"], str) else None)
+    s["n"] += len(idx_rows)
+    s["object_types"] = sorted(types, key=lambda v: (v is None, v or ""))
+    s["risk_levels"] = sorted(risks, key=lambda v: (v is None, v or ""))
+    return s
+
+def _write_json_atomic(path: Path, obj):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp.write_text(json.dumps(obj), encoding="utf-8")
+    os.replace(tmp, path)
+
+def _index_path(part: Path) -> Path:
+    return part.with_suffix(INDEX_SUFFIX + ".parquet") if part.suffix == ".parquet" else part.with_suffix(INDEX_SUFFIX)
+
+class GroundStore:
+    """追加写入器：同一进程内线程安全；多进程 / 多实例各写各的分片（文件名带 pid + uuid）"""
+
+    def __init__(self, root: str | Path = DEFAULT_STORE):
+        self.root = Path(root)
+        self.lock = threading.Lock()
+        self._part: Path | None = None
+        self._summary = _new_summary()
+
+    def _open_locked(self):
+        """
+        打开当前分片（首次 / 跨天 / 已被 compact 拿走时换一个新文件名）并加排他锁；
+        分片从不在原路径重建，加锁后路径已不指向 fd 所开文件即说明被改名，换新分片重试
+        """
+        while True:
+            day = dt.datetime.utcnow().strftime("%Y-%m-%d")
+            flags = os.O_WRONLY | os.O_APPEND
+            if self._part is None or self._part.parent.name != f"dt={day}":
+                d = self.root / f"dt={day}"
+                d.mkdir(parents=True, exist_ok=True)
+                ts = dt.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+                self._part = d / f"part-{ts}-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+                self._summary = _new_summary()
+                flags |= os.O_CREAT | os.O_EXCL
+            try:
+                fd = os.fdopen(os.open(self._part, flags, 0o644), "ab")
+            except FileNotFoundError:
+                self._part = None
+                continue
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                same = os.path.samestat(os.fstat(fd.fileno()), os.stat(self._part))
+            except FileNotFoundError:
+                same = False
+            if same:
+                return self._part, fd
+            fd.close()
+            self._part = None
+
+    def append(self, records: list[dict]) -> list[str]:
+        """写入记录（补 record_id / ingested_utc），返回 record_id 列表"""
+        if isinstance(records, dict):
+            records = [records]
+        now = dt.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        ids, idx_rows = [], []
+        with self.lock:
+            part, fd = self._open_locked()
+            try:
+                with part.with_suffix(INDEX_SUFFIX).open("a", encoding="utf-8") as fi:
+                    off = fd.seek(0, os.SEEK_END)
+                    for rec in records:
+                        rec = {"record_id": rec.get("record_id") or uuid.uuid4().hex,
+                               "ingested_utc": rec.get("ingested_utc") or now, **rec}
+                        line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+                        fd.write(line)
+                        row = _index_row(rec)
+                        fi.write(json.dumps({**row, "off": off, "len": len(line)}) + "\n")
+                        idx_rows.append(row)
+                        off += len(line)
+                        ids.append(rec["record_id"])
+                    fd.flush()
+                _write_json_atomic(part.with_suffix(SUMMARY_SUFFIX), _merge_summary(self._summary, idx_rows))
+            finally:
+                fd.close()                              # 关闭即释放 flock
+        return ids
+
+def _parts(root: Path) -> list[Path]:
+    return sorted(p for p in root.glob("dt=*/part-*")
+                  if p.suffix in (".jsonl", ".parquet") and INDEX_SUFFIX + "." not in p.name)
+
+def _read_summary(part: Path) -> dict | None:
+    p = part.with_suffix(SUMMARY_SUFFIX)
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None                                     # 旧存储没有摘要：不跳过
+
+def _summary_may_match(s: dict | None, object_type=None, risk_level=None, time_range=None, bbox=None) -> bool:
+    if s is None:
+        return True
+    if not s.get("n"):
+        return False
+    if object_type is not None and not _as_set(object_type) & set(s["object_types"]):
+        return False
+    if risk_level is not None and not {v.upper() for v in _as_set(risk_level)} & set(s["risk_levels"]):
+        return False
+    if time_range is not None:
+        if s["t_min"] is None:
+            return False
+        t0, t1 = time_range
+        if t0 is not None and s["t_max"] < pd.to_datetime(t0, utc=True).value:
+            return False
+        if t1 is not None and s["t_min"] > pd.to_datetime(t1, utc=True).value:
+            return False
+    if bbox is not None:
+        if s["x_min"] is None:
+            return False
+        x0, y0, x1, y1 = bbox
+        if s["x_max"] < x0 or s["x_min"] > x1 or s["y_max"] < y0 or s["y_min"] > y1:
+            return False
+    return True
+
+def _read_index(part: Path) -> pd.DataFrame:
+    p = _index_path(part)
+    if not p.exists():
+        return pd.DataFrame(columns=INDEX_COLS)
+    if p.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(p).to_pandas().reindex(columns=INDEX_COLS)
+    rows = [json.loads(l) for l in p.read_text(encoding="utf-8").splitlines() if l.strip()]
+    return pd.DataFrame(rows, columns=INDEX_COLS)
+
+def load_index(root: str | Path = DEFAULT_STORE, object_type=None, risk_level=None, time_range=None,
+               bbox=None) -> pd.DataFrame:
+    """摘要可能命中条件的分片的索引（每条记录一行，part 列为分片路径）；不给条件时为全部分片"""
+    root = Path(root)
+    parts = [p for p in _parts(root)
+             if _summary_may_match(_read_summary(p), object_type, risk_level, time_range, bbox)]
+    dfs = [_read_index(p).assign(part=str(p)) for p in parts]
+    dfs = [d for d in dfs if len(d)]
+    if not dfs:
+        return pd.DataFrame(columns=[*INDEX_COLS, "part"])
+    return pd.concat(dfs, ignore_index=True)
+
+def _as_set(v):
+    return {v} if isinstance(v, str) else set(v)
+
+def _filter_index(idx: pd.DataFrame, object_type=None, risk_level=None, time_range=None, bbox=None) -> pd.DataFrame:
+    m = pd.Series(True, index=idx.index)
+    if object_type is not None:
+        m &= idx["object_type"].isin(_as_set(object_type))
+    if risk_level is not None:
+        m &= idx["risk_level"].str.upper().isin({s.upper() for s in _as_set(risk_level)})
+    if time_range is not None:
+        t = pd.to_numeric(idx["t_ns"], errors="coerce")
+        t0, t1 = time_range
+        if t0 is not None:
+            m &= t >= pd.to_datetime(t0, utc=True).value
+        if t1 is not None:
+            m &= t <= pd.to_datetime(t1, utc=True).value
+    if bbox is not None:
+        x0, y0, x1, y1 = bbox
+        b = idx[["x_min", "y_min", "x_max", "y_max"]].apply(pd.to_numeric, errors="coerce")
+        m &= (b["x_max"] >= x0) & (b["x_min"] <= x1) & (b["y_max"] >= y0) & (b["y_min"] <= y1)
+    return idx[m]
+
+def _read_jsonl_rows(part: Path, hits: pd.DataFrame) -> list[dict]:
+    out = []
+    with part.open("rb") as f:
+        for off, n in zip(hits["off"].astype("int64"), hits["len"].astype("int64")):
+            f.seek(off)
+            out.append(json.loads(f.read(n)))
+    return out
+
+def _shape(v):
+    """记录的键结构：dict -> {键: 子结构}，list -> [子结构...]，其它为 0"""
+    if isinstance(v, dict):
+        return {k: _shape(x) for k, x in v.items()}
+    if isinstance(v, list):
+        return [_shape(x) for x in v]
+    return 0
+
+def _prune(v, shape):
+    """按原始键结构裁掉合并 schema 时补出来的键；原本就是 null 的值保留"""
+    if isinstance(shape, dict) and isinstance(v, dict):
+        return {k: _prune(v.get(k), s) for k, s in shape.items()}
+    if isinstance(shape, list) and isinstance(v, list):
+        return [_prune(x, s) for x, s in zip(v, shape)]
+    return v
+
+def _drop_nulls(v):
+    # 没有 SHAPE_COL 的旧 Parquet 分片：只能把所有 null 当作补出来的字段去掉
+    if isinstance(v, dict):
+        return {k: _drop_nulls(x) for k, x in v.items() if x is not None}
+    if isinstance(v, list):
+        return [_drop_nulls(x) for x in v]
+    return v
+
+def _read_parquet_rows(part: Path, hits: pd.DataFrame | None) -> list[dict]:
+    """只读包含命中行的 row group，再在其中按行号取"""
+    import numpy as np
+    import pyarrow as pa, pyarrow.parquet as pq
+    pf = pq.ParquetFile(part)
+    if hits is None:
+        t = pf.read()
+    else:
+        rows = np.sort(hits["row"].astype("int64").to_numpy())
+        starts = np.cumsum([0] + [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)])
+        rg = np.searchsorted(starts, rows, side="right") - 1
+        groups = np.unique(rg)
+        t = pf.read_row_groups(groups.tolist()) if len(groups) else pf.schema_arrow.empty_table()
+        # 所读 row group 拼接后，命中行的位置 = 行号 - 所在组起点 + 该组在拼接结果中的起点
+        base = dict(zip(groups.tolist(), np.cumsum([0] + [starts[g + 1] - starts[g] for g in groups])[:-1]))
+        t = t.take(pa.array(rows - starts[rg] + np.array([base[g] for g in rg.tolist()], dtype="int64")))
+    meta = pf.schema_arrow.metadata or {}
+    json_cols = json.loads(meta.get(b"ground_json_cols", b"[]"))
+    rows_out = []
+    for r in t.to_pylist():
+        shape = r.pop(SHAPE_COL, None)
+        for c in json_cols:
+            if r.get(c) is not None:
+                r[c] = json.loads(r[c])
+        rows_out.append(_prune(r, json.loads(shape)) if shape is not None else _drop_nulls(r))
+    return rows_out
+
+def load_ground_info(root: str | Path = DEFAULT_STORE, object_type=None, risk_level=None,
+                     time_range=None, bbox=None) -> pd.DataFrame:
+    """
+    按摘要跳过分片、按索引过滤后加载记录，嵌套字段保持 dict/list：
+      object_type / risk_level 为单个值或集合；time_range=(t0, t1) 按 time_utc 闭区间（无法解析的时间不命中）；
+      bbox=(x_min, y_min, x_max, y_max) 与 area 包围盒相交
+    """
+    root = Path(root)
+    idx = _filter_index(load_index(root, object_type, risk_level, time_range, bbox),
+                        object_type, risk_level, time_range, bbox)
+    rows = []
+    for part, hits in idx.groupby("part", sort=True):
+        part = Path(part)
+        rows += _read_jsonl_rows(part, hits) if part.suffix == ".jsonl" else _read_parquet_rows(part, hits)
+    df = pd.DataFrame(rows)
+    if "record_id" in df.columns:
+        df = df.drop_duplicates(subset="record_id", keep="last").reset_index(drop=True)   # compact 中断时的重复
+    if "time_utc" in df.columns:
+        df["time_utc_parsed"] = pd.to_datetime(df["time_utc"], errors="coerce", utc=True, format="ISO8601")
+    return df
+
+def _to_table(rows: list[dict]):
+    """
+    嵌套字段尽量转原生 struct/list 列；类型冲突（同一字段既有字符串又有布尔等）的列退化为 JSON 字符串。
+    SHAPE_COL 记录每行原始键结构，读回时据此去掉 struct 合并补出的 null 字段
+    """
+    import pyarrow as pa
+    cols = list(dict.fromkeys(k for r in rows for k in r))
+    arrays, json_cols = [], []
+    for c in cols:
+        vals = [r.get(c) for r in rows]
+        try:
+            arrays.append(pa.array(vals))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array([None if v is None else json.dumps(v, ensure_ascii=False) for v in vals]))
+            json_cols.append(c)
+    arrays.append(pa.array([json.dumps(_shape(r), separators=(",", ":")) for r in rows]))
+    return pa.Table.from_arrays(arrays, names=[*cols, SHAPE_COL]).replace_schema_metadata(
+        {"ground_json_cols": json.dumps(json_cols)})
+
+def _claim(p: Path) -> Path:
+    """把待合并的 JSONL 分片（连同 .idx/.sum）改名，并等持有旧文件的写入器写完（flock）"""
+    if COMPACTING_TAG in p.name:
+        return p                                        # 上次 compact 中断留下的，已改过名
+    q = p.with_name(p.stem + COMPACTING_TAG + p.suffix)
+    os.replace(p, q)                                    # 之后的写入器打不开原路径，会换新分片
+    with q.open("rb") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)                   # 等改名前已拿到锁的写入器把数据和 .idx/.sum 写完
+        for suf in (INDEX_SUFFIX, SUMMARY_SUFFIX):
+            if p.with_suffix(suf).exists():
+                os.replace(p.with_suffix(suf), q.with_suffix(suf))
+    return q
+
+def compact(root: str | Path = DEFAULT_STORE, min_age_s: float = 60.0, row_group_size: int = 4096) -> int:
+    """
+    把每个 dt= 分区中不再写入（mtime 早于 min_age_s）的 JSONL 分片合并为一个 Parquet 分片。
+    先改名旧分片（写入器之后的追加会落到新分片），再写 Parquet、列式索引与摘要，最后删旧分片；
+    中途中断只会留下重复记录，加载时按 record_id 去重。返回合并的记录数
+    """
+    import pyarrow as pa, pyarrow.parquet as pq
+    import time
+    root = Path(root)
+    n_total = 0
+    for d in sorted(root.glob("dt=*")):
+        olds = [p for p in sorted(d.glob("part-*.jsonl")) if time.time() - p.stat().st_mtime >= min_age_s]
+        if not olds:
+            continue
+        olds = [_claim(p) for p in olds]
+        rows = []
+        for p in olds:
+            rows += [json.loads(l) for l in p.read_text(encoding="utf-8").splitlines() if l.strip()]
+        rows = list({r.get("record_id") or i: r for i, r in enumerate(rows)}.values())   # 同一 record_id 重复追加只留最后一条
+        if rows:
+            ts = dt.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+            out = d / f"part-{ts}-{os.getpid()}-{uuid.uuid4().hex[:8]}-c.parquet"
+            tmp = out.with_name(out.name + ".tmp")
+            pq.write_table(_to_table(rows), tmp, row_group_size=row_group_size)
+            idx_rows = [_index_row(rec) for rec in rows]
+            idx = pd.DataFrame([{**r, "row": i} for i, r in enumerate(idx_rows)]).reindex(columns=INDEX_COLS)
+            idx_tmp = _index_path(out).with_name(_index_path(out).name + ".tmp")
+            pq.write_table(pa.Table.from_pandas(idx, preserve_index=False), idx_tmp)
+            os.replace(idx_tmp, _index_path(out))
+            _write_json_atomic(out.with_suffix(SUMMARY_SUFFIX), _merge_summary(_new_summary(), idx_rows))
+            os.replace(tmp, out)
+            n_total += len(rows)
+        for p in olds:
+            for suf in (INDEX_SUFFIX, SUMMARY_SUFFIX):
+                p.with_suffix(suf).unlink(missing_ok=True)
+            p.unlink(missing_ok=True)
+    return n_total
+
+def import_legacy(info_dir: str | Path = "ground/info", root: str | Path = DEFAULT_STORE) -> int:
+    """把旧的 ground_info_gpt_*.json / 批量 *.jsonl 导入存储，返回导入条数"""
+    store = GroundStore(root)
+    n = 0
+    for p in sorted(Path(info_dir).glob("ground_info_gpt_*.json*")):
+        if p.suffix == ".json":
+            recs = json.loads(p.read_text(encoding="utf-8"))
+            recs = recs if isinstance(recs, list) else [recs]
+        else:
+            recs = [json.loads(l) for l in p.read_text(encoding="utf-8").splitlines() if l.strip()]
+        for r in recs:
+            r.setdefault("source_file", p.name)
+        n += len(store.append(recs))
+    return n
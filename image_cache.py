@@ -0,0 +1,112 @@
+# image_cache.py
+# 训练用的持久化解码图像缓存：每张图按 ultralytics load_image(rect_mode=True) 的规则缩放到最长边 imgsz，
+# 以 uint8 原始像素顺序写进一个大文件，np.memmap 打开后按偏移切片即可，不再每个 epoch 重新解码 JPEG。
+#   <labels>/<split>.imgs<imgsz>.u8     像素数据（只追加）
+#   <labels>/<split>.imgs<imgsz>.json   索引：文件路径 -> (size, mtime_ns, offset, h, w, h0, w0)
+# 与 labels/<split>.cache 放在一起；图片 size/mtime 变化或新增时只追加这些图，失效字节超过一半时整体重写。
+# memmap 只读、按需在各 DataLoader worker 进程里打开（fork/spawn 均可），多个训练进程共享同一页缓存。
+# 校验/补建全程持有 <blob>.lock 的排他 flock，拿到锁后才读索引：并发启动的多个训练进程（DDP 各 rank）不会交错追加或互相覆盖索引。
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import fcntl, json, math, os
+import numpy as np
+
+CACHE_VERSION = 1
+
+def resize_like_ultralytics(im: np.ndarray, imgsz: int) -> np.ndarray:
+    """与 BaseDataset.load_image(rect_mode=True) 相同：最长边缩放到 imgsz，向上取整并截断到 imgsz"""
+    import cv2
+    h0, w0 = im.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz)
+        im = cv2.resize(im, (w, h), interpolation=cv2.INTER_LINEAR)
+    return im
+
+def _decode(path: str, imgsz: int):
+    import cv2
+    im = cv2.imread(path)
+    if im is None:
+        raise FileNotFoundError(f"Image Not Found {path}")
+    if im.ndim == 2:
+        im = cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)
+    h0, w0 = im.shape[:2]
+    return np.ascontiguousarray(resize_like_ultralytics(im, imgsz)), (h0, w0)
+
+class ImageMemmapCache:
+    def __init__(self, base: str | Path, imgsz: int):
+        """base 为 labels/<split>（与 <split>.cache 同名去后缀）"""
+        base = Path(base)
+        self.imgsz = int(imgsz)
+        self.blob = base.with_name(f"{base.name}.imgs{self.imgsz}.u8")
+        self.index_path = base.with_name(f"{base.name}.imgs{self.imgsz}.json")
+        self.lock_path = base.with_name(f"{base.name}.imgs{self.imgsz}.lock")
+        self._mm = None
+        self._entries: list[tuple[int, int, int, int, int]] = []
+
+    def __getstate__(self):
+        d = self.__dict__.copy()
+        d["_mm"] = None                               # 不把 memmap 序列化进 worker，按需重开
+        return d
+
+    def _load_index(self) -> dict:
+        try:
+            idx = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if idx.get("version") != CACHE_VERSION or idx.get("imgsz") != self.imgsz or not self.blob.exists():
+            return {}
+        return idx.get("files", {})
+
+    def _save_index(self, files: dict):
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "imgsz": self.imgsz, "files": files}), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def build(self, im_files: list[str], workers: int = 8, log=print) -> "ImageMemmapCache":
+        """校验/补建缓存，并按 im_files 顺序准备条目；返回 self（整个过程持有排他锁，等到锁后重新读索引）"""
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock_path.open("a") as lk:
+            fcntl.flock(lk, fcntl.LOCK_EX)                # 其它进程在建时阻塞；解锁随文件关闭
+            return self._build_locked(im_files, workers, log)
+
+    def _build_locked(self, im_files: list[str], workers: int, log) -> "ImageMemmapCache":
+        files = self._load_index()                         # 必须在锁内读：前一个持锁者可能刚追加/重写过
+        stats = {}
+        for f in im_files:
+            st = os.stat(f)
+            stats[f] = (st.st_size, st.st_mtime_ns)
+        stale = [f for f in im_files if f not in files or tuple(files[f][:2]) != stats[f]]
+        live = sum(files[f][3] * files[f][4] * 3 for f in im_files if f in files and f not in stale)
+        size = self.blob.stat().st_size if self.blob.exists() else 0
+        if files and size and live < size / 2:                     # 失效数据过半：整体重建
+            files, stale, size = {}, list(im_files), 0
+            self.blob.unlink(missing_ok=True)
+        if stale:
+            log(f"[CACHE] decoding {len(stale)}/{len(im_files)} images into {self.blob}")
+            tmp_files = dict(files)
+            with self.blob.open("ab") as fo, ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+                off = fo.seek(0, os.SEEK_END)
+                for f, (im, (h0, w0)) in zip(stale, ex.map(lambda p: _decode(p, self.imgsz), stale)):
+                    fo.write(im.tobytes())
+                    h, w = im.shape[:2]
+                    tmp_files[f] = [*stats[f], off, h, w, h0, w0]
+                    off += im.nbytes
+                fo.flush()
+                os.fsync(fo.fileno())
+            files = tmp_files
+            self._save_index(files)                    # 数据落盘后再写索引
+        self._entries = [tuple(files[f][2:]) for f in im_files]
+        self._mm = None
+        return self
+
+    def nbytes(self) -> int:
+        return sum(h * w * 3 for _, h, w, _, _ in self._entries)
+
+    def get(self, i: int) -> tuple[np.ndarray, tuple[int, int]]:
+        """第 i 张图（可写副本，增强会原地修改）与原始 (h0, w0)"""
+        if self._mm is None:
+            self._mm = np.memmap(self.blob, dtype=np.uint8, mode="r")
+        off, h, w, h0, w0 = self._entries[i]
+        return np.array(self._mm[off:off + h * w * 3]).reshape(h, w, 3), (h0, w0)
@@ -0,0 +1,156 @@
+# image_prep.py
+# create_ground_from_gpt 上传前的图像预处理：缩放到最长边 max_side、按质量上限重新编码为 JPEG/WebP、
+# 超大场景可切成若干块分别请求；base64 以流的方式写进请求体，不在内存里保留多份完整副本。
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+import base64, io
+
+MIME = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime: str
+    width: int
+    height: int
+    tile: tuple[int, int, int, int] | None = None     # 原图坐标 (x, y, w, h)；未切块为 None
+
+    def b64_len(self) -> int:
+        return 4 * ((len(self.data) + 2) // 3)
+
+@dataclass
+class PrepOptions:
+    max_side: int = 2048          # 0 表示不缩放
+    fmt: str = "jpeg"             # jpeg / webp / keep（原样上传，不解码）
+    quality: int = 85
+    min_quality: int = 50
+    max_kb: int = 0               # >0 时逐步降低质量直到不超过该大小
+    tile_over: int = 0            # >0 且原图最长边超过该值时切块
+    tile_size: int = 2048
+    tile_overlap: int = 128
+
+    def tag(self) -> str:
+        # 参与响应缓存 key：预处理参数不同，结果不能混用
+        return (f"{self.fmt}:{self.max_side}:{self.quality}:{self.min_quality}:{self.max_kb}:"
+                f"{self.tile_over}:{self.tile_size}:{self.tile_overlap}")
+
+def _encode(im, fmt: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        im.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "webp":
+        im.save(buf, "WEBP", quality=quality, method=4)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return buf.getvalue()
+
+def _encode_bounded(im, opt: PrepOptions) -> bytes:
+    q = opt.quality
+    data = _encode(im, opt.fmt, q)
+    while opt.max_kb and len(data) > opt.max_kb * 1024 and q > opt.min_quality:
+        q = max(opt.min_quality, q - 10)
+        data = _encode(im, opt.fmt, q)
+    return data
+
+def _tiles(w: int, h: int, size: int, overlap: int):
+    step = max(1, size - overlap)
+    xs = list(range(0, max(w - size, 0) + 1, step)) or [0]
+    ys = list(range(0, max(h - size, 0) + 1, step)) or [0]
+    if xs[-1] + size < w: xs.append(w - size)
+    if ys[-1] + size < h: ys.append(h - size)
+    for y in ys:
+        for x in xs:
+            yield x, y, min(size, w - x), min(size, h - y)
+
+def prepare_image(path: Path, opt: PrepOptions | None = None) -> list[PreparedImage]:
+    """返回一张或多张（切块时）待上传的图像"""
+    opt = opt or PrepOptions()
+    raw = path.read_bytes()
+    suffix = path.suffix.lower()
+    if opt.fmt == "keep":
+        from PIL import Image
+        with Image.open(io.BytesIO(raw)) as im:
+            w, h = im.size
+        mime = "image/jpeg" if suffix in {".jpg", ".jpeg"} else MIME.get(suffix.lstrip("."), "image/png")
+        return [PreparedImage(raw, mime, w, h)]
+
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(raw)) as src:
+        im = ImageOps.exif_transpose(src)
+        im = im.convert("RGB")
+    del raw
+    W, H = im.size
+    boxes = list(_tiles(W, H, opt.tile_size, opt.tile_overlap)) if opt.tile_over and max(W, H) > opt.tile_over \
+        else [None]
+    out = []
+    for box in boxes:
+        part = im if box is None else im.crop((box[0], box[1], box[0] + box[2], box[1] + box[3]))
+        if opt.max_side and max(part.size) > opt.max_side:
+            r = opt.max_side / max(part.size)
+            part = part.resize((max(1, round(part.width * r)), max(1, round(part.height * r))), Image.LANCZOS)
+        data = _encode_bounded(part, opt)
+        out.append(PreparedImage(data, MIME[opt.fmt], part.width, part.height, box))
+    # 未缩放、未切块且重新编码反而更大时，沿用原文件
+    if len(out) == 1 and boxes == [None] and (out[0].width, out[0].height) == (W, H) \
+            and suffix in {".jpg", ".jpeg"} and len(out[0].data) >= path.stat().st_size:
+        out = [PreparedImage(path.read_bytes(), "image/jpeg", W, H)]
+    return out
+
+class StreamingBody:
+    """
+    请求体 = JSON 前缀 + data:<mime>;base64,<分块编码> + JSON 后缀。
+    提供 read()/__len__，requests 会带上 Content-Length 并按块发送，不会拼出完整的 base64 字符串。
+    """
+    CHUNK = 3 * 64 * 1024
+
+    def __init__(self, prefix: str, img: PreparedImage, suffix: str):
+        self._head = prefix.encode("utf-8") + f"data:{img.mime};base64,".encode("ascii")
+        self._tail = suffix.encode("utf-8")
+        self._img = memoryview(img.data)
+        self._len = len(self._head) + img.b64_len() + len(self._tail)
+        self._pos, self._stage, self._buf = 0, 0, b""
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK)
+            if not chunk:
+                return
+            yield chunk
+
+    def _next_piece(self) -> bytes:
+        if self._stage == 0:
+            self._stage = 1
+            return self._head
+        if self._stage == 1:
+            if self._pos < len(self._img):
+                piece = base64.b64encode(self._img[self._pos:self._pos + self.CHUNK])
+                self._pos += self.CHUNK
+                return piece
+            self._stage = 2
+        if self._stage == 2:
+            self._stage = 3
+            return self._tail
+        return b""
+
+    def read(self, n: int = -1) -> bytes:
+        while n < 0 or len(self._buf) < n:
+            piece = self._next_piece()
+            if not piece:
+                break
+            self._buf += piece
+        if n < 0:
+            out, self._buf = self._buf, b""
+        else:
+            out, self._buf = self._buf[:n], self._buf[n:]
+        return out
+
+def fmt_saving(name: str, orig_bytes: int, imgs: list[PreparedImage]) -> str:
+    new = sum(len(i.data) for i in imgs)
+    pct = 100.0 * (1 - new / orig_bytes) if orig_bytes else 0.0
+    dims = ", ".join(f"{i.width}x{i.height}" for i in imgs[:4]) + (" ..." if len(imgs) > 4 else "")
+    return (f"[PREP] {name}: {orig_bytes / 1024:.0f}KB -> {new / 1024:.0f}KB "
+            f"({pct:.0f}% saved, {orig_bytes - new} bytes), {len(imgs)} part(s): {dims}")
@@ -0,0 +1,232 @@
+# kinematic_anomaly.py
+# 有状态、增量的运动学一致性异常检测（ADS-B 欺骗 / 数据损坏往往表现为字段之间随时间不自洽）：
+#   ADS-B：位置差分速度 vs gs_mps、高度差分爬升率 vs roc_mps、trk_deg 转弯率超限、nacp/nic 骤降且跌破下限
+#   雷达：  位置差分速度 vs vel_mps、vel_mps 加速度超限
+# 每个目标（icao24 / radar_id+track_id）只保留上一观测的几列（紧凑 numpy 数组，按目标编码下标，容量倍增）；
+# 每批数据按 (目标, 时间) 排序后，批内前驱 = 上一行，批首前驱 = 状态数组，整列计算，复杂度 O(批大小)。
+# 输出沿用 pred 结构（alert_rules.*_PRED_COLS + alert + score），另附 reason 列说明命中的检查项。
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import numpy as np
+import pandas as pd
+import metrics
+
+TIME_COL = "timestamp_utc"
+EARTH_R_M = 6_371_008.8
+FT_TO_M = 0.3048
+
+# 检查项阈值：偏差超过 tol 开始计分，达到 2×tol 记满分 1.0
+ADSB_CHECKS = {
+    "pos_speed": {"tol_mps": 60.0, "tol_rel": 0.35},      # |位置差分速度 - gs| > max(tol_mps, tol_rel*gs)
+    "climb":     {"tol_mps": 15.0},                        # |高度差分爬升率 - roc|
+    "turn_rate": {"tol_dps": 8.0, "min_gs_mps": 30.0},     # |Δtrk|/dt（标准转弯 3°/s）
+    "integrity": {"drop": 2, "nacp_min": 7, "nic_min": 6},  # nacp/nic 一次下降 ≥ drop 且跌破下限
+}
+RADAR_CHECKS = {
+    "pos_speed": {"tol_mps": 80.0, "tol_rel": 0.5},
+    "accel":     {"tol_mps2": 30.0},
+}
+MIN_DT_S, MAX_DT_S = 0.5, 60.0            # 前后观测间隔不在此范围内的不做差分检查
+ALERT_SCORE = 0.5                          # 综合分 ≥ 此值输出为 anomaly
+
+def _haversine_m(lat0, lon0, lat1, lon1):
+    p0, p1 = np.radians(lat0), np.radians(lat1)
+    dphi, dlmb = p1 - p0, np.radians(lon1 - lon0)
+    a = np.sin(dphi / 2) ** 2 + np.cos(p0) * np.cos(p1) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_R_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _mean2(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """前后两次观测的均值，任一为 NaN 时取另一个"""
+    return np.where(np.isnan(a), b, np.where(np.isnan(b), a, (a + b) / 2))
+
+def _ramp(excess, tol):
+    """超出 tol 的部分线性映射到 [0, 1]，NaN 视为 0"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        s = (excess - tol) / tol
+    return np.nan_to_num(np.clip(s, 0.0, 1.0))
+
+class KinematicDetector:
+    """
+    det = KinematicDetector("adsb")
+    for batch in follow_adsb_info():
+        anomalies = det.update(batch)        # 只含异常行；update(batch, all_rows=True) 返回整批打分
+    """
+    STATE_COLS = {"adsb": ("lat", "lon", "alt_baro_ft", "gs_mps", "trk_deg", "roc_mps", "nacp", "nic"),
+                  "radar": ("lat", "lon", "vel_mps")}
+
+    def __init__(self, kind: str = "adsb", checks: dict | None = None, alert_score: float = ALERT_SCORE,
+                 capacity: int = 1024):
+        if kind not in self.STATE_COLS:
+            raise ValueError(f"kind must be adsb/radar: {kind}")
+        self.kind = kind
+        self.checks = checks or (ADSB_CHECKS if kind == "adsb" else RADAR_CHECKS)
+        self.alert_score = alert_score
+        self.id_cols = ["icao24"] if kind == "adsb" else ["radar_id", "track_id"]
+        self._codes: dict[str, int] = {}
+        self.last_t = np.full(capacity, np.iinfo("int64").min, dtype="int64")
+        self.last = {c: np.full(capacity, np.nan, dtype="float64") for c in self.STATE_COLS[kind]}
+        self.n_anom = np.zeros(capacity, dtype="int32")     # 每个目标累计异常次数
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def _grow(self, n: int):
+        cap = len(self.last_t)
+        if n <= cap:
+            return
+        new = max(n, cap * 2)
+        self.last_t = np.concatenate([self.last_t, np.full(new - cap, np.iinfo("int64").min, dtype="int64")])
+        self.last = {c: np.concatenate([a, np.full(new - cap, np.nan)]) for c, a in self.last.items()}
+        self.n_anom = np.concatenate([self.n_anom, np.zeros(new - cap, dtype="int32")])
+
+    def _encode(self, df: pd.DataFrame) -> np.ndarray:
+        """目标 ID -> 状态数组下标；category 列只对取值集合查字典"""
+        codes = self._codes
+        if len(self.id_cols) == 1:
+            s = df[self.id_cols[0]]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                lut = np.fromiter((codes.setdefault(str(v), len(codes)) for v in s.cat.categories),
+                                  dtype="int64", count=len(s.cat.categories))
+                c = s.cat.codes.to_numpy()
+                return np.where(c >= 0, lut[np.maximum(c, 0)], -1)
+            keys = s.astype(str).to_numpy()
+        else:
+            keys = (df[self.id_cols[0]].astype(str) + "|" + df[self.id_cols[1]].astype(str)).to_numpy()
+        return np.fromiter((codes.setdefault(k, len(codes)) for k in keys), dtype="int64", count=len(keys))
+
+    def _col(self, df: pd.DataFrame, c: str) -> np.ndarray:
+        if c not in df.columns:
+            return np.full(len(df), np.nan)
+        return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+    def update(self, df: pd.DataFrame, all_rows: bool = False) -> pd.DataFrame:
+        """处理一批新记录：打分、滚动更新状态，返回异常行（all_rows=True 返回整批）"""
+        from alert_rules import ADSB_PRED_COLS, RADAR_PRED_COLS
+        pred_cols = ADSB_PRED_COLS if self.kind == "adsb" else RADAR_PRED_COLS
+        if df is None or not len(df):
+            return pd.DataFrame(columns=[*pred_cols, "alert", "score", "reason"])
+        with metrics.timer(f"kinematic.{self.kind}.update"):
+            df = df[df[TIME_COL].notna() & df["lat"].notna() & df["lon"].notna()]
+            code = self._encode(df)
+            keep = code >= 0
+            df, code = df[keep], code[keep]
+            self._grow(len(self._codes))
+            t = df[TIME_COL].to_numpy(dtype="datetime64[ns]").view("int64")
+            order = np.lexsort((t, code))
+            df, code, t = df.iloc[order].reset_index(drop=True), code[order], t[order]
+            cur = {c: self._col(df, c) for c in self.STATE_COLS[self.kind]}
+
+            # 前驱：同一目标批内上一行，否则取状态数组
+            first = np.ones(len(df), dtype=bool)
+            first[1:] = code[1:] != code[:-1]
+            prev_t = np.where(first, self.last_t[code], np.roll(t, 1))
+            prev = {c: np.where(first, self.last[c][code], np.roll(v, 1)) for c, v in cur.items()}
+            with np.errstate(invalid="ignore"):
+                dt = (t - prev_t).astype("float64") / 1e9
+            ok = (prev_t != np.iinfo("int64").min) & (dt >= MIN_DT_S) & (dt <= MAX_DT_S)
+            dt = np.where(ok, dt, np.nan)
+
+            parts = self._score_adsb(cur, prev, dt) if self.kind == "adsb" else self._score_radar(cur, prev, dt)
+            score = 1.0 - np.prod([1.0 - s for s in parts.values()], axis=0)
+            names = np.array(list(parts))
+            hit = np.stack(list(parts.values()), axis=1) > 0
+            reason = np.array([",".join(names[h]) for h in hit], dtype=object) if hit.any() \
+                else np.full(len(df), "", dtype=object)
+
+            # 滚动状态：每个目标取本批最后一行；乱序（比状态更早）的批不回退状态
+            last = np.ones(len(df), dtype=bool)
+            last[:-1] = code[1:] != code[:-1]
+            lc = code[last]
+            newer = t[last] > self.last_t[lc]
+            self.last_t[lc[newer]] = t[last][newer]
+            for c, v in cur.items():
+                self.last[c][lc[newer]] = v[last][newer]
+            is_anom = score >= self.alert_score
+            np.add.at(self.n_anom, code[is_anom], 1)
+
+        metrics.count(f"kinematic.{self.kind}.rows", len(df))
+        metrics.count(f"kinematic.{self.kind}.anomalies", int(is_anom.sum()))
+        out = df[[c for c in pred_cols if c in df.columns]].copy()
+        out["alert"] = np.where(is_anom, "anomaly", "normal")
+        out["score"] = np.round(score, 3)
+        out["reason"] = reason
+        return out.reset_index(drop=True) if all_rows else out[is_anom].reset_index(drop=True)
+
+    def _score_adsb(self, cur: dict, prev: dict, dt: np.ndarray) -> dict[str, np.ndarray]:
+        ck = self.checks
+        dist = _haversine_m(prev["lat"], prev["lon"], cur["lat"], cur["lon"])
+        gs = _mean2(prev["gs_mps"], cur["gs_mps"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            v_pos = dist / dt
+            climb = (cur["alt_baro_ft"] - prev["alt_baro_ft"]) * FT_TO_M / dt
+            roc = _mean2(prev["roc_mps"], cur["roc_mps"])
+            dtrk = np.abs((cur["trk_deg"] - prev["trk_deg"] + 180.0) % 360.0 - 180.0) / dt
+        c = ck["pos_speed"]
+        tol = np.maximum(c["tol_mps"], c["tol_rel"] * np.nan_to_num(gs))
+        out = {"pos_speed": _ramp(np.abs(v_pos - gs), tol)}
+        out["climb"] = _ramp(np.abs(climb - roc), ck["climb"]["tol_mps"])
+        c = ck["turn_rate"]
+        out["turn_rate"] = np.where(cur["gs_mps"] >= c["min_gs_mps"], _ramp(dtrk, c["tol_dps"]), 0.0)
+        c = ck["integrity"]
+        with np.errstate(invalid="ignore"):
+            bad = ((prev["nacp"] - cur["nacp"] >= c["drop"]) & (cur["nacp"] < c["nacp_min"])) | \
+                  ((prev["nic"] - cur["nic"] >= c["drop"]) & (cur["nic"] < c["nic_min"]))
+        out["integrity"] = np.where(np.isfinite(dt) & bad, 1.0, 0.0)
+        return out
+
+    def _score_radar(self, cur: dict, prev: dict, dt: np.ndarray) -> dict[str, np.ndarray]:
+        ck = self.checks
+        dist = _haversine_m(prev["lat"], prev["lon"], cur["lat"], cur["lon"])
+        vel = _mean2(prev["vel_mps"], cur["vel_mps"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            v_pos = dist / dt
+            acc = np.abs(cur["vel_mps"] - prev["vel_mps"]) / dt
+        c = ck["pos_speed"]
+        tol = np.maximum(c["tol_mps"], c["tol_rel"] * np.nan_to_num(vel))
+        return {"pos_speed": _ramp(np.abs(v_pos - vel), tol),
+                "accel": _ramp(acc, ck["accel"]["tol_mps2"])}
+
+def main():
+    ap = argparse.ArgumentParser("Streaming kinematic-consistency anomaly detector")
+    ap.add_argument("--kind", choices=["adsb", "radar"], default="adsb")
+    ap.add_argument("--root", default="", help="数据目录，默认 ./adsb/info 或 ./radar/info")
+    ap.add_argument("--follow", action="store_true", help="跟随模式：持续处理新追加的记录")
+    ap.add_argument("--poll", type=float, default=0.5)
+    ap.add_argument("--chunksize", type=int, default=100_000, help="非跟随模式下每批行数")
+    ap.add_argument("--min_score", type=float, default=ALERT_SCORE)
+    ap.add_argument("--out", default="", help="异常记录追加写入的 CSV（pred 结构 + reason）")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.setup_from_args(args, "kinematic_anomaly")
+
+    root = Path(args.root or f"./{args.kind}/info")
+    det = KinematicDetector(args.kind, alert_score=args.min_score)
+    if args.kind == "adsb":
+        from adsb_io import follow_adsb_info as follow, iter_adsb_info as iter_batches
+    else:
+        from radar_io import follow_radar_info as follow, iter_radar_info as iter_batches
+    batches = follow(root, poll_s=args.poll) if args.follow else iter_batches(root, chunksize=args.chunksize)
+    out = Path(args.out) if args.out else None
+    n_rows = n_anom = 0
+    try:
+        for batch in batches:
+            res = det.update(batch)
+            n_rows += len(batch)
+            n_anom += len(res)
+            if len(res) and out is not None:
+                out.parent.mkdir(parents=True, exist_ok=True)
+                res.to_csv(out, mode="a", header=not out.exists(), index=False, date_format="%Y-%m-%dT%H:%M:%SZ")
+            elif len(res):
+                print(res.to_string(index=False, max_rows=20))
+    except KeyboardInterrupt:
+        pass
+    print(f"[STAT] {n_rows} 行 / {len(det)} 个目标，异常 {n_anom} 行")
+
+if __name__ == "__main__":
+    main()
+
+'''
+python kinematic_anomaly.py --kind adsb
+python kinematic_anomaly.py --kind radar --root ./loadtest/radar/info --follow --out ./radar/pred/kinematic_anomalies.csv
+'''
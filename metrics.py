@@ -0,0 +1,152 @@
+# metrics.py
+# 轻量埋点：阶段计时（上下文管理器 / 装饰器）、计数器（行数、字节、请求）、内存高水位；
+# 默认关闭，关闭时 timer() 返回共享的空上下文、count() 直接返回，开销只是一次布尔判断。
+#   开启：环境变量 BIGWORK_METRICS=1，或脚本里 metrics.enable()（各脚本的 --metrics 开关）
+#   报告：BIGWORK_METRICS_OUT=<path.json> / BIGWORK_METRICS_PROM=<path.prom>，进程退出时自动写出；
+#         也可手动 metrics.write_report(json_path, prom_path)
+from __future__ import annotations
+from functools import wraps
+from pathlib import Path
+import atexit, json, os, resource, sys, threading, time
+
+_enabled = os.environ.get("BIGWORK_METRICS", "").lower() in ("1", "true", "yes", "on")
+_lock = threading.Lock()
+_timers: dict[str, list[float]] = {}        # name -> [调用次数, 总秒数, 最大秒数]
+_counters: dict[str, float] = {}
+_marks: dict[str, float] = {}               # 标签 -> 当时的 maxrss（MB）
+_t_start = time.time()
+
+class _Noop:
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _Noop()
+
+def enabled() -> bool:
+    return _enabled
+
+def enable(on: bool = True, json_out: str | None = None, prom_out: str | None = None):
+    """脚本的 --metrics 开关调用；json_out/prom_out 非空时进程退出写报告"""
+    global _enabled
+    _enabled = on
+    if json_out:
+        os.environ["BIGWORK_METRICS_OUT"] = json_out
+    if prom_out:
+        os.environ["BIGWORK_METRICS_PROM"] = prom_out
+
+def observe(name: str, seconds: float):
+    """记录一次已知耗时（如 ultralytics Results.speed 给出的毫秒数 / 1000）"""
+    if not _enabled:
+        return
+    with _lock:
+        t = _timers.get(name)
+        if t is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            t[0] += 1; t[1] += seconds
+            if seconds > t[2]:
+                t[2] = seconds
+
+class _Timer:
+    __slots__ = ("name", "t0")
+    def __init__(self, name: str):
+        self.name = name
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0)
+        return False
+
+def timer(name: str):
+    """with metrics.timer("adsb.read"): ..."""
+    return _Timer(name) if _enabled else _NOOP
+
+def timed(name: str):
+    """装饰器版 timer；开关在调用时判断，可在 import 之后再 enable()"""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*a, **kw):
+            if not _enabled:
+                return fn(*a, **kw)
+            with _Timer(name):
+                return fn(*a, **kw)
+        return wrapper
+    return deco
+
+def count(name: str, n: float = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def _maxrss_mb() -> float:
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / 2 ** 20 if sys.platform == "darwin" else r / 1024     # macOS 为字节，Linux 为 KB
+
+def mark(label: str):
+    """记录到此为止的内存高水位（进程 maxrss）"""
+    if not _enabled:
+        return
+    with _lock:
+        _marks[label] = round(_maxrss_mb(), 1)
+
+def report() -> dict:
+    with _lock:
+        timers = {k: {"calls": int(c), "total_s": round(tot, 6), "mean_ms": round(tot / c * 1000, 3),
+                      "max_ms": round(mx * 1000, 3)} for k, (c, tot, mx) in sorted(_timers.items())}
+        return {"argv": sys.argv, "pid": os.getpid(), "wall_s": round(time.time() - _t_start, 3),
+                "maxrss_mb": round(_maxrss_mb(), 1), "timers": timers,
+                "counters": dict(sorted(_counters.items())), "memory_marks_mb": dict(_marks)}
+
+def _prom_name(s: str) -> str:
+    return "".join(ch if ch.isalnum() else "_" for ch in s)
+
+def to_prometheus(rep: dict | None = None, prefix: str = "bigwork") -> str:
+    """Prometheus 文本格式（node_exporter textfile collector 可直接采集）"""
+    rep = rep or report()
+    lines = [f"# TYPE {prefix}_stage_seconds_total counter", f"# TYPE {prefix}_stage_calls_total counter"]
+    for k, t in rep["timers"].items():
+        lines.append(f'{prefix}_stage_seconds_total{{stage="{k}"}} {t["total_s"]}')
+        lines.append(f'{prefix}_stage_calls_total{{stage="{k}"}} {t["calls"]}')
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for k, v in rep["counters"].items():
+        lines.append(f'{prefix}_events_total{{name="{_prom_name(k)}"}} {v}')
+    lines.append(f"# TYPE {prefix}_maxrss_bytes gauge")
+    lines.append(f"{prefix}_maxrss_bytes {int(rep['maxrss_mb'] * 2 ** 20)}")
+    return "\n".join(lines) + "\n"
+
+def write_report(json_path: str | Path | None = None, prom_path: str | Path | None = None) -> dict:
+    rep = report()
+    for path, text in ((json_path, lambda: json.dumps(rep, ensure_ascii=False, indent=2)),
+                       (prom_path, lambda: to_prometheus(rep))):
+        if path:
+            p = Path(path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_name(p.name + ".tmp")
+            tmp.write_text(text(), encoding="utf-8")
+            os.replace(tmp, p)
+    return rep
+
+def add_arguments(ap):
+    """给脚本的 argparse 加 --metrics / --metrics_out / --metrics_prom"""
+    ap.add_argument("--metrics", action="store_true", help="开启阶段计时/计数埋点，退出时写 JSON 报告")
+    ap.add_argument("--metrics_out", default="", help="JSON 报告路径（默认 metrics/<脚本>_<时间>.json）")
+    ap.add_argument("--metrics_prom", default="", help="同时写 Prometheus 文本文件")
+
+def setup_from_args(args, name: str):
+    if not (args.metrics or _enabled):
+        return
+    out = args.metrics_out or os.environ.get("BIGWORK_METRICS_OUT") \
+        or f"metrics/{name}_{time.strftime('%Y%m%d_%H%M%S', time.gmtime())}.json"
+    enable(True, out, args.metrics_prom or None)
+
+@atexit.register
+def _flush_at_exit():
+    if not _enabled:
+        return
+    out, prom = os.environ.get("BIGWORK_METRICS_OUT"), os.environ.get("BIGWORK_METRICS_PROM")
+    if out or prom:
+        write_report(out, prom)
@@ -0,0 +1,111 @@
+# obb_ops.py
+# 旋转框（OBB）几何运算，纯 numpy 整列实现：
+#   xywhr_to_poly   (cx, cy, w, h, r弧度) -> 四角点
+#   poly_iou_pairs  成对凸四边形的精确 IoU（Sutherland–Hodgman 裁剪按顶点槽位向量化，不逐对循环）
+#   candidate_pairs 外接圆相交的候选对（KD 树半径查询），避免 O(N²) 全配对
+#   rotated_nms     按类别的旋转框 NMS
+from __future__ import annotations
+import numpy as np
+
+MAX_VERTS = 8          # 两个凸四边形求交最多 8 个顶点
+
+def xywhr_to_poly(xywhr: np.ndarray) -> np.ndarray:
+    """(N, 4, 2)；角点顺序同 ultralytics xywhr2xyxyxyxy：c+v1+v2, c+v1-v2, c-v1-v2, c-v1+v2"""
+    b = np.asarray(xywhr, dtype="float64").reshape(-1, 5)
+    cx, cy, w, h, r = b.T
+    c, s = np.cos(r), np.sin(r)
+    dx = np.stack([w, w, -w, -w], axis=1) / 2
+    dy = np.stack([h, -h, -h, h], axis=1) / 2
+    return np.stack([cx[:, None] + dx * c[:, None] - dy * s[:, None],
+                     cy[:, None] + dx * s[:, None] + dy * c[:, None]], axis=-1)
+
+def _area(poly: np.ndarray) -> np.ndarray:
+    """有符号面积（逆时针为正），poly (N, K, 2)，无效槽位需已填成首顶点"""
+    x, y = poly[..., 0], poly[..., 1]
+    return 0.5 * (x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)
+
+def _ccw(poly: np.ndarray) -> np.ndarray:
+    return np.where((_area(poly) < 0)[:, None, None], poly[:, ::-1], poly)
+
+def _clip_halfplane(pts: np.ndarray, n: np.ndarray, a: np.ndarray, b: np.ndarray):
+    """用有向边 a->b 左侧半平面裁剪每行多边形；pts (N, K, 2)，n 为每行有效顶点数"""
+    N, K, _ = pts.shape
+    e = (b - a)[:, None, :]
+    side = e[..., 0] * (pts[..., 1] - a[:, None, 1]) - e[..., 1] * (pts[..., 0] - a[:, None, 0])
+    inside = side >= -1e-9
+    idx = np.arange(K)[None, :]
+    prev = np.where(idx == 0, n[:, None] - 1, idx - 1).clip(0)
+    rows = np.arange(N)[:, None]
+    p_pts, p_side, p_in = pts[rows, prev], side[rows, prev], inside[rows, prev]
+    valid = idx < n[:, None]
+    denom = p_side - side
+    t = np.where(np.abs(denom) > 1e-12, p_side / np.where(np.abs(denom) > 1e-12, denom, 1.0), 0.0)
+    cross_pt = p_pts + t[..., None] * (pts - p_pts)
+    # 每个顶点槽位最多输出两点：[交点, 当前点]
+    cand = np.stack([cross_pt, pts], axis=2).reshape(N, 2 * K, 2)
+    keep = np.stack([valid & (inside != p_in), valid & inside], axis=2).reshape(N, 2 * K)
+    order = np.argsort(~keep, axis=1, kind="stable")[:, :MAX_VERTS]
+    out = cand[rows, order]
+    n_out = np.minimum(keep.sum(axis=1), MAX_VERTS)
+    return out, n_out
+
+def poly_iou_pairs(p1: np.ndarray, p2: np.ndarray) -> np.ndarray:
+    """p1[i] 与 p2[i] 的 IoU；输入 (N, 4, 2) 凸四边形，方向任意"""
+    p1 = _ccw(np.asarray(p1, dtype="float64").reshape(-1, 4, 2))
+    p2 = _ccw(np.asarray(p2, dtype="float64").reshape(-1, 4, 2))
+    N = len(p1)
+    if not N:
+        return np.zeros(0)
+    pts = np.concatenate([p1, np.repeat(p1[:, :1], MAX_VERTS - 4, axis=1)], axis=1)
+    n = np.full(N, 4)
+    for k in range(4):
+        pts, n = _clip_halfplane(pts, n, p2[:, k], p2[:, (k + 1) % 4])
+    slot = np.arange(MAX_VERTS)[None, :]
+    pts = np.where((slot < n[:, None])[..., None], pts, pts[:, :1])
+    inter = np.where(n >= 3, np.abs(_area(pts)), 0.0)
+    union = np.abs(_area(p1)) + np.abs(_area(p2)) - inter
+    return np.where(union > 0, inter / np.where(union > 0, union, 1.0), 0.0)
+
+def candidate_pairs(xywhr: np.ndarray, cls: np.ndarray | None = None) -> np.ndarray:
+    """外接圆可能相交的 (i, j)，i < j；cls 给定时只在同类内配对"""
+    from scipy.spatial import cKDTree
+    b = np.asarray(xywhr, dtype="float64").reshape(-1, 5)
+    if len(b) < 2:
+        return np.zeros((0, 2), dtype="int64")
+    rad = 0.5 * np.hypot(b[:, 2], b[:, 3])
+    xy = b[:, :2].copy()
+    if cls is not None:
+        # 不同类别沿 x 轴错开到互不相交（同 ultralytics NMS 的类别偏移做法）
+        xy[:, 0] += np.asarray(cls, dtype="float64") * (np.ptp(xy[:, 0]) + 4 * rad.max() + 1)
+    pairs = cKDTree(xy).query_pairs(2 * rad.max(), output_type="ndarray")
+    if not len(pairs):
+        return pairs.reshape(0, 2)
+    d = np.hypot(*(xy[pairs[:, 0]] - xy[pairs[:, 1]]).T)
+    return pairs[d <= rad[pairs[:, 0]] + rad[pairs[:, 1]]]
+
+def rotated_nms(xywhr: np.ndarray, scores: np.ndarray, cls: np.ndarray | None = None,
+                iou_thr: float = 0.5) -> np.ndarray:
+    """返回保留框的下标（按分数降序）；IoU 只在候选对上批量计算一次，再按分数贪心抑制"""
+    b = np.asarray(xywhr, dtype="float64").reshape(-1, 5)
+    scores = np.asarray(scores, dtype="float64")
+    order = np.argsort(-scores, kind="stable")
+    pairs = candidate_pairs(b, cls)
+    if not len(pairs):
+        return order
+    poly = xywhr_to_poly(b)
+    iou = poly_iou_pairs(poly[pairs[:, 0]], poly[pairs[:, 1]])
+    pairs = pairs[iou > iou_thr]
+    if not len(pairs):
+        return order
+    # 邻接表（CSR）：每个框与哪些框重叠超过阈值
+    both = np.concatenate([pairs, pairs[:, ::-1]])
+    both = both[np.argsort(both[:, 0], kind="stable")]
+    start = np.searchsorted(both[:, 0], np.arange(len(b) + 1))
+    suppressed = np.zeros(len(b), dtype=bool)
+    keep = []
+    for i in order:
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed[both[start[i]:start[i + 1], 1]] = True
+    return np.asarray(keep, dtype="int64")
@@ -0,0 +1,246 @@
+# onnx_backend.py
+# OBB 模型的 ONNX 导出与 ONNX Runtime CPU 推理后端：
+#   export_onnx    best.pt / yolo11n-obb.pt -> .onnx（可选 INT8 动态量化 -> *.int8.onnx）
+#   OrtObbModel    常驻一个 InferenceSession（调好 intra/inter-op 线程），自做 letterbox 预处理、
+#                  OBB 解码与旋转框 NMS（obb_ops），predict() 与 YOLO.predict 的用法/返回结构一致，
+#                  detections_to_frame 可直接生成相同的检测表
+#   bench          torch 与 ONNX（FP32 / INT8）同图同参数的延迟/吞吐对比，并核对两者检测结果一致性
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+import argparse, ast, os, time
+import numpy as np
+
+def export_onnx(weights: str | Path, imgsz: int = 1024, dynamic: bool = True, int8: bool = False,
+                opset: int | None = None) -> Path:
+    """导出到 weights 同目录；int8=True 时再做一次权重 INT8 动态量化，返回最终模型路径"""
+    from ultralytics import YOLO
+    out = Path(YOLO(str(weights)).export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True,
+                                         opset=opset))
+    return quantize_int8(out) if int8 else out
+
+def quantize_int8(onnx_path: str | Path) -> Path:
+    """权重 INT8、激活运行时动态量化（无需校准集），输出 <stem>.int8.onnx"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    src = Path(onnx_path)
+    out = src.with_name(src.stem + ".int8.onnx")
+    quantize_dynamic(str(src), str(out), weight_type=QuantType.QInt8)
+    return out
+
+@dataclass
+class OrtObb:
+    """与 ultralytics Results.obb 同名字段（numpy），原图像素坐标"""
+    xywhr: np.ndarray
+    xyxyxyxy: np.ndarray
+    cls: np.ndarray
+    conf: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+@dataclass
+class OrtResult:
+    orig_img: np.ndarray
+    obb: OrtObb
+    names: dict = field(default_factory=dict)
+    speed: dict = field(default_factory=dict)         # 同 Results.speed：每张图各阶段毫秒
+
+    def plot(self) -> np.ndarray:
+        import cv2
+        im = self.orig_img.copy()
+        for poly, c, s in zip(self.obb.xyxyxyxy, self.obb.cls, self.obb.conf):
+            cv2.polylines(im, [poly.astype(np.int32)], True, (0, 0, 255), 2)
+            cv2.putText(im, f"{self.names.get(int(c), int(c))} {s:.2f}", tuple(poly[0].astype(int)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+        return im
+
+def _letterbox(im: np.ndarray, size: int) -> tuple[np.ndarray, float, float, float]:
+    """等比缩放 + 居中灰边（114），与 ultralytics LetterBox(auto=False) 一致；返回 (图, gain, pad_x, pad_y)"""
+    import cv2
+    h, w = im.shape[:2]
+    g = min(size / h, size / w)
+    nw, nh = round(w * g), round(h * g)
+    if (nw, nh) != (w, h):
+        im = cv2.resize(im, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    px, py = (size - nw) / 2, (size - nh) / 2
+    top, left = round(py - 0.1), round(px - 0.1)
+    out = np.full((size, size, 3), 114, dtype=np.uint8)
+    out[top:top + nh, left:left + nw] = im
+    return out, g, left, top
+
+class OrtObbModel:
+    def __init__(self, path: str | Path, intra_threads: int | None = None, inter_threads: int = 1):
+        import onnxruntime as ort
+        so = ort.SessionOptions()
+        so.intra_op_num_threads = intra_threads or (os.cpu_count() or 1)
+        so.inter_op_num_threads = inter_threads
+        so.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = Path(path)
+        self.session = ort.InferenceSession(str(self.path), so, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.dynamic_batch = not isinstance(inp.shape[0], int)
+        meta = self.session.get_modelmeta().custom_metadata_map
+        # ultralytics 导出时把 names / imgsz 写进 metadata（Python 字面量字符串）
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        imgsz = ast.literal_eval(meta["imgsz"]) if "imgsz" in meta else inp.shape[2]
+        self.imgsz = int(imgsz[0] if isinstance(imgsz, (list, tuple)) else imgsz)
+
+    def _decode(self, pred: np.ndarray, conf: float, iou: float, max_det: int):
+        """pred (4 + nc + 1, N)：cx, cy, w, h, 各类分数, 角度（弧度）"""
+        from obb_ops import rotated_nms, xywhr_to_poly
+        p = pred.T
+        nc = p.shape[1] - 5
+        scores = p[:, 4:4 + nc]
+        cls = scores.argmax(1)
+        score = scores[np.arange(len(p)), cls]
+        m = score > conf
+        box, cls, score = p[m], cls[m], score[m]
+        xywhr = np.column_stack([box[:, :4], box[:, -1]]).astype("float64")
+        # 同 ultralytics regularize_rboxes：保证 w >= h，角度落在 [0, π)
+        swap = xywhr[:, 2] < xywhr[:, 3]
+        xywhr[swap, 2], xywhr[swap, 3] = xywhr[swap, 3], xywhr[swap, 2]
+        xywhr[:, 4] = np.where(swap, xywhr[:, 4] + np.pi / 2, xywhr[:, 4]) % np.pi
+        keep = rotated_nms(xywhr, score, cls, iou_thr=iou)[:max_det]
+        xywhr = xywhr[keep]
+        return xywhr, xywhr_to_poly(xywhr), cls[keep], score[keep]
+
+    def predict(self, source, conf: float = 0.25, iou: float = 0.7, max_det: int = 300,
+                batch: int | None = None, **_) -> list[OrtResult]:
+        """source 为 BGR ndarray 或图片路径（单个或列表）；其余 YOLO.predict 参数（task/device/half/verbose…）忽略"""
+        import cv2
+        srcs = source if isinstance(source, (list, tuple)) else [source]
+        ims = [cv2.imread(str(s)) if not isinstance(s, np.ndarray) else s for s in srcs]
+        step = (batch or len(ims)) if self.dynamic_batch else 1
+        out = []
+        for i in range(0, len(ims), step):
+            chunk = ims[i:i + step]
+            t0 = time.perf_counter()
+            boxed = [_letterbox(im, self.imgsz) for im in chunk]
+            x = np.stack([b[0][..., ::-1].transpose(2, 0, 1) for b in boxed]).astype(np.float32) / 255.0
+            t1 = time.perf_counter()
+            preds = self.session.run(None, {self.input_name: x})[0]
+            t2 = time.perf_counter()
+            for im, (_, g, px, py), pred in zip(chunk, boxed, preds):
+                t3 = time.perf_counter()
+                xywhr, poly, cls, score = self._decode(pred, conf, iou, max_det)
+                xywhr[:, 0] = (xywhr[:, 0] - px) / g
+                xywhr[:, 1] = (xywhr[:, 1] - py) / g
+                xywhr[:, 2:4] /= g
+                poly = (poly - [px, py]) / g
+                speed = {"preprocess": (t1 - t0) * 1000 / len(chunk), "inference": (t2 - t1) * 1000 / len(chunk),
+                         "postprocess": (time.perf_counter() - t3) * 1000}
+                out.append(OrtResult(im, OrtObb(xywhr.astype("float32"), poly.astype("float32"),
+                                                cls.astype("float32"), score.astype("float32")), self.names, speed))
+        return out
+
+def load_model(weights: str | Path, threads: int | None = None):
+    """.onnx -> OrtObbModel，其它 -> ultralytics YOLO；两者 predict() 用法一致"""
+    if Path(weights).suffix.lower() == ".onnx":
+        return OrtObbModel(weights, intra_threads=threads)
+    from ultralytics import YOLO
+    return YOLO(str(weights))
+
+def _time_backend(model, ims: list[np.ndarray], imgsz: int, batch: int, warmup: int = 2) -> tuple[dict, list]:
+    for _ in range(warmup):
+        model.predict(source=ims[:batch], imgsz=imgsz, batch=batch, device="cpu", verbose=False)
+    lat, results = [], []
+    t0 = time.perf_counter()
+    for i in range(0, len(ims), batch):
+        ts = time.perf_counter()
+        results += model.predict(source=ims[i:i + batch], imgsz=imgsz, batch=batch, device="cpu", verbose=False)
+        lat.append((time.perf_counter() - ts) * 1000 / len(ims[i:i + batch]))
+    dt_s = time.perf_counter() - t0
+    lat = np.asarray(lat)
+    return {"ms_per_img_mean": round(float(lat.mean()), 2), "ms_p50": round(float(np.percentile(lat, 50)), 2),
+            "ms_p95": round(float(np.percentile(lat, 95)), 2), "img_per_s": round(len(ims) / dt_s, 2)}, results
+
+def _agreement(ref: list, other: list, iou_thr: float = 0.5) -> float:
+    """参考结果中有多少框在另一后端里有同类、IoU > iou_thr 的对应框"""
+    from detections import _np
+    from obb_ops import poly_iou_pairs
+    hit = total = 0
+    for a, b in zip(ref, other):
+        pa, pb = _np(a.obb.xyxyxyxy).reshape(-1, 4, 2), _np(b.obb.xyxyxyxy).reshape(-1, 4, 2)
+        ca, cb = _np(a.obb.cls).ravel(), _np(b.obb.cls).ravel()
+        total += len(pa)
+        if not len(pa) or not len(pb):
+            continue
+        i, j = np.meshgrid(np.arange(len(pa)), np.arange(len(pb)), indexing="ij")
+        iou = poly_iou_pairs(pa[i.ravel()], pb[j.ravel()]).reshape(len(pa), len(pb))
+        hit += int(((iou > iou_thr) & (ca[:, None] == cb[None, :])).any(1).sum())
+    return round(hit / total, 4) if total else 1.0
+
+def poly_order_error(n: int = 16, seed: int = 0) -> float:
+    """obb_ops.xywhr_to_poly 与 ultralytics xywhr2xyxyxyxy 在随机框上的最大角点差（像素）；_agreement 按 IoU 比对，看不出角点顺序"""
+    from ultralytics.utils.ops import xywhr2xyxyxyxy
+    from detections import _np
+    from obb_ops import xywhr_to_poly
+    rng = np.random.default_rng(seed)
+    b = np.column_stack([rng.uniform(0, 1024, (n, 2)), rng.uniform(5, 200, (n, 2)), rng.uniform(0, np.pi, n)])
+    return float(np.abs(xywhr_to_poly(b) - _np(xywhr2xyxyxyxy(b)).reshape(n, 4, 2)).max())
+
+def bench(weights: str | Path, onnx_paths: list[str | Path], images: list[Path], imgsz: int = 1024,
+          batch: int = 1, threads: int | None = None) -> list[dict]:
+    import cv2
+    err = poly_order_error()
+    if err > 1e-3:
+        raise RuntimeError(f"ORT corner order differs from ultralytics xywhr2xyxyxyxy (max err {err:.3g}px)")
+    ims = [im for im in (cv2.imread(str(p)) for p in images) if im is not None]
+    rows = []
+    from ultralytics import YOLO
+    stat, ref = _time_backend(YOLO(str(weights)), ims, imgsz, batch)
+    rows.append({"backend": "torch-cpu", "model": Path(weights).name, **stat, "agree_vs_torch": 1.0})
+    for p in onnx_paths:
+        stat, res = _time_backend(OrtObbModel(p, intra_threads=threads), ims, imgsz, batch)
+        rows.append({"backend": "onnxruntime-cpu", "model": Path(p).name, **stat,
+                     "agree_vs_torch": _agreement(ref, res)})
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser("ONNX export / ONNX Runtime CPU backend for the OBB model")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="导出 ONNX（可选 INT8 动态量化）")
+    ex.add_argument("--weights", default="./yolo11n-obb.pt")
+    ex.add_argument("--imgsz", type=int, default=1024)
+    ex.add_argument("--static", action="store_true", help="固定 batch=1 的静态输入（默认动态 batch）")
+    ex.add_argument("--int8", action="store_true", help="额外生成 *.int8.onnx")
+    ex.add_argument("--opset", type=int, default=None)
+    bn = sub.add_parser("bench", help="torch 与 ONNX Runtime 的 CPU 延迟/吞吐对比")
+    bn.add_argument("--weights", default="./yolo11n-obb.pt")
+    bn.add_argument("--onnx", nargs="+", required=True, help="一个或多个 .onnx（如 FP32 与 INT8）")
+    bn.add_argument("--images", default="./image/origin", help="图片目录 / 清单 / glob")
+    bn.add_argument("--n", type=int, default=50, help="最多使用多少张图")
+    bn.add_argument("--imgsz", type=int, default=1024)
+    bn.add_argument("--batch", type=int, default=1)
+    bn.add_argument("--threads", type=int, default=None, help="ORT intra-op 线程数（默认 CPU 核数）")
+    args = ap.parse_args()
+
+    if args.cmd == "export":
+        fp32 = export_onnx(args.weights, args.imgsz, dynamic=not args.static)
+        print("[OK] ONNX:", fp32)
+        if args.int8:
+            print("[OK] INT8:", quantize_int8(fp32))
+        return
+
+    from detections import iter_sources, IMAGE_EXTS
+    images = [p for p in iter_sources(args.images) if p.suffix.lower() in IMAGE_EXTS]
+    images = (images * (args.n // max(len(images), 1) + 1))[:args.n]      # 图少时循环凑够 n 张
+    if not images:
+        raise SystemExit(f"No images found: {args.images}")
+    rows = bench(args.weights, args.onnx, images, args.imgsz, args.batch, args.threads)
+    cols = list(rows[0])
+    print(" | ".join(cols))
+    for r in rows:
+        print(" | ".join(str(r[c]) for c in cols))
+
+if __name__ == "__main__":
+    main()
+
+'''
+python onnx_backend.py export --weights ./data/runs/obb/train/weights/best.pt --imgsz 1024 --int8
+python onnx_backend.py bench --weights ./data/runs/obb/train/weights/best.pt \
+  --onnx ./data/runs/obb/train/weights/best.onnx ./data/runs/obb/train/weights/best.int8.onnx --images ./image/origin
+python eval_detect.py --weights ./data/runs/obb/train/weights/best.onnx --source ./image/origin --threads 8
+'''
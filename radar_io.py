@@ -1,60 +1,109 @@
 # radar_io.py
-# 提供读取 ./radar/info 与 ./radar/pred 的便捷函数（支持 CSV/JSON 自动合并）
+# 提供读取 ./radar/info 与 ./radar/pred 的便捷函数（支持 CSV/JSON/Parquet 自动合并，类型与去重见 feed_schema）
 from pathlib import Path
-import json
+from functools import partial
 import pandas as pd
+import metrics
+from feed_cache import load_files, CACHE_DIRNAME
+from feed_ingest import read_any, parse_files, SOURCE_SUFFIXES
+from feed_schema import normalizer, csv_dtypes, dedupe_sources, dedupe_records, concat_frames, memory_report
+from feed_stream import iter_files
+from feed_follow import FeedFollower
+from track_resample import resample_tracks
 
-def _read_one(path: Path) -> pd.DataFrame:
-    if path.suffix.lower() == ".csv":
-        df = pd.read_csv(path)
-    elif path.suffix.lower() == ".json":
-        with path.open("r", encoding="utf-8") as f:
-            df = pd.DataFrame(json.load(f))
-    else:
-        raise ValueError(f"Unsupported file: {path}")
-    return df
+# 列类型/主键见 feed_schema.SCHEMAS["radar_info"] / ["radar_pred"]
+_normalize_info = metrics.timed("radar.normalize")(normalizer("radar_info"))
+_normalize_pred = metrics.timed("radar.normalize")(normalizer("radar_pred"))
 
-def load_radar_info(root: str | Path = "./radar/info") -> pd.DataFrame:
-    """读取 info 源的所有 CSV/JSON，并做基本类型规整"""
-    root = Path(root)
-    files = sorted([p for p in root.glob("radar_info_*.*") if p.suffix.lower() in (".csv", ".json")])
+@metrics.timed("radar.read")
+def _read_one(path: Path, dtype=None) -> pd.DataFrame:
+    if metrics.enabled():
+        metrics.count("radar.bytes_read", path.stat().st_size)
+    return read_any(path, dtype)  # pyarrow CSV / orjson
+
+def _load_files(root: Path, files, normalize, tag: str, cache: bool, rebuild_cache: bool,
+                dedupe: bool = True, workers: int = 0) -> pd.DataFrame:
     if not files:
-        # 也允许直接读任意文件名
-        files = sorted([p for p in root.glob("*.*") if p.suffix.lower() in (".csv", ".json")])
-    dfs = [_read_one(p) for p in files]
-    if not dfs:
         return pd.DataFrame()
-    df = pd.concat(dfs, ignore_index=True)
-    # 规整字段类型
-    if "timestamp_utc" in df.columns:
-        df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], errors="coerce", utc=True)
-    for col in ("lat", "lon", "range_km", "az_deg", "vel_mps", "snr_db", "quality"):
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    # 每个文件单独规整后写入 ./radar/*/.cache，未变化的文件直接读缓存；
+    # 需要解析的文件 workers != 1 时交给 feed_ingest 进程池，workers=1 在本进程逐个解析
+    parse_many = None if workers == 1 else partial(parse_files, tag=tag, workers=workers)
+    with metrics.timer(f"{tag}.load_files"):
+        dfs = load_files(files, partial(_read_one, dtype=csv_dtypes(tag)), normalize, tag,
+                         root / CACHE_DIRNAME, cache=cache, rebuild=rebuild_cache, parse_many=parse_many)
+    with metrics.timer(f"{tag}.concat"):
+        df = concat_frames(dfs)
+        n_raw = len(df)
+        if dedupe:
+            df = dedupe_records(df, tag)
+    metrics.count(f"{tag}.files", len(files))
+    metrics.count(f"{tag}.rows", len(df))
+    metrics.count(f"{tag}.dup_rows", n_raw - len(df))
+    if metrics.enabled():
+        metrics.count(f"{tag}.mem_bytes", memory_report(df)["total_mb"] * 2 ** 20)
+    metrics.mark(f"{tag}.loaded")
     return df
 
-def load_radar_pred(root: str | Path = "./radar/pred") -> pd.DataFrame:
-    """读取 pred 源的所有 CSV/JSON，并做基本类型规整"""
-    root = Path(root)
-    files = sorted([p for p in root.glob("radar_pred_*.*") if p.suffix.lower() in (".csv", ".json")])
+@metrics.timed("radar.glob")
+def _list_files(root: Path, prefix: str):
+    files = sorted([p for p in root.glob(f"{prefix}_*.*") if p.suffix.lower() in SOURCE_SUFFIXES])
     if not files:
-        files = sorted([p for p in root.glob("*.*") if p.suffix.lower() in (".csv", ".json")])
-    dfs = [_read_one(p) for p in files]
-    if not dfs:
+        # 也允许直接读任意文件名
+        files = sorted([p for p in root.glob("*.*") if p.suffix.lower() in SOURCE_SUFFIXES])
+    return dedupe_sources(files)  # 同名 CSV/JSON/Parquet 副本只读一个
+
+def load_radar_info(root: str | Path = "./radar/info", cache: bool = True, rebuild_cache: bool = False,
+                    dedupe: bool = True, workers: int = 0) -> pd.DataFrame:
+    """
+    读取 info 源的所有 CSV/JSON/Parquet，按 feed_schema 规整类型（cache=False 绕过缓存，rebuild_cache=True 重建），
+    dedupe=True 按 (radar_id, track_id, 时间) 去重，workers 为解析进程数（0=按 CPU 核数，1=不起进程池）
+    """
+    root = Path(root)
+    return _load_files(root, _list_files(root, "radar_info"), _normalize_info, "radar_info", cache, rebuild_cache,
+                       dedupe, workers)
+
+def load_radar_pred(root: str | Path = "./radar/pred", cache: bool = True, rebuild_cache: bool = False,
+                    dedupe: bool = True, workers: int = 0) -> pd.DataFrame:
+    """读取 pred 源的所有 CSV/JSON/Parquet，并按 feed_schema 规整类型"""
+    root = Path(root)
+    return _load_files(root, _list_files(root, "radar_pred"), _normalize_pred, "radar_pred", cache, rebuild_cache,
+                       dedupe, workers)
+
+def iter_radar_info(root: str | Path = "./radar/info", chunksize: int = 100_000, time_range=None, columns=None):
+    """load_radar_info 的流式版本：逐文件/逐块产出，time_range=(t0, t1)，columns 为需要的列"""
+    root = Path(root)
+    yield from iter_files(_list_files(root, "radar_info"), _normalize_info, "radar_info", root / CACHE_DIRNAME,
+                          chunksize=chunksize, time_range=time_range, columns=columns,
+                          csv_dtype=csv_dtypes("radar_info"))
+
+def iter_radar_pred(root: str | Path = "./radar/pred", chunksize: int = 100_000, time_range=None, columns=None):
+    root = Path(root)
+    yield from iter_files(_list_files(root, "radar_pred"), _normalize_pred, "radar_pred", root / CACHE_DIRNAME,
+                          chunksize=chunksize, time_range=time_range, columns=columns,
+                          csv_dtype=csv_dtypes("radar_pred"))
+
+def follow_radar_info(root: str | Path = "./radar/info", poll_s: float = 0.5, checkpoint=None,
+                      from_start: bool = True, stop=None):
+    """跟随模式：持续产出 ./radar/info 中新追加的记录批次，检查点默认存于 .cache/follow_checkpoint.json"""
+    follower = FeedFollower(root, lambda r: _list_files(r, "radar_info"), _normalize_info, checkpoint, from_start,
+                            csv_dtype=csv_dtypes("radar_info"))
+    return follower.follow(poll_s, stop)
+
+def resample_radar(df: pd.DataFrame | None = None, freq_s: float = 2.0, max_gap_s: float | None = 30.0,
+                   mask_gaps: bool = True, root: str | Path = "./radar/info") -> pd.DataFrame:
+    """把每条 (radar_id, track_id) 航迹重采样到 freq_s 网格（az_deg 按最短弧插值）；df 缺省时读 root"""
+    if df is None:
+        df = load_radar_info(root)
+    if not len(df):
         return pd.DataFrame()
-    df = pd.concat(dfs, ignore_index=True)
-    if "timestamp_utc" in df.columns:
-        df["timestamp_utc"] = pd.to_datetime(df["timestamp_utc"], errors="coerce", utc=True)
-    for col in ("lat", "lon", "az_deg", "vel_mps", "snr_db", "score"):
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
+    return resample_tracks(df, ["radar_id", "track_id"], ["lat", "lon", "range_km", "vel_mps", "snr_db", "quality"],
+                           circular_cols=["az_deg"], freq_s=freq_s, max_gap_s=max_gap_s, mask_gaps=mask_gaps)
  
 
 if __name__ == "__main__":
     # 简单测试
     info = load_radar_info()
-    print(f"Loaded radar info: {len(info)} records")
+    print(f"Loaded radar info: {len(info)} records, {memory_report(info)['total_mb']} MB")
     print(info.head())
 
     # pred = load_radar_pred()
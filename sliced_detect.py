@@ -0,0 +1,218 @@
+# sliced_detect.py
+# 超大 GeoTIFF 场景的切片 OBB 推理：
+#   1) 按 DOTA 切图约定（crop 1024、gap 200，步长 824；瓦片名 <stem>__1024__<x>___<y>）生成重叠窗口，
+#      末行/末列窗口贴齐图像边缘
+#   2) 后台线程按窗口读取（rasterio 窗口读 > tifffile memmap/zarr > PIL），有界队列预取，峰值内存 ≈ 预取瓦片数
+#   3) 瓦片成批送 model.predict，框平移回全图像素坐标
+#   4) 跨瓦片接缝按类别做旋转框 NMS（obb_ops.rotated_nms）去重，写列式检测表（detections.DET_COLS + tile）
+from __future__ import annotations
+from pathlib import Path
+import argparse, queue, threading, time
+import numpy as np
+import pandas as pd
+
+def tile_windows(w: int, h: int, size: int = 1024, gap: int = 200):
+    """(x, y, tw, th)；与 DOTA 切图相同：步长 size-gap，最后一个窗口贴齐右/下边缘"""
+    step = max(1, size - gap)
+    xs = list(range(0, max(w - size, 0) + 1, step)) or [0]
+    ys = list(range(0, max(h - size, 0) + 1, step)) or [0]
+    if xs[-1] + size < w: xs.append(w - size)
+    if ys[-1] + size < h: ys.append(h - size)
+    for y in ys:
+        for x in xs:
+            yield x, y, min(size, w - x), min(size, h - y)
+
+def tile_name(stem: str, size: int, x: int, y: int) -> str:
+    return f"{stem}__{size}__{x}___{y}"
+
+class SceneReader:
+    """
+    只按窗口读取像素，返回 (th, tw, C) 数组：
+      rasterio（GeoTIFF，按块窗口读）-> tifffile（未压缩走 memmap，压缩/分块走 zarr 存储）-> PIL（普通图片）
+    PIL 路径懒打开、按窗口 crop，并保留 Image.MAX_IMAGE_PIXELS 解压炸弹上限：超限的非 TIFF 图直接拒绝（请先转分块 GeoTIFF）
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._ds = self._arr = self._im = None
+        try:
+            import rasterio
+            self._ds = rasterio.open(self.path)
+            self.width, self.height = self._ds.width, self._ds.height
+            self.dtype = np.dtype(self._ds.dtypes[0])
+            return
+        except ImportError:
+            pass
+        if self.path.suffix.lower() in {".tif", ".tiff"}:
+            import tifffile
+            try:
+                self._arr = tifffile.memmap(self.path, mode="r")
+            except ValueError:                          # 压缩或非连续存储不能 memmap
+                import zarr
+                self._arr = zarr.open(tifffile.imread(self.path, aszarr=True), mode="r")
+            shape = self._arr.shape
+            # tifffile 一般是 (H, W) 或 (H, W, C)；平面存储为 (C, H, W)
+            self._chw = len(shape) == 3 and shape[0] <= 4 < shape[2]
+            self.height, self.width = (shape[1], shape[2]) if self._chw else (shape[0], shape[1])
+            self.dtype = np.dtype(self._arr.dtype)
+        else:
+            from PIL import Image
+            self._im = Image.open(self.path)               # 只读头；超过 2×MAX_IMAGE_PIXELS 时 PIL 自己抛 DecompressionBombError
+            self.width, self.height = self._im.size
+            limit = Image.MAX_IMAGE_PIXELS
+            if limit and self.width * self.height > limit:
+                self._im.close()
+                raise ValueError(f"{self.path}: {self.width}x{self.height} exceeds PIL MAX_IMAGE_PIXELS={limit}; "
+                                 "convert large scenes to tiled GeoTIFF")
+            self._chw = False
+            self.dtype = np.dtype(np.uint8)
+
+    def read(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        if self._ds is not None:
+            from rasterio.windows import Window
+            bands = list(range(1, min(self._ds.count, 3) + 1))
+            return np.moveaxis(self._ds.read(bands, window=Window(x, y, w, h)), 0, -1)
+        if self._im is not None:
+            return np.asarray(self._im.crop((x, y, x + w, y + h)).convert("RGB"))
+        if self._chw:
+            return np.moveaxis(np.asarray(self._arr[:3, y:y + h, x:x + w]), 0, -1)
+        a = np.asarray(self._arr[y:y + h, x:x + w])
+        return a if a.ndim == 3 else a[..., None]
+
+    def close(self):
+        if self._ds is not None:
+            self._ds.close()
+        if self._im is not None:
+            self._im.close()
+
+def to_bgr8(a: np.ndarray, vmax: float | None = None) -> np.ndarray:
+    """任意位深 / 波段数 -> uint8 BGR（YOLO numpy 输入约定）；vmax 为线性拉伸上限，默认按位深"""
+    if a.dtype != np.uint8:
+        vmax = vmax or (np.iinfo(a.dtype).max if a.dtype.kind in "ui" else 1.0)
+        a = np.clip(a.astype("float32") * (255.0 / vmax), 0, 255).astype(np.uint8)
+    if a.shape[2] == 1:
+        a = np.repeat(a, 3, axis=2)
+    elif a.shape[2] >= 3:
+        a = a[..., 2::-1]
+    else:
+        a = np.concatenate([a, a[..., :1]], axis=2)
+    return np.ascontiguousarray(a)
+
+def _iter_tiles(reader: SceneReader, size: int, gap: int, prefetch: int, vmax: float | None):
+    q: queue.Queue = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    END = object()
+
+    def produce():
+        try:
+            for x, y, w, h in tile_windows(reader.width, reader.height, size, gap):
+                if stop.is_set():
+                    break
+                q.put((x, y, to_bgr8(reader.read(x, y, w, h), vmax)))
+        except Exception as e:                          # 读失败交给消费端抛出
+            q.put(e)
+        finally:
+            q.put(END)
+
+    th = threading.Thread(target=produce, daemon=True)
+    th.start()
+    try:
+        while (item := q.get()) is not END:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while th.is_alive():
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                th.join(0.05)
+
+def _shift(df: pd.DataFrame, dx: np.ndarray, dy: np.ndarray) -> pd.DataFrame:
+    df["cx"] += dx; df["cy"] += dy
+    for k in range(1, 5):
+        df[f"x{k}"] += dx; df[f"y{k}"] += dy
+    return df
+
+def sliced_predict(model, scene: str | Path, size: int = 1024, gap: int = 200, batch: int = 8,
+                   imgsz: int = 1024, conf: float = 0.25, iou: float = 0.3, device=None, half: bool = False,
+                   prefetch: int = 16, vmax: float | None = None) -> tuple[pd.DataFrame, dict]:
+    """返回 (全图坐标检测表, 统计)；内存上限 ≈ (prefetch + batch) 个瓦片 + 检测结果本身"""
+    from detections import DET_COLS, batched, detections_to_frame
+    from obb_ops import rotated_nms
+    scene = Path(scene)
+    reader = SceneReader(scene)
+    stats = {"scene": str(scene), "width": reader.width, "height": reader.height, "tiles": 0}
+    parts = []
+    t0 = time.perf_counter()
+    try:
+        for items in batched(_iter_tiles(reader, size, gap, prefetch, vmax), batch):
+            results = model.predict(source=[im for _, _, im in items], task="obb", imgsz=imgsz, conf=conf,
+                                    device=device, half=half, batch=len(items), verbose=False)
+            names = [tile_name(scene.stem, size, x, y) for x, y, _ in items]
+            df = detections_to_frame(results, names)
+            stats["tiles"] += len(items)
+            if not len(df):
+                continue
+            off = {n: (x, y) for n, (x, y, _) in zip(names, items)}
+            xy = np.array([off[n] for n in df["image_id"].astype(str)], dtype="float32").reshape(-1, 2)
+            parts.append(_shift(df.rename(columns={"image_id": "tile"}), xy[:, 0], xy[:, 1]))
+    finally:
+        reader.close()
+    stats["raw_detections"] = int(sum(len(p) for p in parts))
+    if not parts:
+        stats.update(detections=0, seconds=round(time.perf_counter() - t0, 3))
+        return pd.DataFrame(columns=["image_id", "tile", *DET_COLS[1:]]), stats
+    det = pd.concat([p.astype({"tile": str, "class_name": str}) for p in parts], ignore_index=True)
+    keep = rotated_nms(det[["cx", "cy", "w", "h", "angle"]].to_numpy(), det["score"].to_numpy(),
+                       det["cls"].to_numpy(), iou_thr=iou)
+    det = det.iloc[np.sort(keep)].reset_index(drop=True)
+    det.insert(0, "image_id", str(scene))
+    det["det"] = np.arange(len(det), dtype="int32")
+    dt_s = time.perf_counter() - t0
+    stats.update(detections=len(det), seconds=round(dt_s, 3), tiles_per_s=round(stats["tiles"] / dt_s, 2))
+    return det, stats
+
+def main():
+    ap = argparse.ArgumentParser("Sliced OBB inference for large GeoTIFF scenes")
+    ap.add_argument("--weights", default="./yolo11n-obb.pt")
+    ap.add_argument("--scene", required=True, help="GeoTIFF / 大图路径，可为目录或 glob（逐景处理）")
+    ap.add_argument("--tile", type=int, default=1024, help="瓦片边长（DOTA 切图约定 1024）")
+    ap.add_argument("--gap", type=int, default=200, help="相邻瓦片重叠像素（步长 = tile - gap）")
+    ap.add_argument("--batch", type=int, default=8)
+    ap.add_argument("--imgsz", type=int, default=1024)
+    ap.add_argument("--conf", type=float, default=0.25)
+    ap.add_argument("--iou", type=float, default=0.3, help="跨瓦片旋转框 NMS 阈值")
+    ap.add_argument("--device", default=None)
+    ap.add_argument("--half", action="store_true")
+    ap.add_argument("--prefetch", type=int, default=16, help="预读瓦片数（决定峰值内存）")
+    ap.add_argument("--vmax", type=float, default=None, help="非 8 位影像线性拉伸上限（如 12 位传 4095）")
+    ap.add_argument("--out", default="./image/pred_sliced/detections.parquet")
+    args = ap.parse_args()
+
+    from ultralytics import YOLO
+    from detections import DetectionWriter, iter_sources
+    w = Path(args.weights).expanduser().resolve()
+    if not w.exists():
+        raise FileNotFoundError(f"找不到本地权重：{w}")
+    model = YOLO(str(w))
+    scenes = [p for p in iter_sources(args.scene) if p.suffix.lower() in {".tif", ".tiff", ".jpg", ".jpeg", ".png"}]
+    if not scenes:
+        raise SystemExit(f"No scenes found: {args.scene}")
+    with DetectionWriter(args.out) as wr:
+        for sc in scenes:
+            det, stats = sliced_predict(model, sc, args.tile, args.gap, args.batch, args.imgsz, args.conf,
+                                        args.iou, args.device, args.half, args.prefetch, args.vmax)
+            wr.write(det)
+            print(f"[OK] {sc.name}: {stats['width']}x{stats['height']}, {stats['tiles']} tiles, "
+                  f"{stats['raw_detections']} -> {stats['detections']} boxes after NMS, {stats['seconds']}s")
+    print("[OK] detections ->", wr.path)
+
+if __name__ == "__main__":
+    main()
+
+'''
+python sliced_detect.py --weights ./data/runs/obb/train/weights/best.pt --scene ./data/scenes/big.tif \
+  --tile 1024 --gap 200 --batch 8 --out ./image/pred_sliced/detections.parquet
+'''
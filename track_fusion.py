@@ -0,0 +1,174 @@
+# track_fusion.py
+# 雷达航迹（radar_io）与 ADS-B 报文（adsb_io）关联融合：
+#   1) 时间对齐：按 step_s 切桶，每个目标每桶取最后一次观测
+#   2) 候选搜索：所有桶的 ADS-B 点放进同一棵 KD 树，坐标 = 地心直角坐标(km) + 桶号维度，
+#      桶号维度间隔远大于门限，因此一次 query 就只会在同一时间桶内做门限最近邻，避免 O(N·M) 全配对
+#   3) 门限 + 代价：位置距离与速度矢量差同时过门限，代价 = (d/σd)² + (dv/σv)²；
+#      每桶按代价从小到大贪心一对一（同一雷达内一个 ADS-B 点、一个雷达点各只用一次）
+#   4) 跨时间投票：每条雷达航迹取得票最多的 icao24，置信度 = 得票率 × 平均 exp(-代价/2)
+#   输出关联表与逐桶融合航迹表
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import numpy as np
+import pandas as pd
+
+TIME_COL = "timestamp_utc"
+EARTH_R_KM = 6371.0088
+
+def _bucketize(df: pd.DataFrame, id_cols: list[str], step_ns: int) -> pd.DataFrame:
+    df = df[df[TIME_COL].notna() & df["lat"].notna() & df["lon"].notna()]
+    t = df[TIME_COL].to_numpy(dtype="datetime64[ns]").view("int64")
+    df = df.assign(_t=t, _bucket=t // step_ns).sort_values("_t", kind="stable")
+    return df.drop_duplicates(subset=[*id_cols, "_bucket"], keep="last").reset_index(drop=True)
+
+def _ecef_km(lat, lon) -> np.ndarray:
+    la, lo = np.radians(lat), np.radians(lon)
+    return np.column_stack([EARTH_R_KM * np.cos(la) * np.cos(lo),
+                            EARTH_R_KM * np.cos(la) * np.sin(lo),
+                            EARTH_R_KM * np.sin(la)])
+
+def _radar_velocity(rb: pd.DataFrame, lag: int = 3) -> tuple[np.ndarray, np.ndarray]:
+    """
+    航向由同一航迹相隔 lag 个桶的位置差分估计（基线越长噪声越小），速度大小优先用 vel_mps；
+    返回与 rb 行对齐的 (v_north, v_east) m/s
+    """
+    g = rb.groupby(["radar_id", "track_id"], observed=True, sort=False)[["lat", "lon", "_t"]]
+    prev, nxt = g.shift(lag), g.shift(-lag)
+    # 航迹开头没有前驱：改用后继点
+    ref = prev.where(prev["_t"].notna(), nxt)
+    sign = np.where(prev["_t"].notna(), 1.0, -1.0)
+    lat = rb["lat"].to_numpy(dtype="float64")
+    dt = sign * (rb["_t"].to_numpy(dtype="float64") - ref["_t"].to_numpy(dtype="float64")) / 1e9
+    dn = sign * (lat - ref["lat"].to_numpy(dtype="float64")) * 111_195.0
+    de = sign * (rb["lon"].to_numpy(dtype="float64") - ref["lon"].to_numpy(dtype="float64")) \
+        * 111_195.0 * np.cos(np.radians(lat))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vn, ve = dn / dt, de / dt
+        if "vel_mps" in rb.columns:
+            spd = np.hypot(vn, ve)
+            mag = rb["vel_mps"].to_numpy(dtype="float64")
+            scale = np.where((spd > 0) & np.isfinite(mag), mag / spd, 1.0)
+            vn, ve = vn * scale, ve * scale
+    return vn, ve
+
+def _greedy_one_to_one(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    a、b 为按代价升序排好的配对两侧编号（非负整数）；返回逐对贪心（两侧都未用过才接受）保留的行掩码。
+    向量化：每轮接受在两侧都是剩余中最便宜的配对，再删去与之冲突的配对；结果与逐对循环相同
+    """
+    keep = np.zeros(len(a), dtype=bool)
+    used_a, used_b = np.zeros(a.max() + 1 if len(a) else 0, bool), np.zeros(b.max() + 1 if len(b) else 0, bool)
+    alive = np.arange(len(a))
+    while len(alive):
+        aa, bb = a[alive], b[alive]
+        first = np.zeros((2, len(alive)), dtype=bool)  # alive 保持代价顺序，首次出现即该编号剩余最便宜的配对
+        first[0, np.unique(aa, return_index=True)[1]] = True
+        first[1, np.unique(bb, return_index=True)[1]] = True
+        win = alive[first[0] & first[1]]
+        keep[win] = True
+        used_a[a[win]] = used_b[b[win]] = True
+        alive = alive[~used_a[aa] & ~used_b[bb]]
+    return keep
+
+def associate(radar: pd.DataFrame, adsb: pd.DataFrame, step_s: float = 5.0,
+              gate_km: float = 3.0, gate_mps: float = 80.0,
+              sigma_km: float = 1.0, sigma_mps: float = 30.0, k: int = 4):
+    """返回 (逐桶配对表, 按航迹汇总的关联表, 雷达分桶表, ADS-B 分桶表)"""
+    from scipy.spatial import cKDTree
+    step_ns = int(step_s * 1e9)
+    rb = _bucketize(radar, ["radar_id", "track_id"], step_ns)
+    ab = _bucketize(adsb, ["icao24"], step_ns)
+    empty = pd.DataFrame(columns=["radar_id", "track_id", "icao24", "n_buckets", "cost", "confidence"])
+    if not len(rb) or not len(ab):
+        return pd.DataFrame(), empty, rb, ab
+
+    b0 = min(rb["_bucket"].min(), ab["_bucket"].min())
+    sep = 10.0 * gate_km
+    rp = np.column_stack([_ecef_km(rb["lat"], rb["lon"]), (rb["_bucket"] - b0).to_numpy() * sep])
+    ap = np.column_stack([_ecef_km(ab["lat"], ab["lon"]), (ab["_bucket"] - b0).to_numpy() * sep])
+    d, j = cKDTree(ap).query(rp, k=k, distance_upper_bound=gate_km)
+    d, j = d.reshape(len(rp), -1), j.reshape(len(rp), -1)
+    ok = np.isfinite(d)
+    ri, aj, dist = np.nonzero(ok)[0], j[ok], d[ok]
+
+    rvn, rve = _radar_velocity(rb)
+    trk = np.radians(ab["trk_deg"].to_numpy(dtype="float64"))
+    gs = ab["gs_mps"].to_numpy(dtype="float64")
+    avn, ave = gs * np.cos(trk), gs * np.sin(trk)
+    dv = np.hypot(rvn[ri] - avn[aj], rve[ri] - ave[aj])
+    dv = np.where(np.isfinite(dv), dv, gate_mps)         # 缺速度时按门限边缘处理
+    keep = dv <= gate_mps
+    ri, aj, dist, dv = ri[keep], aj[keep], dist[keep], dv[keep]
+    pairs = pd.DataFrame({
+        "_ri": ri, "_aj": aj, "dist_km": dist, "dv_mps": dv,
+        "cost": (dist / sigma_km) ** 2 + (dv / sigma_mps) ** 2,
+        "radar_id": rb["radar_id"].to_numpy()[ri], "track_id": rb["track_id"].to_numpy()[ri],
+        "icao24": ab["icao24"].to_numpy()[aj], "_bucket": rb["_bucket"].to_numpy()[ri],
+    })
+    # 每桶贪心一对一：_ri/_aj 本身就是某桶内的点；同一雷达内一个 ADS-B 点只配一条航迹，一条航迹只配一个 ADS-B 点
+    pairs = pairs.sort_values("cost", kind="stable").reset_index(drop=True)
+    radar_code = pd.factorize(pairs["radar_id"])[0]
+    pairs = pairs[_greedy_one_to_one(pairs["_ri"].to_numpy(), radar_code * len(ab) + pairs["_aj"].to_numpy())]
+
+    n_track = rb.groupby(["radar_id", "track_id"], observed=True).size().rename("n_track")
+    pairs["_lik"] = np.exp(-0.5 * pairs["cost"])
+    votes = (pairs.groupby(["radar_id", "track_id", "icao24"], observed=True)
+                  .agg(n_buckets=("cost", "size"), cost=("cost", "mean"), _lik=("_lik", "mean")).reset_index())
+    if not len(votes):
+        return pairs, empty, rb, ab
+    votes = votes.join(n_track, on=["radar_id", "track_id"])
+    votes["confidence"] = (votes["n_buckets"] / votes["n_track"] * votes["_lik"]).clip(0, 1)
+    assoc = (votes.sort_values(["n_buckets", "cost"], ascending=[False, True], kind="stable")
+                  .drop_duplicates(subset=["radar_id", "track_id"])
+                  .drop(columns=["n_track", "_lik"]).reset_index(drop=True))
+    return pairs, assoc, rb, ab
+
+def fuse(radar: pd.DataFrame, adsb: pd.DataFrame, step_s: float = 5.0,
+         radar_sigma_km: float = 0.5, adsb_sigma_km: float = 0.05, **kw) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    返回 (assoc, fused)：
+      assoc  每条雷达航迹的关联结果（icao24, n_buckets, cost, confidence）
+      fused  逐桶融合航迹：雷达点 + 关联 ADS-B 点 + 反方差加权融合位置；未关联的航迹 icao24 为空、置信度 0
+    """
+    _, assoc, rb, ab = associate(radar, adsb, step_s=step_s, **kw)
+    if not len(rb):
+        return assoc, pd.DataFrame()
+    fused = rb.merge(assoc[["radar_id", "track_id", "icao24", "confidence"]],
+                     on=["radar_id", "track_id"], how="left")
+    a_cols = ["icao24", "_bucket", "lat", "lon", "callsign", "alt_baro_ft", "gs_mps", "trk_deg"]
+    a = ab[[c for c in a_cols if c in ab.columns]].rename(columns={"lat": "adsb_lat", "lon": "adsb_lon"})
+    fused = fused.merge(a, on=["icao24", "_bucket"], how="left")
+    wr, wa = 1.0 / radar_sigma_km ** 2, 1.0 / adsb_sigma_km ** 2
+    has = fused["adsb_lat"].notna()
+    fused = fused.rename(columns={"lat": "radar_lat", "lon": "radar_lon"})
+    fused["lat"] = np.where(has, (wr * fused["radar_lat"] + wa * fused["adsb_lat"]) / (wr + wa), fused["radar_lat"])
+    fused["lon"] = np.where(has, (wr * fused["radar_lon"] + wa * fused["adsb_lon"]) / (wr + wa), fused["radar_lon"])
+    fused["confidence"] = fused["confidence"].fillna(0.0)
+    fused[TIME_COL] = pd.to_datetime(fused["_bucket"] * int(step_s * 1e9), utc=True)
+    front = [TIME_COL, "radar_id", "track_id", "icao24", "callsign", "confidence", "lat", "lon",
+             "radar_lat", "radar_lon", "adsb_lat", "adsb_lon", "alt_baro_ft", "vel_mps", "gs_mps", "trk_deg"]
+    fused = fused[[c for c in front if c in fused.columns]]
+    return assoc, fused.sort_values([TIME_COL, "radar_id", "track_id"], kind="stable").reset_index(drop=True)
+
+def main():
+    ap = argparse.ArgumentParser("Radar <-> ADS-B track association / fusion")
+    ap.add_argument("--radar", default="./radar/info")
+    ap.add_argument("--adsb", default="./adsb/info")
+    ap.add_argument("--out", default="./fusion")
+    ap.add_argument("--step", type=float, default=5.0, help="时间桶（秒）")
+    ap.add_argument("--gate_km", type=float, default=3.0)
+    ap.add_argument("--gate_mps", type=float, default=80.0)
+    args = ap.parse_args()
+
+    from adsb_io import load_adsb_info
+    from radar_io import load_radar_info
+    assoc, fused = fuse(load_radar_info(args.radar), load_adsb_info(args.adsb), step_s=args.step,
+                        gate_km=args.gate_km, gate_mps=args.gate_mps)
+    out = Path(args.out); out.mkdir(parents=True, exist_ok=True)
+    assoc.to_csv(out / "fusion_assoc.csv", index=False)
+    fused.to_csv(out / "fusion_tracks.csv", index=False)
+    print(f"[OK] {len(assoc)} associations, {len(fused)} fused rows -> {out}")
+
+if __name__ == "__main__":
+    main()
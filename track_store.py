@@ -0,0 +1,273 @@
+# track_store.py
+# 基于 adsb_io / radar_io 的时空索引：按 timestamp_utc 切成固定时长的时间桶，
+# 桶内行按时间排序，并建立粗粒度经纬度网格索引（cell key 排序 + searchsorted）和目标 ID 索引。
+# 支持时间窗、经纬度框、单目标（icao24 / radar_id+track_id）与最近邻查询，以及增量追加。
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+import math
+import numpy as np
+import pandas as pd
+
+TIME_COL = "timestamp_utc"
+EARTH_R_KM = 6371.0088
+KM_PER_DEG = math.pi * EARTH_R_KM / 180.0
+
+def _to_ns(t) -> int:
+    ts = pd.Timestamp(t)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return int(ts.value)
+
+def _haversine_km(lat0, lon0, lat, lon):
+    p0, p1 = np.radians(lat0), np.radians(lat)
+    dphi, dlmb = p1 - p0, np.radians(lon - lon0)
+    a = np.sin(dphi / 2) ** 2 + np.cos(p0) * np.cos(p1) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_R_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class _Bucket:
+    """一个时间桶：按时间排序的行 + 网格/ID 两个排序索引"""
+    __slots__ = ("df", "t", "lat", "lon", "cells", "ids", "cell_sorted", "cell_perm", "id_sorted", "id_perm",
+                 "extent")
+
+    def __init__(self, df: pd.DataFrame, t: np.ndarray, cells: np.ndarray, ids: np.ndarray, ncols: int):
+        order = np.argsort(t, kind="stable")
+        self.df = df.iloc[order].reset_index(drop=True)
+        self.t = t[order]
+        self.lat = self.df["lat"].to_numpy(dtype="float64")
+        self.lon = self.df["lon"].to_numpy(dtype="float64")
+        self.cells = cells[order]
+        self.ids = ids[order]
+        self.cell_perm = np.argsort(self.cells, kind="stable")
+        self.cell_sorted = self.cells[self.cell_perm]
+        self.id_perm = np.argsort(self.ids, kind="stable")
+        self.id_sorted = self.ids[self.id_perm]
+        ii, jj = self.cells // ncols, self.cells % ncols
+        self.extent = (int(ii.min()), int(ii.max()), int(jj.min()), int(jj.max()))   # 有数据的网格行/列范围
+
+    def time_slice(self, t0: int | None, t1: int | None) -> tuple[int, int]:
+        i0 = 0 if t0 is None else int(np.searchsorted(self.t, t0, side="left"))
+        i1 = len(self.t) if t1 is None else int(np.searchsorted(self.t, t1, side="right"))
+        return i0, i1
+
+    def cell_rows(self, lo: int, hi: int) -> np.ndarray:
+        a = np.searchsorted(self.cell_sorted, lo, side="left")
+        b = np.searchsorted(self.cell_sorted, hi, side="right")
+        return self.cell_perm[a:b]
+
+    def id_rows(self, code: int) -> np.ndarray:
+        a = np.searchsorted(self.id_sorted, code, side="left")
+        b = np.searchsorted(self.id_sorted, code, side="right")
+        return np.sort(self.id_perm[a:b])
+
+class TrackStore:
+    """
+    时空索引查询：
+        store = TrackStore.from_adsb()                  # 或 from_radar() / TrackStore(df)
+        store.window(t0, t1)                            # 时间窗内所有行
+        store.bbox(lat_min, lat_max, lon_min, lon_max, t0, t1)
+        store.track("abcd12", t0, t1)                   # 单目标；雷达为 ("RADAR-A", "T001") 或 "RADAR-A/T001"
+        store.nearest(lat, lon, t, k=3)                 # 最近邻（附 dist_km 列）
+        store.append(new_df)                            # 增量追加，仅重建受影响的时间桶
+    时间缺失或经纬度缺失的行不入索引。
+    """
+
+    def __init__(self, df: pd.DataFrame | None = None, id_col: str | list[str] | None = None,
+                 bucket_s: float = 60.0, cell_deg: float = 0.05):
+        self.id_cols = None if id_col is None else [id_col] if isinstance(id_col, str) else list(id_col)
+        self.bucket_ns = int(bucket_s * 1e9)
+        self.cell_deg = float(cell_deg)
+        self._ncols = int(math.ceil(360.0 / self.cell_deg)) + 1
+        self._buckets: dict[int, _Bucket] = {}
+        self._keys: list[int] = []          # 已排序的桶编号
+        self._id_codes: dict[str, int] = {}     # 目标键（多列时以 "/" 连接）-> 编码
+        if df is not None and len(df):
+            self.append(df)
+
+    # ---------- 构建 ----------
+    @classmethod
+    def from_adsb(cls, root: str | Path = "./adsb/info", **kw) -> "TrackStore":
+        from adsb_io import load_adsb_info
+        return cls(load_adsb_info(root), id_col="icao24", **kw)
+
+    @classmethod
+    def from_radar(cls, root: str | Path = "./radar/info", **kw) -> "TrackStore":
+        from radar_io import load_radar_info
+        return cls(load_radar_info(root), id_col=["radar_id", "track_id"], **kw)   # 航迹号只在单部雷达内唯一
+
+    def __len__(self) -> int:
+        return sum(len(b.t) for b in self._buckets.values())
+
+    def _cell_ij(self, lat, lon):
+        i = np.floor((np.asarray(lat, dtype="float64") + 90.0) / self.cell_deg).astype("int64")
+        j = np.floor((np.asarray(lon, dtype="float64") + 180.0) / self.cell_deg).astype("int64")
+        return i, j
+
+    def _encode_ids(self, df: pd.DataFrame) -> np.ndarray:
+        """pd.factorize 得到批内编码，只对去重后的目标查/分配全局编码"""
+        cols = self.id_cols
+        key = pd.MultiIndex.from_frame(df[cols].astype(str)) if len(cols) > 1 else df[cols[0]].astype(str)
+        local, uniques = pd.factorize(key)
+        codes = self._id_codes
+        lut = np.array([codes.setdefault(u if isinstance(u, str) else "/".join(u), len(codes)) for u in uniques],
+                       dtype="int64")
+        return lut[local] if len(lut) else np.empty(0, dtype="int64")
+
+    def append(self, df: pd.DataFrame) -> "TrackStore":
+        """增量追加：新行按时间桶分组，只重建被触及的桶"""
+        if df is None or not len(df):
+            return self
+        if self.id_cols is None:
+            self.id_cols = (["icao24"] if "icao24" in df.columns
+                            else ["radar_id", "track_id"] if "radar_id" in df.columns else ["track_id"])
+        df = df[df[TIME_COL].notna() & df["lat"].notna() & df["lon"].notna()]
+        if not len(df):
+            return self
+        t = df[TIME_COL].to_numpy(dtype="datetime64[ns]").view("int64")
+        i, j = self._cell_ij(df["lat"], df["lon"])
+        cells = i * self._ncols + j
+        ids = self._encode_ids(df)
+        keys = t // self.bucket_ns
+        for k in np.unique(keys):
+            m = keys == k
+            part, pt, pc, pi = df[m], t[m], cells[m], ids[m]
+            old = self._buckets.get(int(k))
+            if old is not None:
+                part = pd.concat([old.df, part], ignore_index=True)
+                pt = np.concatenate([old.t, pt])
+                pc = np.concatenate([old.cells, pc])
+                pi = np.concatenate([old.ids, pi])
+            else:
+                self._keys.insert(bisect_left(self._keys, int(k)), int(k))
+            self._buckets[int(k)] = _Bucket(part.reset_index(drop=True), pt, pc, pi, self._ncols)
+        return self
+
+    # ---------- 查询 ----------
+    def _buckets_in(self, t0: int | None, t1: int | None):
+        a = 0 if t0 is None else bisect_left(self._keys, t0 // self.bucket_ns)
+        b = len(self._keys) if t1 is None else bisect_right(self._keys, t1 // self.bucket_ns)
+        for k in self._keys[a:b]:
+            yield self._buckets[k]
+
+    def _collect(self, parts: list[pd.DataFrame]) -> pd.DataFrame:
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    def window(self, t0=None, t1=None) -> pd.DataFrame:
+        """t0 <= timestamp_utc <= t1 的所有行（按时间排序）"""
+        n0 = None if t0 is None else _to_ns(t0)
+        n1 = None if t1 is None else _to_ns(t1)
+        parts = []
+        for b in self._buckets_in(n0, n1):
+            i0, i1 = b.time_slice(n0, n1)
+            parts.append(b.df.iloc[i0:i1])
+        return self._collect(parts)
+
+    def bbox(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float,
+             t0=None, t1=None) -> pd.DataFrame:
+        """经纬度框 + 可选时间窗；仅扫描框所覆盖的网格单元"""
+        n0 = None if t0 is None else _to_ns(t0)
+        n1 = None if t1 is None else _to_ns(t1)
+        (i_lo, i_hi), (j_lo, j_hi) = self._cell_ij([lat_min, lat_max], [lon_min, lon_max])
+        parts = []
+        for b in self._buckets_in(n0, n1):
+            rows = [b.cell_rows(i * self._ncols + j_lo, i * self._ncols + j_hi) for i in range(i_lo, i_hi + 1)]
+            if not rows:
+                continue
+            idx = np.sort(np.concatenate(rows))
+            if not len(idx):
+                continue
+            m = ((b.lat[idx] >= lat_min) & (b.lat[idx] <= lat_max)
+                 & (b.lon[idx] >= lon_min) & (b.lon[idx] <= lon_max))
+            if n0 is not None: m &= b.t[idx] >= n0
+            if n1 is not None: m &= b.t[idx] <= n1
+            parts.append(b.df.iloc[idx[m]])
+        return self._collect(parts)
+
+    def track(self, target_id, t0=None, t1=None) -> pd.DataFrame:
+        """单个目标在时间窗内的全部点（按时间排序）；多列键传元组或以 "/" 连接的字符串"""
+        key = "/".join(map(str, target_id)) if isinstance(target_id, tuple) else str(target_id)
+        code = self._id_codes.get(key)
+        if code is None:
+            return pd.DataFrame()
+        n0 = None if t0 is None else _to_ns(t0)
+        n1 = None if t1 is None else _to_ns(t1)
+        parts = []
+        for b in self._buckets_in(n0, n1):
+            idx = b.id_rows(code)
+            if n0 is not None: idx = idx[b.t[idx] >= n0]
+            if n1 is not None: idx = idx[b.t[idx] <= n1]
+            parts.append(b.df.iloc[idx])
+        return self._collect(parts)
+
+    def nearest(self, lat: float, lon: float, t=None, k: int = 1,
+                tol_s: float = 30.0, max_km: float | None = None) -> pd.DataFrame:
+        """
+        |timestamp_utc - t| <= tol_s 范围内距 (lat, lon) 最近的 k 个点；t=None 时不限时间。
+        时间窗内候选总数 ≤ k 时直接全量计算；否则网格按环向外扩展，下一环的最小可能距离已超过当前第 k 近距离、
+        或环已越过所选时间桶有数据的网格范围时停止。
+        """
+        if t is None:
+            n0 = n1 = None
+        else:
+            nt = _to_ns(t)
+            n0, n1 = nt - int(tol_s * 1e9), nt + int(tol_s * 1e9)
+        buckets = [(b, *b.time_slice(n0, n1)) for b in self._buckets_in(n0, n1)]
+        buckets = [x for x in buckets if x[2] > x[1]]
+        if not buckets:
+            return pd.DataFrame()
+        found: list[tuple[float, int, int]] = []   # (dist_km, bucket 序号, 行号)
+
+        def add(bi: int, idx: np.ndarray):
+            b = buckets[bi][0]
+            if n0 is not None and len(idx):
+                idx = idx[(b.t[idx] >= n0) & (b.t[idx] <= n1)]
+            if len(idx):
+                d = _haversine_km(lat, lon, b.lat[idx], b.lon[idx])
+                found.extend(zip(d.tolist(), [bi] * len(idx), idx.tolist()))
+
+        if sum(i1 - i0 for _, i0, i1 in buckets) <= k:
+            for bi, (_, i0, i1) in enumerate(buckets):
+                add(bi, np.arange(i0, i1))
+        else:
+            ci, cj = (int(x) for x in self._cell_ij(lat, lon))
+            # 一个网格环在地面上的最小跨度（经向按最高纬度处的 cos 收缩，偏保守）
+            coslat = max(math.cos(math.radians(min(89.0, abs(lat) + self.cell_deg))), 1e-3)
+            ring_km = self.cell_deg * KM_PER_DEG * coslat
+            max_ring = int(math.ceil((max_km if max_km is not None else 2 * EARTH_R_KM) / ring_km)) + 1
+            # 超出所有候选桶有数据的网格行/列范围后，再向外的环都是空的
+            i_lo = min(b.extent[0] for b, _, _ in buckets); i_hi = max(b.extent[1] for b, _, _ in buckets)
+            j_lo = min(b.extent[2] for b, _, _ in buckets); j_hi = max(b.extent[3] for b, _, _ in buckets)
+            max_ring = min(max_ring, self._ncols, max(abs(ci - i_lo), abs(ci - i_hi), abs(cj - j_lo), abs(cj - j_hi)))
+            for r in range(max_ring + 1):
+                for bi, (b, _, _) in enumerate(buckets):
+                    bi_lo, bi_hi, bj_lo, bj_hi = b.extent
+                    if ci + r < bi_lo or ci - r > bi_hi or cj + r < bj_lo or cj - r > bj_hi:
+                        continue                    # 本环整体落在该桶数据范围之外
+                    cand = []
+                    j0, j1 = max(cj - r, bj_lo, 0), min(cj + r, bj_hi, self._ncols - 1)   # 列号夹在网格内，不溢到相邻行
+                    for i in range(max(ci - r, bi_lo), min(ci + r, bi_hi) + 1):
+                        base = i * self._ncols
+                        if i in (ci - r, ci + r):
+                            if j0 <= j1:
+                                cand.append(b.cell_rows(base + j0, base + j1))
+                        else:
+                            for j in {cj - r, cj + r}:
+                                if max(bj_lo, 0) <= j <= min(bj_hi, self._ncols - 1):
+                                    cand.append(b.cell_rows(base + j, base + j))
+                    add(bi, np.concatenate(cand) if cand else np.empty(0, dtype="int64"))
+                if len(found) >= k:
+                    found = sorted(set(found))[:k]     # (距离, 桶, 行) 去重后取前 k
+                    if found[-1][0] <= r * ring_km:
+                        break
+        found = sorted(set(found))
+        if max_km is not None:
+            found = [f for f in found if f[0] <= max_km]
+        found = found[:k]
+        if not found:
+            return pd.DataFrame()
+        rows = [buckets[bi][0].df.iloc[[ri]] for _, bi, ri in found]
+        out = pd.concat(rows, ignore_index=True)
+        out["dist_km"] = [f[0] for f in found]
+        return out
@@ -1,17 +1,73 @@
-from ultralytics.utils import SETTINGS
-from ultralytics import YOLO
+# train_detect.py
+# YOLO11-OBB 训练入口：数据集 / 权重 / 运行目录由参数给出（默认仓库内 ./data/*），
+# 训练与验证集图片走 image_cache 的持久化 memmap 缓存（labels/<split>.imgs<imgsz>.u8），
+# 首次运行解码并缩放一次，之后各次运行、各 DataLoader worker 直接按偏移读像素，不再逐 epoch 解码 JPEG。
+#   --img_cache memmap（默认）| ram | disk | none   后三者为 ultralytics 自带的 cache 选项
+# memmap 用的 Dataset/Trainer/Validator 子类在 train_memmap.py（模块级定义，多卡 DDP 子进程可按模块名导入）
+from __future__ import annotations
+from pathlib import Path
+import argparse, os
+import metrics
 
-# 设定目录（本进程立即生效，并写入全局配置）
-SETTINGS.update({
-    "datasets_dir": "/home/liwenbo/projects/School/BIGWORK/data/datasets",
-    "weights_dir":  "/home/liwenbo/projects/School/BIGWORK/data/weights",
-    "runs_dir":     "/home/liwenbo/projects/School/BIGWORK/data/runs",
-})
+def main():
+    ap = argparse.ArgumentParser("YOLO11-OBB training with a persistent memmap image cache")
+    ap.add_argument("--data_root", default="./data", help="其下 datasets/ weights/ runs/ 作为 ultralytics 目录")
+    ap.add_argument("--datasets_dir", default="", help="覆盖 <data_root>/datasets")
+    ap.add_argument("--weights_dir", default="", help="覆盖 <data_root>/weights")
+    ap.add_argument("--runs_dir", default="", help="覆盖 <data_root>/runs")
+    ap.add_argument("--model", default="yolo11n-obb.pt")
+    ap.add_argument("--data", default="dota8.yaml")
+    ap.add_argument("--imgsz", type=int, default=1024)
+    ap.add_argument("--epochs", type=int, default=50)
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--device", default=None)
+    ap.add_argument("--img_cache", choices=["memmap", "ram", "disk", "none"], default="memmap")
+    ap.add_argument("--name", default=None, help="runs/obb/<name>")
+    ap.add_argument("--no_val", action="store_true", help="训练后不再单独 val")
+    ap.add_argument("--predict", default="", help="训练后对该图片/目录推理并保存可视化")
+    metrics.add_arguments(ap)
+    args = ap.parse_args()
+    metrics.setup_from_args(args, "train_detect")
 
-# 训练：会自动把 DOTA8 拉到 /data/obb_datasets/dota8
-model = YOLO("yolo11n-obb.pt")
-model.train(task="obb", data="dota8.yaml", imgsz=1024, epochs=50)
+    from ultralytics import YOLO
+    from ultralytics.utils import SETTINGS
 
-# 验证 / 推理
-model.val(task="obb", data="dota8.yaml")
-model.predict(task="obb", source="your_image.jpg", save=True)
+    root = Path(args.data_root).expanduser().resolve()
+    dirs = {"datasets_dir": args.datasets_dir or root / "datasets",
+            "weights_dir": args.weights_dir or root / "weights",
+            "runs_dir": args.runs_dir or root / "runs"}
+    SETTINGS.update({k: str(Path(v).expanduser().resolve()) for k, v in dirs.items()})
+
+    kw = {"data": args.data, "imgsz": args.imgsz, "batch": args.batch, "workers": args.workers,
+          "device": args.device}
+    model = YOLO(args.model)
+    memmap = args.img_cache == "memmap"
+    if memmap:
+        from train_memmap import MemmapOBBTrainer, MemmapOBBValidator
+        # DDP 临时脚本在 ultralytics 配置目录下运行，需能从本仓库导入 train_memmap
+        here = str(Path(__file__).resolve().parent)
+        os.environ["PYTHONPATH"] = os.pathsep.join(p for p in (here, os.environ.get("PYTHONPATH")) if p)
+    with metrics.timer("train.fit"):
+        if memmap:
+            model.train(trainer=MemmapOBBTrainer, task="obb", epochs=args.epochs, cache=False, name=args.name, **kw)
+        else:
+            model.train(task="obb", epochs=args.epochs, name=args.name,
+                        cache=False if args.img_cache == "none" else args.img_cache, **kw)
+
+    if not args.no_val:
+        with metrics.timer("train.val"):
+            if memmap:
+                model.val(validator=MemmapOBBValidator, task="obb", **kw)
+            else:
+                model.val(task="obb", **kw)
+    if args.predict:
+        model.predict(task="obb", source=args.predict, imgsz=args.imgsz, device=args.device, save=True)
+
+if __name__ == "__main__":
+    main()
+
+'''
+python train_detect.py --data_root ./data --data dota8.yaml --imgsz 1024 --epochs 50 --workers 8
+python train_detect.py --data_root /mnt/fast/bigwork --img_cache memmap --batch 32 --device cpu
+'''
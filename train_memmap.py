@@ -0,0 +1,61 @@
+# train_memmap.py
+# train_detect --img_cache memmap 用的 ultralytics 子类：数据集从 image_cache 的 memmap 缓存取已缩放好的图。
+# 单独成模块、类定义在模块级：多卡 DDP 时 ultralytics 生成的临时脚本会 `from train_memmap import MemmapOBBTrainer`，
+# 函数内定义的类无法被这样导入。模块级导入 ultralytics，只在选择 memmap 时由 train_detect 导入本模块。
+from __future__ import annotations
+from copy import copy
+from pathlib import Path
+from ultralytics.data import YOLODataset
+from ultralytics.data.utils import img2label_paths
+from ultralytics.models.yolo.obb import OBBTrainer, OBBValidator
+from ultralytics.utils import LOGGER, colorstr
+from ultralytics.utils.torch_utils import de_parallel
+import metrics
+from image_cache import ImageMemmapCache
+
+class MemmapYOLODataset(YOLODataset):
+    """load_image 改为从 memmap 缓存取已缩放好的 uint8 图；rect_mode=False 等少见路径回退原实现"""
+
+    def __init__(self, *args, cache_workers: int = 8, **kwargs):
+        super().__init__(*args, **kwargs)
+        base = Path(img2label_paths([self.im_files[0]])[0]).parent    # labels/<split>，与 <split>.cache 同名
+        with metrics.timer("train.img_cache_build"):
+            self.mm_cache = ImageMemmapCache(base, self.imgsz).build(
+                self.im_files, workers=cache_workers, log=lambda s: LOGGER.info(f"{self.prefix}{s}"))
+        LOGGER.info(f"{self.prefix}memmap image cache {self.mm_cache.blob} "
+                    f"({self.mm_cache.nbytes() / 2 ** 30:.2f}GB, {len(self.im_files)} images)")
+
+    def load_image(self, i, rect_mode=True):
+        if not rect_mode:
+            return super().load_image(i, rect_mode)
+        im, hw0 = self.mm_cache.get(i)
+        if self.augment:                            # 与 BaseDataset 相同的 mosaic 缓冲区维护
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, im.shape[:2]
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return im, hw0, im.shape[:2]
+
+def build_memmap_dataset(cfg, img_path, batch, data, mode="train", rect=False, stride=32):
+    """ultralytics.data.build_yolo_dataset 的 memmap 版本（参数一致）"""
+    return MemmapYOLODataset(
+        img_path=img_path, imgsz=cfg.imgsz, batch_size=batch, augment=mode == "train", hyp=cfg,
+        rect=cfg.rect or rect, cache=None, single_cls=cfg.single_cls or False, stride=int(stride),
+        pad=0.0 if mode == "train" else 0.5, prefix=colorstr(f"{mode}: "), task=cfg.task,
+        classes=cfg.classes, data=data, fraction=cfg.fraction if mode == "train" else 1.0,
+        cache_workers=max(1, cfg.workers))
+
+class MemmapOBBValidator(OBBValidator):
+    def build_dataset(self, img_path, mode="val", batch=None):
+        return build_memmap_dataset(self.args, img_path, batch, self.data, mode=mode, stride=self.stride)
+
+class MemmapOBBTrainer(OBBTrainer):
+    def build_dataset(self, img_path, mode="train", batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        return build_memmap_dataset(self.args, img_path, batch, self.data, mode, rect=mode == "val", stride=gs)
+
+    def get_validator(self):
+        self.loss_names = "box_loss", "cls_loss", "dfl_loss"
+        return MemmapOBBValidator(self.test_loader, save_dir=self.save_dir, args=copy(self.args),
+                                  _callbacks=self.callbacks)